@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # Trigram search for members
     
     # GyMMS apps
     "core",
@@ -98,6 +99,20 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by all gunicorn workers; set CACHE_URL (e.g. redis://host:6379/1) to use another backend
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='filecache:///tmp/gymms_cache?max_entries=5000'),
+}
+
+METRICS_CACHE_TIMEOUT = 60 * 60 * 24     # Seconds a metrics response is kept once computed
+
+# Gym occupancy
+GYM_SESSION_MINUTES = env.int('GYM_SESSION_MINUTES', default=180)   # Open visits are checked out after this long
+GYM_MAX_CAPACITY = env.int('GYM_MAX_CAPACITY', default=0)           # Most members in the gym at once; 0 for no limit
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,29 @@
+"""
+Benchmark helpers
+Benchmark commands fill tables with synthetic rows; they run against a
+throwaway copy of the schema so nothing they write reaches the live
+database, its rollups, the shared cache or the live feed
+"""
+from contextlib import contextmanager
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Run the block against a freshly migrated test database, destroyed afterwards
+    Caching goes to local memory so data-version bumps don't touch the shared cache
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    try:
+        # Worker threads open their own connections; those follow the renamed database too
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+                yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        teardown_test_environment()
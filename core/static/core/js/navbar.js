@@ -175,4 +175,24 @@ document.addEventListener('DOMContentLoaded', function(){
       console.log('Closing dropdown - escape key');
     }
   });
+
+  // Logout: drop the browser's member index (names, phones, emails) before leaving
+  const logoutLink = document.getElementById('logout-link');
+  if (logoutLink && window.indexedDB) {
+    logoutLink.addEventListener('click', function(e) {
+      e.preventDefault();
+      let left = false;
+      const leave = () => {
+        if (!left) {
+          left = true;
+          window.location.href = logoutLink.href;
+        }
+      };
+      const request = indexedDB.deleteDatabase('gymms-members');
+      request.onsuccess = leave;
+      request.onerror = leave;
+      // Open pages close their connection on request; don't hold the logout up regardless
+      setTimeout(leave, 1000);
+    });
+  }
 });
@@ -0,0 +1,127 @@
+"""
+Recent activity feed
+Member check-ins and walk-in payments of a day merged by a single UNION ALL
+query that the database orders and limits, so the dashboard loads a fixed-size
+window however busy the day gets. Older pages are fetched with a keyset cursor
+"""
+from django.core.files.storage import default_storage
+from django.db.models import CharField, DateTimeField, F, Q, Value
+from django.utils.dateparse import parse_datetime
+
+from .models import GymCheckIn
+from payments.models import Payment
+
+
+# Events shown on the dashboard and returned per "load more" page
+ACTIVITY_PAGE_SIZE = 20
+
+# Most events a single get_stats poll returns
+POLL_EVENT_LIMIT = 50
+
+# Event kinds; at equal times the feed orders walk-ins before member check-ins
+MEMBER = 'member'
+WALK_IN = 'walkin'
+
+FEED_FIELDS = ('kind', 'event_id', 'name', 'photo', 'time', 'checked_out_at')
+
+
+def _check_ins(day):
+    return GymCheckIn.objects.filter(date=day).annotate(
+        kind=Value(MEMBER, output_field=CharField()),
+        event_id=F('id'),
+        name=F('member__name'),
+        photo=F('member__photo'),
+        time=F('check_in_time'),
+        checked_out_at=F('check_out_time'),
+    ).values(*FEED_FIELDS)
+
+
+def _walk_ins(day):
+    return Payment.objects.filter(
+        business_date=day,
+        stored_member_id='GYMMSGUEST',
+        status='Completed'
+    ).annotate(
+        kind=Value(WALK_IN, output_field=CharField()),
+        event_id=F('id'),
+        name=F('stored_member_name'),
+        photo=Value(None, output_field=CharField()),  # Walk-ins don't have photos
+        time=F('payment_date'),
+        checked_out_at=Value(None, output_field=DateTimeField()),
+    ).values(*FEED_FIELDS)
+
+
+def _before(queryset, kind, cursor):
+    """Rows of one kind that sort after the cursor in (time, kind, id) descending order"""
+    time, cursor_kind, event_id = cursor
+    if kind < cursor_kind:
+        return queryset.filter(time__lte=time)
+    if kind > cursor_kind:
+        return queryset.filter(time__lt=time)
+    return queryset.filter(Q(time__lt=time) | Q(time=time, event_id__lt=event_id))
+
+
+def _after(queryset, kind, cursor):
+    """Rows of one kind that sort before the cursor in (time, kind, id) descending order"""
+    time, cursor_kind, event_id = cursor
+    if kind > cursor_kind:
+        return queryset.filter(time__gte=time)
+    if kind < cursor_kind:
+        return queryset.filter(time__gt=time)
+    return queryset.filter(Q(time__gt=time) | Q(time=time, event_id__gt=event_id))
+
+
+def activity_feed(day, limit=ACTIVITY_PAGE_SIZE, before=None, since=None):
+    """
+    The newest `limit` events of a Manila business date, most recent first
+    `before` is a decoded cursor for the next page; `since` is a decoded cursor
+    keeping only the events newer than it (the polling cursor)
+    """
+    parts = {MEMBER: _check_ins(day), WALK_IN: _walk_ins(day)}
+    for kind, queryset in parts.items():
+        if before is not None:
+            queryset = _before(queryset, kind, before)
+        if since is not None:
+            queryset = _after(queryset, kind, since)
+        parts[kind] = queryset
+
+    rows = parts[MEMBER].union(parts[WALK_IN], all=True).order_by('-time', '-kind', '-event_id')[:limit]
+
+    return [{
+        'type': row['kind'],
+        'id': row['event_id'],
+        'name': row['name'],
+        'photo': default_storage.url(row['photo']) if row['photo'] else None,
+        'time': row['time'],
+        'check_out_time': row['checked_out_at'],
+    } for row in rows]
+
+
+def activity_json(event):
+    """An event as the browser renders it, in the same shape the live feed sends"""
+    return {
+        'type': event['type'],
+        'id': event['id'],
+        'checked_out': event['type'] == WALK_IN or event['check_out_time'] is not None,
+        'member_name': event['name'],
+        'photo': event['photo'],
+        'time': event['time'].isoformat(),
+    }
+
+
+def encode_cursor(event):
+    """Opaque "load more" cursor pointing just past an event"""
+    return f"{event['time'].isoformat()}|{event['type']}|{event['id']}"
+
+
+def decode_cursor(value):
+    """(time, kind, id) from encode_cursor, or None for a missing or malformed cursor"""
+    try:
+        time, kind, event_id = value.split('|')
+        time = parse_datetime(time.replace(' ', '+'))
+        event_id = int(event_id)
+    except ValueError:
+        return None
+    if time is None or kind not in (MEMBER, WALK_IN):
+        return None
+    return time, kind, event_id
@@ -3,7 +3,7 @@ from .models import GymCheckIn, DashboardStats
 
 @admin.register(GymCheckIn)
 class GymCheckInAdmin(admin.ModelAdmin):
-    list_display = ('member', 'check_in_time', 'check_out_time', 'date', 'duration')
+    list_display = ('member', 'check_in_time', 'check_out_time', 'date', 'duration', 'device_id')
     list_filter = ('date', 'check_in_time')
     search_fields = ('member__name', 'member__member_id', 'member__email')
     date_hierarchy = 'date'
@@ -15,8 +15,8 @@ class GymCheckInAdmin(admin.ModelAdmin):
 
 @admin.register(DashboardStats)
 class DashboardStatsAdmin(admin.ModelAdmin):
-    list_display = ('date', 'daily_walk_ins', 'total_check_ins', 'total_revenue', 'active_members', 'new_members')
+    list_display = ('date', 'daily_walk_ins', 'total_check_ins', 'member_check_ins', 'in_gym', 'total_revenue', 'active_members', 'new_members')
     list_filter = ('date',)
     date_hierarchy = 'date'
     ordering = ('-date',)
-    readonly_fields = ('date', 'daily_walk_ins', 'total_check_ins', 'total_revenue', 'active_members', 'new_members')
+    readonly_fields = ('date', 'daily_walk_ins', 'total_check_ins', 'member_check_ins', 'in_gym', 'total_revenue', 'active_members', 'new_members', 'last_updated')
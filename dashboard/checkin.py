@@ -0,0 +1,281 @@
+"""
+Member check-in write path
+The member row is locked for the length of the transaction, so concurrent taps
+for the same member queue up and each one sees the check-ins committed before
+it: the daily limit and the cool-down can't be slipped past
+
+Each member's count and last check-in time for the day are also kept in the
+shared cache, written through when a check-in commits and rebuilt from the
+database on a miss, so repeat and double taps are refused without a query
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from collections import defaultdict
+from datetime import timedelta
+
+from .models import GymCheckIn, DashboardStats
+from .occupancy import expire_due_visits, session_length
+from memberships.models import Member
+from metrics.signals import apply_checkin_batch
+from metrics.utils import MANILA_TZ
+
+
+# Check-ins allowed per member per Manila day
+MAX_DAILY_CHECKINS = 3
+
+# Minutes a member must wait between check-ins
+CHECKIN_COOLDOWN_MINUTES = 60
+
+# Seconds a member's rule state stays cached; keys are per day, so one day is enough
+RULE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Most events a device may send in one batch
+MAX_BATCH_EVENTS = 500
+
+# How far ahead of the server clock a device timestamp may run
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class CheckInRefused(Exception):
+    """A check-in the rules don't allow; `message` is shown to staff as-is"""
+
+    def __init__(self, message, **extra):
+        super().__init__(message)
+        self.message = message
+        self.extra = extra
+
+
+def _time_left(remaining_minutes):
+    hours = remaining_minutes // 60
+    minutes = remaining_minutes % 60
+    if hours > 0:
+        return f"{hours} hour{'s' if hours != 1 else ''} and {minutes} minute{'s' if minutes != 1 else ''}"
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+
+def check_member(member, day):
+    """Raise CheckInRefused if the membership doesn't allow checking in on a day"""
+    if member.end_date < day:
+        raise CheckInRefused('Member membership has expired. Please renew membership first.')
+
+    if not member.is_active:
+        raise CheckInRefused('Member account is inactive. Please process payment first.')
+
+
+def check_limits(count, minutes_since):
+    """
+    Raise CheckInRefused for the daily limit or the cool-down, given the member's
+    check-ins that day and the minutes since the nearest one (None if there are none)
+    """
+    if count >= MAX_DAILY_CHECKINS:
+        raise CheckInRefused(f'Maximum check-ins ({MAX_DAILY_CHECKINS}) reached for today.')
+
+    if minutes_since is not None and minutes_since < CHECKIN_COOLDOWN_MINUTES:
+        remaining_minutes = CHECKIN_COOLDOWN_MINUTES - minutes_since
+        raise CheckInRefused(
+            f'Please wait {_time_left(remaining_minutes)} before checking in again.',
+            time_left_minutes=remaining_minutes
+        )
+
+
+def check_capacity(today):
+    """
+    Raise CheckInRefused when GYM_MAX_CAPACITY is set and reached; call inside the check-in transaction
+    Today's counters row stays locked until the insert commits, so concurrent check-ins are admitted one at a time.
+    It is the first counters or rollup row the transaction locks, matching the order in metrics.signals
+    """
+    capacity = settings.GYM_MAX_CAPACITY
+    if not capacity:
+        return
+
+    locked = DashboardStats.objects.select_for_update().filter(date=today).values_list('in_gym', flat=True)
+    in_gym = locked.first()
+    if in_gym is None:
+        # First check-in of the day: build the row, then lock it
+        DashboardStats.for_date(today)
+        in_gym = locked.first()
+    if in_gym >= capacity:
+        raise CheckInRefused(f'The gym is at full capacity ({capacity}). Please wait for someone to check out.')
+
+
+def rule_state_key(member_id, day):
+    return f'checkin:rules:{member_id}:{day.isoformat()}'
+
+
+def forget_rule_state(member_id, day):
+    """Drop a member's cached rule state once the transaction commits, e.g. after a check-in is deleted"""
+    transaction.on_commit(lambda: cache.delete(rule_state_key(member_id, day)))
+
+
+def _minutes_since(now, last):
+    return int((now - last).total_seconds() / 60) if last is not None else None
+
+
+def log_member_checkin(member_id):
+    """
+    Check a member in, or raise CheckInRefused
+    Taps the cached rule state already refuses never reach the database; otherwise
+    lookup-and-lock, one aggregate over today's check-ins and the insert run in a
+    single transaction. The aggregate, not the cache, decides an accepted check-in
+    """
+    now = timezone.now()
+    today = now.astimezone(MANILA_TZ).date()
+    key = rule_state_key(member_id, today)
+
+    state = cache.get(key)
+    if state is not None:
+        count, last = state
+        check_limits(count, _minutes_since(now, last))
+
+    if settings.GYM_MAX_CAPACITY:
+        # Overstayed visits are closed by the throttled sweep (or the expire_visits cron), not per check-in;
+        # the sweep runs before the member is locked so its own locks aren't held until the insert commits
+        expire_due_visits()
+
+    with transaction.atomic():
+        try:
+            member = Member.objects.select_for_update().get(member_id=member_id, is_deleted=False)
+        except Member.DoesNotExist:
+            raise CheckInRefused('Member not found')
+
+        check_member(member, today)
+
+        todays = GymCheckIn.objects.filter(member=member, date=today).aggregate(
+            count=Count('id'),
+            last=Max('check_in_time'),
+        )
+        # Rebuild the cached state on a miss (or after a restart) so the next refusal is free
+        cache.set(key, (todays['count'], todays['last']), RULE_CACHE_TIMEOUT)
+        check_limits(todays['count'], _minutes_since(now, todays['last']))
+        check_capacity(today)
+
+        checkin = GymCheckIn(member=member)
+        # The aggregate already says whether this is the member's first visit today; the rollup signal reuses it
+        checkin._first_today = todays['count'] == 0
+        checkin.save()
+        transaction.on_commit(
+            lambda: cache.set(key, (todays['count'] + 1, checkin.check_in_time), RULE_CACHE_TIMEOUT)
+        )
+        return checkin
+
+
+def _parse_event(event, now):
+    """(member_id, device_id, timestamp) of a batch event, or raise CheckInRefused"""
+    if not isinstance(event, dict):
+        raise CheckInRefused('Invalid event')
+
+    member_id = str(event.get('member_id') or '').strip()
+    if not member_id:
+        raise CheckInRefused('Member ID is required')
+
+    device_id = str(event.get('device_id') or '').strip()
+    if not device_id or len(device_id) > 64:
+        raise CheckInRefused('A device ID of up to 64 characters is required')
+
+    try:
+        timestamp = parse_datetime(str(event.get('timestamp') or ''))
+    except ValueError:
+        timestamp = None
+    if timestamp is None:
+        raise CheckInRefused('Invalid timestamp')
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, MANILA_TZ)
+    if timestamp > now + CLOCK_SKEW:
+        raise CheckInRefused('Timestamp is in the future')
+
+    return member_id, device_id, timestamp
+
+
+def _refused(index, refusal):
+    return {'index': index, 'status': 'refused', 'error': refusal.message, **refusal.extra}
+
+
+def log_checkin_batch(events):
+    """
+    Check in a batch of device events, each {'member_id', 'device_id', 'timestamp'}
+    Replays record entries that already happened, so capacity isn't enforced on them,
+    and ones older than a session are stored already checked out
+    The batch's members are locked, their check-ins on the batch's days read once,
+    the rules applied in timestamp order and the accepted events inserted with one
+    bulk_create. Returns a result per event: accepted, duplicate (already recorded
+    by an earlier replay) or refused with the same error a single check-in gets
+    """
+    now = timezone.now()
+    # Replayed visits that would already have expired are recorded as over
+    session_over = now - session_length()
+    results = [None] * len(events)
+
+    parsed = []
+    for index, event in enumerate(events):
+        try:
+            parsed.append((index, *_parse_event(event, now)))
+        except CheckInRefused as e:
+            results[index] = _refused(index, e)
+
+    with transaction.atomic():
+        members = {
+            member.member_id: member
+            for member in Member.objects.select_for_update().filter(
+                member_id__in={member_id for _, member_id, _, _ in parsed},
+                is_deleted=False
+            ).order_by('pk')
+        }
+        days = {timestamp.astimezone(MANILA_TZ).date() for _, _, _, timestamp in parsed}
+
+        # Everything already recorded for these members on these days, in one query
+        day_times = defaultdict(list)
+        recorded = set()
+        for member_pk, day, check_in_time, device_id, client_timestamp in GymCheckIn.objects.filter(
+            member__in=members.values(),
+            date__in=days
+        ).values_list('member_id', 'date', 'check_in_time', 'device_id', 'client_timestamp'):
+            day_times[(member_pk, day)].append(check_in_time)
+            if client_timestamp is not None:
+                recorded.add((device_id, member_pk, client_timestamp))
+
+        accepted = []
+        for index, member_id, device_id, timestamp in sorted(parsed, key=lambda event: event[3]):
+            member = members.get(member_id)
+            if member is None:
+                results[index] = _refused(index, CheckInRefused('Member not found'))
+                continue
+
+            if (device_id, member.pk, timestamp) in recorded:
+                results[index] = {'index': index, 'status': 'duplicate'}
+                continue
+
+            day = timestamp.astimezone(MANILA_TZ).date()
+            times = day_times[(member.pk, day)]
+            # Events can arrive after later check-ins, so the nearest one in either direction counts
+            nearest = min((abs(timestamp - other) for other in times), default=None)
+            try:
+                check_member(member, day)
+                check_limits(len(times), int(nearest.total_seconds() / 60) if nearest is not None else None)
+            except CheckInRefused as e:
+                results[index] = _refused(index, e)
+                continue
+
+            times.append(timestamp)
+            recorded.add((device_id, member.pk, timestamp))
+            accepted.append((index, GymCheckIn(
+                member=member,
+                check_in_time=timestamp,
+                check_out_time=timestamp + session_length() if timestamp <= session_over else None,
+                date=day,
+                device_id=device_id,
+                client_timestamp=timestamp,
+            )))
+
+        created = GymCheckIn.objects.bulk_create([checkin for _, checkin in accepted])
+        for (index, _), checkin in zip(accepted, created):
+            results[index] = {'index': index, 'status': 'accepted', 'checkin_id': checkin.id}
+            forget_rule_state(checkin.member.member_id, checkin.date)
+
+        # bulk_create sends no signals
+        apply_checkin_batch(created)
+
+    return results
@@ -0,0 +1,187 @@
+"""
+Live dashboard feed
+Writers publish check-in and payment events with Postgres NOTIFY once their
+transaction commits. Each ASGI worker keeps one LISTEN connection in a
+background thread and fans events out to the Server-Sent Events streams of
+the browsers connected to it, so open dashboards no longer poll the database
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+
+from metrics.utils import local_today
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'gymms_live'
+
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_SECONDS = 15
+
+# Events buffered per browser before a slow client starts missing them
+QUEUE_SIZE = 100
+
+
+def publish(build_event):
+    """
+    Send the event returned by build_event() to every live dashboard
+    The event is built after the transaction commits, so counters include the write
+    """
+    def notify():
+        payload = json.dumps(build_event(), cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+    transaction.on_commit(notify)
+
+
+def live_counters(day):
+    """Counters every dashboard tile shows for today, from the live DashboardStats row"""
+    from .models import DashboardStats
+    counters = DashboardStats.for_date(day)
+    return {
+        'daily_walk_ins': counters.daily_walk_ins,
+        'member_check_ins': counters.total_check_ins,
+        'total_check_ins': counters.total_check_ins + counters.daily_walk_ins,
+        'today_revenue': counters.total_revenue,
+        'active_in_gym': counters.in_gym,
+    }
+
+
+def publish_checkin(checkin):
+    """A member check-in for the recent list, with today's counters; earlier days' check-ins aren't live"""
+    if checkin.date != local_today():
+        return
+    member = checkin.member
+    activity = {
+        'type': 'member',
+        'id': checkin.id,
+        'checked_out': False,
+        'member_name': member.name,
+        'photo': member.photo.url if member.photo else None,
+        'time': checkin.check_in_time.isoformat(),
+    }
+    publish(lambda: {'activity': activity, 'counters': live_counters(checkin.date)})
+
+
+def publish_payment(payment, day, is_new_walk_in):
+    """
+    A payment change to today: counters, plus a recent-list entry for a new walk-in
+    Back-dated payments and changes to earlier days' payments aren't live; the tiles only show today
+    """
+    if day != local_today():
+        return
+    activity = None
+    if is_new_walk_in:
+        activity = {
+            'type': 'walkin',
+            'id': payment.id,
+            'checked_out': True,
+            'member_name': payment.stored_member_name,
+            'photo': None,
+            'time': payment.payment_date.isoformat(),
+        }
+    publish(lambda: {'activity': activity, 'counters': live_counters(day)})
+
+
+def publish_counters(day):
+    """Counters only, after a change to today with no single event to show (a replayed batch)"""
+    if day != local_today():
+        return
+    publish(lambda: {'activity': None, 'counters': live_counters(day)})
+
+
+class Broadcaster:
+    """Fans NOTIFY payloads from one LISTEN connection out to asyncio queues"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        """Register a queue on the running event loop; starts the listener on first use"""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name='gymms-live-listener', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _deliver(self, payload):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._enqueue, queue, payload)
+            except RuntimeError:
+                # The subscriber's event loop has closed; its stream is gone
+                self.unsubscribe((loop, queue))
+
+    @staticmethod
+    def _enqueue(queue, payload):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            pass
+
+    def _listen(self):
+        """LISTEN forever on a dedicated connection, reconnecting after errors"""
+        try:
+            while True:
+                listener = None
+                try:
+                    listener = psycopg2.connect(**connections['default'].get_connection_params())
+                    listener.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                    with listener.cursor() as cursor:
+                        cursor.execute(f'LISTEN {CHANNEL}')
+                    while True:
+                        if select.select([listener], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                            continue
+                        listener.poll()
+                        while listener.notifies:
+                            self._deliver(listener.notifies.pop(0).payload)
+                except Exception:
+                    # Anything short of interpreter exit reconnects; a dead thread would silence every dashboard
+                    logger.exception('Live feed listener failed, reconnecting')
+                    time.sleep(5)
+                finally:
+                    if listener is not None:
+                        listener.close()
+        finally:
+            # Let the next subscriber start a fresh listener
+            with self._lock:
+                self._thread = None
+
+
+broadcaster = Broadcaster()
+
+
+async def event_stream():
+    """Server-Sent Events for one browser: each event as a data line, with keepalives"""
+    subscription = broadcaster.subscribe()
+    _, queue = subscription
+    try:
+        # Browsers reconnect after 5 seconds if the stream drops
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f'data: {payload}\n\n'
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,120 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from core.benchmarks import throwaway_database
+from datetime import timedelta
+from decimal import Decimal
+import queue
+import random
+import threading
+import time
+from dashboard.checkin import log_member_checkin, CheckInRefused
+from dashboard.models import GymCheckIn
+from memberships.models import Member
+from metrics.utils import local_today
+
+
+BENCH_PREFIX = 'BENCH'
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent check-in throughput on a throwaway test database and verify the daily rules hold under contention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50, help='Benchmark members to create (default: 50)')
+        parser.add_argument('--taps', type=int, default=5, help='Check-in attempts per member (default: 5)')
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent workers (default: 16)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Creating a throwaway test database (the live database is not touched)...'))
+        with throwaway_database():
+            violated, most = self.benchmark(options['members'], options['taps'], options['workers'])
+
+        if violated:
+            self.stdout.write(self.style.ERROR(f'Rules violated: a member was checked in {most} times'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark complete: one check-in per member, rules held'))
+
+    def benchmark(self, members, taps, workers):
+        """Run the concurrent taps; returns (whether the rules were violated, most check-ins for one member)"""
+        today = local_today()
+
+        self.stdout.write(self.style.WARNING(
+            f'Benchmarking {members * taps} check-in attempts from {workers} workers...'
+        ))
+        member_ids = self.create_members(members, today)
+
+        attempts = queue.Queue()
+        tapped = [member_id for member_id in member_ids for _ in range(taps)]
+        random.shuffle(tapped)
+        for member_id in tapped:
+            attempts.put(member_id)
+
+        latencies = []
+        outcomes = {'accepted': 0, 'refused': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        member_id = attempts.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    try:
+                        log_member_checkin(member_id)
+                        outcome = 'accepted'
+                    except CheckInRefused:
+                        outcome = 'refused'
+                    except Exception as e:
+                        self.stderr.write(f'  {member_id}: {e}')
+                        outcome = 'failed'
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                        outcomes[outcome] += 1
+            finally:
+                # Each thread has its own connection
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        self.stdout.write(
+            f'  {len(latencies)} attempts in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s), '
+            f'p50 {p50:.1f} ms, p95 {p95:.1f} ms'
+        )
+        self.stdout.write(
+            f"  accepted {outcomes['accepted']}, refused {outcomes['refused']}, failed {outcomes['failed']}"
+        )
+
+        # Every member's first tap wins; the cool-down refuses the rest
+        per_member = GymCheckIn.objects.filter(member__member_id__in=member_ids, date=today).values('member').annotate(
+            count=Count('id')
+        ).values_list('count', flat=True)
+        most = max(per_member, default=0)
+        return most > 1 or outcomes['accepted'] != len(member_ids), most
+
+    def create_members(self, count, today):
+        member_ids = [f'{BENCH_PREFIX}{index:04d}' for index in range(count)]
+        for member_id in member_ids:
+            Member.objects.create(
+                member_id=member_id,
+                name=f'Benchmark {member_id}',
+                phone_number='00000000000',
+                address='Benchmark',
+                emergency_contact='Benchmark',
+                emergency_phone='00000000000',
+                start_date=today,
+                end_date=today + timedelta(days=30),
+                membership_fee=Decimal('0.00'),
+            )
+        return member_ids
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from dashboard.occupancy import expire_visits
+
+
+class Command(BaseCommand):
+    help = 'Check out visits left open longer than GYM_SESSION_MINUTES (run from cron every few minutes)'
+
+    def handle(self, *args, **options):
+        expired = expire_visits()
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {expired} visit(s) open longer than {settings.GYM_SESSION_MINUTES} minutes'
+        ))
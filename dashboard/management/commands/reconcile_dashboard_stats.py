@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from datetime import timedelta
+from dashboard.models import DashboardStats
+from metrics.utils import local_today
+
+
+class Command(BaseCommand):
+    help = 'Rebuild live dashboard counters from raw check-ins, payments and members'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of days to reconcile, ending today (default: 1 for today only)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        end_date = local_today()
+        start_date = end_date - timedelta(days=days - 1)
+        
+        current_date = start_date
+        while current_date <= end_date:
+            stats = DashboardStats.reconcile(current_date)
+            self.stdout.write(
+                f'  {current_date}: {stats.total_check_ins} check-ins, '
+                f'{stats.daily_walk_ins} walk-ins, ₱{stats.total_revenue} revenue'
+            )
+            current_date += timedelta(days=1)
+        
+        self.stdout.write(self.style.SUCCESS(f'Reconciled dashboard counters for {days} day(s)'))
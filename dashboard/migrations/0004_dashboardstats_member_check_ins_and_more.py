@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_alter_dashboardstats_total_revenue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='member_check_ins',
+            field=models.IntegerField(default=0, help_text='Distinct members who checked in'),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='in_gym',
+            field=models.IntegerField(default=0, help_text='Check-ins without a check-out'),
+        ),
+    ]
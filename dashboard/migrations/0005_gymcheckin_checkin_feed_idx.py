@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_dashboardstats_member_check_ins_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gymcheckin',
+            index=models.Index(fields=['date', 'check_in_time'], name='checkin_feed_idx'),
+        ),
+    ]
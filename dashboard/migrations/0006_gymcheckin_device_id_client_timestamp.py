@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_gymcheckin_checkin_feed_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gymcheckin',
+            name='check_in_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='gymcheckin',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate, help_text='Manila date of check_in_time'),
+        ),
+        migrations.AddField(
+            model_name='gymcheckin',
+            name='device_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='gymcheckin',
+            name='client_timestamp',
+            field=models.DateTimeField(blank=True, help_text='Event time reported by the device', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='gymcheckin',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_timestamp__isnull', False)), fields=('device_id', 'member', 'client_timestamp'), name='unique_device_checkin'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_gymcheckin_device_id_client_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gymcheckin',
+            index=models.Index(condition=models.Q(('check_out_time__isnull', True)), fields=['check_in_time'], name='checkin_open_visit_idx'),
+        ),
+    ]
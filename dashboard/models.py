@@ -9,9 +9,13 @@ class GymCheckIn(models.Model):
         on_delete=models.CASCADE,
         related_name='check_ins'
     )
-    check_in_time = models.DateTimeField(auto_now_add=True)
+    check_in_time = models.DateTimeField(default=timezone.now)
     check_out_time = models.DateTimeField(null=True, blank=True)
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate, help_text='Manila date of check_in_time')
+    
+    # Set for check-ins recorded by a kiosk or turnstile through the batch API
+    device_id = models.CharField(max_length=64, blank=True, default='')
+    client_timestamp = models.DateTimeField(null=True, blank=True, help_text='Event time reported by the device')
     
     class Meta:
         ordering = ['-check_in_time']
@@ -20,6 +24,22 @@ class GymCheckIn(models.Model):
         indexes = [
             models.Index(fields=['date']),
             models.Index(fields=['member', 'date']),
+            # Recent activity feed: a day's check-ins newest first
+            models.Index(fields=['date', 'check_in_time'], name='checkin_feed_idx'),
+            # Occupancy expiry: only visits without a check-out
+            models.Index(
+                fields=['check_in_time'],
+                condition=models.Q(check_out_time__isnull=True),
+                name='checkin_open_visit_idx'
+            ),
+        ]
+        constraints = [
+            # A replayed device event is recognised and not inserted twice
+            models.UniqueConstraint(
+                fields=['device_id', 'member', 'client_timestamp'],
+                condition=models.Q(client_timestamp__isnull=False),
+                name='unique_device_checkin'
+            ),
         ]
     
     def __str__(self):
@@ -34,10 +54,16 @@ class GymCheckIn(models.Model):
 
 
 class DashboardStats(models.Model):
-    """Store daily dashboard statistics for performance"""
+    """
+    Live dashboard counters for one Manila business date
+    Incremented with F-expressions by the check-in, payment and member signals;
+    a day's row is rebuilt from raw rows when first read or by reconcile_dashboard_stats
+    """
     date = models.DateField(unique=True, default=timezone.now)
     daily_walk_ins = models.IntegerField(default=0)
     total_check_ins = models.IntegerField(default=0)
+    member_check_ins = models.IntegerField(default=0, help_text='Distinct members who checked in')
+    in_gym = models.IntegerField(default=0, help_text='Check-ins without a check-out')
     total_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     active_members = models.IntegerField(default=0)
     new_members = models.IntegerField(default=0)
@@ -53,3 +79,71 @@ class DashboardStats(models.Model):
     
     def __str__(self):
         return f"Stats for {self.date}"
+    
+    @classmethod
+    def for_date(cls, target_date):
+        """The counters row for a date, rebuilt from raw rows the first time it is read"""
+        stats = cls.objects.filter(date=target_date).first()
+        if stats is None:
+            stats = cls.reconcile(target_date)
+        return stats
+    
+    @classmethod
+    def apply(cls, target_date, **deltas):
+        """
+        Atomically add deltas to a date's counters
+        Today without a row yet is rebuilt from raw rows, which already include the change;
+        other dates without one are left for for_date to build when they are first read
+        """
+        from metrics.utils import local_today
+        
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(date=target_date).update(
+            last_updated=timezone.now(),
+            **{field: models.F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated and target_date == local_today():
+            cls.reconcile(target_date)
+    
+    @classmethod
+    def reconcile(cls, target_date):
+        """
+        Recompute a date's counters from raw check-ins, payments and members
+        The row is locked first, so a concurrent write's deltas land either in the
+        counts read here or on top of the rebuilt row, never lost in between.
+        Active members are those whose membership covers the date
+        """
+        from django.db import transaction
+        from django.db.models import Count, Sum, Q
+        from memberships.models import Member
+        from payments.models import Payment
+        
+        with transaction.atomic():
+            cls.objects.get_or_create(date=target_date)
+            stats = cls.objects.select_for_update().get(date=target_date)
+            
+            check_ins = GymCheckIn.objects.filter(date=target_date).aggregate(
+                total=Count('id'),
+                members=Count('member', distinct=True),
+                in_gym=Count('id', filter=Q(check_out_time__isnull=True)),
+            )
+            payments = Payment.objects.filter(business_date=target_date, status='Completed').aggregate(
+                revenue=Sum('amount'),
+                walk_ins=Count('id', filter=Q(stored_member_id='GYMMSGUEST')),
+            )
+            members = Member.objects.filter(is_deleted=False).aggregate(
+                active=Count('id', filter=Q(is_active=True, start_date__lte=target_date, end_date__gte=target_date)),
+                new=Count('id', filter=Q(business_date=target_date)),
+            )
+            
+            stats.daily_walk_ins = payments['walk_ins']
+            stats.total_check_ins = check_ins['total']
+            stats.member_check_ins = check_ins['members']
+            stats.in_gym = check_ins['in_gym']
+            stats.total_revenue = payments['revenue'] or 0
+            stats.active_members = members['active']
+            stats.new_members = members['new']
+            stats.save()
+        return stats
@@ -0,0 +1,84 @@
+"""
+Gym occupancy
+Who is in the gym right now: check-ins without a check-out, closed by staff or,
+after GYM_SESSION_MINUTES, by expiry. The live figure is the day's
+DashboardStats.in_gym counter, moved by the check-in signals and by expiry, so
+reading it never touches GymCheckIn
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from collections import Counter
+from datetime import timedelta
+
+from .live import publish_counters
+from .models import GymCheckIn, DashboardStats
+from metrics.utils import local_today
+
+
+# Seconds between expiry sweeps triggered by reads
+EXPIRY_SWEEP_SECONDS = 60
+
+
+def session_length():
+    return timedelta(minutes=settings.GYM_SESSION_MINUTES)
+
+
+def expire_visits(now=None):
+    """
+    Check out every visit open longer than the session length, at check-in time plus the session
+    Returns the number expired; each day's in-gym counter drops by its share
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Visits being checked out concurrently are left to that check-out
+        stale = list(GymCheckIn.objects.select_for_update(skip_locked=True).filter(
+            check_out_time__isnull=True,
+            check_in_time__lte=now - session_length()
+        ).values_list('id', 'date'))
+        if not stale:
+            return 0
+
+        # A queryset update sends no signals, so the counters are moved here
+        GymCheckIn.objects.filter(id__in=[pk for pk, _ in stale]).update(
+            check_out_time=F('check_in_time') + session_length()
+        )
+        per_day = Counter(day for _, day in stale)
+        for day, count in per_day.items():
+            DashboardStats.apply(day, in_gym=-count)
+
+    today = local_today()
+    if today in per_day:
+        publish_counters(today)
+    return len(stale)
+
+
+def expire_due_visits():
+    """expire_visits at most once per sweep interval across workers, for read paths"""
+    if cache.add('occupancy:expiry-sweep', True, EXPIRY_SWEEP_SECONDS):
+        expire_visits()
+
+
+def current_occupancy(today):
+    """People in the gym and the capacity (0 for none): one counters-row read, cheap enough to poll"""
+    expire_due_visits()
+    return {
+        'in_gym': DashboardStats.for_date(today).in_gym,
+        'capacity': settings.GYM_MAX_CAPACITY,
+    }
+
+
+def check_out(checkin_id):
+    """Close an open visit now; returns the check-in, or None if it isn't open"""
+    with transaction.atomic():
+        checkin = GymCheckIn.objects.select_for_update().filter(
+            pk=checkin_id,
+            check_out_time__isnull=True
+        ).first()
+        if checkin is None:
+            return None
+        checkin.check_out_time = timezone.now()
+        checkin.save(update_fields=['check_out_time'])
+    return checkin
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .checkin import forget_rule_state
+from .models import GymCheckIn
+
+
+@receiver(post_delete, sender=GymCheckIn)
+def forget_rules_for_deleted_checkin(sender, instance, **kwargs):
+    """A deleted check-in may lift the daily limit or cool-down the cache still holds"""
+    forget_rule_state(instance.member.member_id, instance.date)
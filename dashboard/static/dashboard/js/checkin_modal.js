@@ -1,5 +1,8 @@
 // ===== CHECK-IN MODAL FUNCTIONALITY =====
 
+// Scanned member cards start with this (see memberships/cards.py)
+const CARD_PREFIX = 'gymms:';
+
 document.addEventListener('DOMContentLoaded', function() {
     // Ensure showNotification is available
     if (typeof window.showNotification !== 'function') {
@@ -75,7 +78,8 @@ function setupCheckInModal() {
         
         clearTimeout(searchTimeout);
         
-        if (query.length < 2) {
+        // A card scan is submitted as-is, never searched
+        if (query.length < 2 || query.startsWith(CARD_PREFIX)) {
             memberSearchResults.classList.remove('active');
             memberSearchResults.innerHTML = '';
             return;
@@ -87,6 +91,18 @@ function setupCheckInModal() {
     });
     
     function searchMembers(query) {
+        // Search the browser's member index; ask the server only when it isn't available
+        const index = window.MemberIndex;
+        (index ? index.ready : Promise.resolve(false)).then(ready => {
+            if (ready) {
+                displayMemberResults(index.search(query));
+            } else {
+                searchMembersOnServer(query);
+            }
+        });
+    }
+    
+    function searchMembersOnServer(query) {
         fetch(`/dashboard/search-active-members/?q=${encodeURIComponent(query)}`)
             .then(response => response.json())
             .then(data => {
@@ -175,7 +191,10 @@ function setupCheckInModal() {
     memberForm.addEventListener('submit', function(e) {
         e.preventDefault();
         
-        if (!selectedMemberId.value) {
+        // Card scanners type the token and press Enter: check in directly, no search needed
+        const scannedToken = memberSearch.value.trim().startsWith(CARD_PREFIX) ? memberSearch.value.trim() : '';
+        
+        if (!scannedToken && !selectedMemberId.value) {
             // Check if showNotification exists
             if (typeof window.showNotification === 'function') {
                 window.showNotification('Please select a member first', 'error');
@@ -189,17 +208,15 @@ function setupCheckInModal() {
         submitBtn.disabled = true;
         submitBtn.textContent = 'Processing...';
         
-        console.log('Submitting check-in for member:', selectedMemberId.value);
+        console.log('Submitting check-in for member:', scannedToken ? 'scanned card' : selectedMemberId.value);
         
-        fetch('/dashboard/log-checkin/', {
+        fetch(scannedToken ? '/dashboard/scan-checkin/' : '/dashboard/log-checkin/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
                 'X-CSRFToken': getCsrfToken()
             },
-            body: JSON.stringify({
-                member_id: selectedMemberId.value
-            })
+            body: JSON.stringify(scannedToken ? { token: scannedToken } : { member_id: selectedMemberId.value })
         })
         .then(response => {
             console.log('Response status:', response.status);
@@ -212,30 +229,30 @@ function setupCheckInModal() {
                 console.log('Check-in successful, closing modal...');
                 
                 // Check if showNotification exists
+                const successMessage = data.member_name ? `${data.member_name} checked in successfully!` : 'Check-in logged successfully!';
                 if (typeof window.showNotification === 'function') {
-                    window.showNotification('Check-in logged successfully!', 'success');
+                    window.showNotification(successMessage, 'success');
                     console.log('[CHECK-IN] Success notification called');
                 } else {
                     console.error('[CHECK-IN] showNotification function not available!');
-                    alert('Check-in logged successfully!'); // Fallback
+                    alert(successMessage); // Fallback
                 }
                 
-                // Immediately add check-in to recent check-ins list
-                addCheckInToRecentList(selectedMember);
-                
-                // Update member check-ins count
-                updateMemberCheckInsCount();
-                
                 // Close modal immediately
                 closeModalHandler();
                 
-                // Reload page after delay to refresh all data
-                setTimeout(() => {
-                    window.location.reload();
-                }, 2000);
+                // The live feed delivers the check-in and new counters; poll only without it
+                if (!window.dashboardLiveConnected) {
+                    updateDashboardStats();
+                }
             } else {
                 console.error('Check-in failed:', data.error);
                 
+                // Ready for the next scan
+                if (scannedToken) {
+                    memberSearch.value = '';
+                }
+                
                 // Check if showNotification exists
                 if (typeof window.showNotification === 'function') {
                     window.showNotification(data.error || 'Failed to log check-in', 'error');
@@ -323,81 +340,6 @@ function setupCheckInModal() {
         return document.querySelector('[name=csrfmiddlewaretoken]')?.value || '';
     }
     
-    // Add check-in to recent list immediately
-    function addCheckInToRecentList(member) {
-        const activityList = document.querySelector('.activity-list');
-        const emptyState = document.querySelector('.empty-state');
-        
-        // Hide empty state if it's showing
-        if (emptyState) {
-            emptyState.style.display = 'none';
-        }
-        
-        // Generate avatar HTML
-        let avatarHtml;
-        if (member.photo) {
-            avatarHtml = `<img src="${member.photo}" alt="${member.name}" style="width: 100%; height: 100%; object-fit: cover; border-radius: 50%;">`;
-        } else {
-            // Generate initials
-            const names = member.name.split(' ');
-            let initials;
-            if (names.length > 1) {
-                initials = names[0][0].toUpperCase() + names[1][0].toUpperCase();
-            } else {
-                initials = member.name.slice(0, 2).toUpperCase();
-            }
-            avatarHtml = initials;
-        }
-        
-        // Create new check-in item
-        const newItem = document.createElement('div');
-        newItem.className = 'activity-item';
-        newItem.style.cssText = 'border-bottom: 1px solid #e0e0e0; padding-bottom: 0.75rem; margin-bottom: 0.75rem; animation: slideIn 0.3s ease;';
-        newItem.innerHTML = `
-            <div class="activity-avatar">${avatarHtml}</div>
-            <div class="activity-details">
-                <div class="activity-name">${member.name}</div>
-                <div class="activity-time">Just now</div>
-            </div>
-        `;
-        
-        // Add to top of list
-        if (activityList) {
-            activityList.style.display = 'block';
-            activityList.insertBefore(newItem, activityList.firstChild);
-        } else {
-            // Create activity list if it doesn't exist
-            const activityCard = document.querySelector('.activity-card');
-            const newList = document.createElement('div');
-            newList.className = 'activity-list';
-            newList.style.display = 'block';
-            newList.appendChild(newItem);
-            activityCard.appendChild(newList);
-        }
-        
-        // Update badge count
-        const badge = document.querySelector('.card-badge');
-        if (badge) {
-            const currentCount = parseInt(badge.textContent) || 0;
-            badge.textContent = currentCount + 1;
-        }
-    }
-    
-    // Update member check-ins count
-    function updateMemberCheckInsCount() {
-        const memberCheckInsEl = document.querySelectorAll('.stat-card')[1]?.querySelector('.stat-value');
-        if (memberCheckInsEl) {
-            const currentCount = parseInt(memberCheckInsEl.textContent) || 0;
-            memberCheckInsEl.textContent = currentCount + 1;
-            
-            // Add pulse animation
-            memberCheckInsEl.parentElement.parentElement.style.animation = 'pulse 0.5s ease';
-            setTimeout(() => {
-                memberCheckInsEl.parentElement.parentElement.style.animation = '';
-            }, 500);
-        }
-    }
-    
     // Update dashboard stats dynamically
     function updateDashboardStats() {
         console.log('Fetching updated dashboard stats...');
@@ -407,31 +349,24 @@ function setupCheckInModal() {
             card.style.animation = 'pulse 0.5s ease';
         });
         
-        fetch('/dashboard/get-stats/')
+        // Only ask for events newer than the newest one already shown
+        const activityCard = document.querySelector('.activity-card');
+        const cursor = activityCard?.dataset.cursor || '';
+        
+        fetch(`/dashboard/get-stats/?since=${encodeURIComponent(cursor)}`)
             .then(response => response.json())
             .then(data => {
                 console.log('Updated stats:', data);
                 
                 // Update stat values
-                const dailyWalkinsEl = document.querySelector('.stat-card .stat-value');
-                const monthlyCheckinsEl = document.querySelectorAll('.stat-card')[1]?.querySelector('.stat-value');
-                const recentCountEl = document.querySelector('.card-badge');
-                
-                if (dailyWalkinsEl) {
-                    animateValue(dailyWalkinsEl, parseInt(dailyWalkinsEl.textContent), data.daily_walk_ins, 500);
-                }
+                updateCounters(data);
                 
-                if (monthlyCheckinsEl) {
-                    animateValue(monthlyCheckinsEl, parseInt(monthlyCheckinsEl.textContent), data.member_check_ins, 500);
+                // Prepend only the new check-ins and advance the cursor
+                prependRecentCheckIns(data.recent_check_ins);
+                if (activityCard && data.cursor) {
+                    activityCard.dataset.cursor = data.cursor;
                 }
                 
-                if (recentCountEl) {
-                    recentCountEl.textContent = data.recent_check_ins.length;
-                }
-                
-                // Update recent check-ins list
-                updateRecentCheckIns(data.recent_check_ins);
-                
                 // Remove pulse animation after completion
                 setTimeout(() => {
                     document.querySelectorAll('.stat-card').forEach(card => {
@@ -444,8 +379,53 @@ function setupCheckInModal() {
             });
     }
     
+    // Walk-in, member check-in and recent-list counters from get_stats or a live event
+    function updateCounters(counters) {
+        const dailyWalkinsEl = document.querySelector('.stat-card .stat-value');
+        const monthlyCheckinsEl = document.querySelectorAll('.stat-card')[1]?.querySelector('.stat-value');
+        const recentCountEl = document.querySelector('.card-badge');
+        
+        if (dailyWalkinsEl) {
+            animateValue(dailyWalkinsEl, parseInt(dailyWalkinsEl.textContent), counters.daily_walk_ins, 500);
+        }
+        
+        if (monthlyCheckinsEl) {
+            animateValue(monthlyCheckinsEl, parseInt(monthlyCheckinsEl.textContent), counters.member_check_ins, 500);
+        }
+        
+        if (recentCountEl) {
+            recentCountEl.textContent = counters.total_check_ins;
+        }
+        
+        const occupancyEl = document.getElementById('occupancyValue');
+        if (occupancyEl && counters.active_in_gym !== undefined) {
+            occupancyEl.textContent = counters.active_in_gym;
+        }
+    }
+    
+    // Live feed events (see dashboard.js): new counters and at most one new check-in
+    document.addEventListener('dashboard:live', (e) => {
+        const { activity, counters } = e.detail;
+        updateCounters(counters);
+        
+        if (activity) {
+            prependRecentCheckIns([activity]);
+            
+            // Keep the polling cursor current in case the feed drops
+            const activityCard = document.querySelector('.activity-card');
+            if (activityCard) {
+                activityCard.dataset.cursor = `${activity.time}|${activity.type}|${activity.id}`;
+            }
+        }
+    });
+    
     // Animate number changes
     function animateValue(element, start, end, duration) {
+        // Live events often leave a counter unchanged; a zero step would never finish
+        if (start === end || isNaN(start)) {
+            element.textContent = end;
+            return;
+        }
         const range = end - start;
         const increment = range / (duration / 16); // 60fps
         let current = start;
@@ -460,23 +440,9 @@ function setupCheckInModal() {
         }, 16);
     }
     
-    // Update recent check-ins list
-    function updateRecentCheckIns(checkIns) {
-        const activityList = document.querySelector('.activity-list');
-        const emptyState = document.querySelector('.empty-state');
-        const activityCard = document.querySelector('.activity-card');
-        
-        if (checkIns.length === 0) {
-            if (activityList) activityList.style.display = 'none';
-            if (emptyState) emptyState.style.display = 'flex';
-            return;
-        }
-        
-        // Hide empty state, show list
-        if (emptyState) emptyState.style.display = 'none';
-        
-        // Build HTML for check-ins
-        const html = checkIns.map(checkIn => {
+    // Activity items HTML for check-ins from get_stats, get_activity or the live feed
+    function renderActivityItems(checkIns) {
+        return checkIns.map(checkIn => {
             // Generate avatar HTML - either photo or initials
             let avatarHtml;
             if (checkIn.photo) {
@@ -501,14 +467,31 @@ function setupCheckInModal() {
                     <div class="activity-avatar">${avatarHtml}</div>
                     <div class="activity-details">
                         <div class="activity-name">${checkIn.member_name}${walkInLabel}</div>
-                        <div class="activity-time">${checkIn.time_ago}</div>
+                        <div class="activity-time" data-time="${checkIn.time}" data-relative>${formatTimeAgo(checkIn.time)}</div>
                     </div>
+                    ${checkIn.checked_out ? '' : `<button type="button" class="btn-check-out" data-checkin-id="${checkIn.id}">Check out</button>`}
                 </div>
             `;
         }).join('');
+    }
+    
+    // Add new check-ins to the top of the recent list
+    function prependRecentCheckIns(checkIns) {
+        const activityList = document.querySelector('.activity-list');
+        const emptyState = document.querySelector('.empty-state');
+        const activityCard = document.querySelector('.activity-card');
+        
+        if (checkIns.length === 0) {
+            return;
+        }
+        
+        // Hide empty state, show list
+        if (emptyState) emptyState.style.display = 'none';
+        
+        const html = renderActivityItems(checkIns);
         
         if (activityList) {
-            activityList.innerHTML = html;
+            activityList.insertAdjacentHTML('afterbegin', html);
             activityList.style.display = 'block';
         } else {
             // Create activity list if it doesn't exist
@@ -518,4 +501,62 @@ function setupCheckInModal() {
             activityCard.appendChild(newList);
         }
     }
+    
+    // Check a member out from the recent list; the in-gym counter follows via the live feed or a poll
+    document.querySelector('.activity-card')?.addEventListener('click', (e) => {
+        const button = e.target.closest('.btn-check-out');
+        if (!button) return;
+        button.disabled = true;
+        
+        fetch('/dashboard/check-out/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCsrfToken()
+            },
+            body: JSON.stringify({ checkin_id: button.dataset.checkinId })
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (typeof window.showNotification === 'function') {
+                    window.showNotification(data.success ? 'Checked out' : data.error, data.success ? 'success' : 'error');
+                }
+                button.remove();
+                if (!window.dashboardLiveConnected) {
+                    updateDashboardStats();
+                }
+            })
+            .catch(error => {
+                console.error('Error checking out:', error);
+                button.disabled = false;
+            });
+    });
+    
+    // "Load more": append the next page of older activity, fetched by keyset cursor
+    const loadMoreBtn = document.getElementById('loadMoreActivity');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', () => {
+            loadMoreBtn.disabled = true;
+            
+            fetch(`/dashboard/activity/?before=${encodeURIComponent(loadMoreBtn.dataset.cursor)}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        throw new Error(data.error);
+                    }
+                    loadMoreBtn.insertAdjacentHTML('beforebegin', renderActivityItems(data.events));
+                    
+                    if (data.next_cursor) {
+                        loadMoreBtn.dataset.cursor = data.next_cursor;
+                        loadMoreBtn.disabled = false;
+                    } else {
+                        loadMoreBtn.remove();
+                    }
+                })
+                .catch(error => {
+                    console.error('Error loading activity:', error);
+                    loadMoreBtn.disabled = false;
+                });
+        });
+    }
 }
@@ -39,8 +39,59 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Setup revenue privacy toggle
     setupRevenueToggle();
+    
+    // Keep "x minutes ago" labels of polled check-ins current
+    setInterval(refreshRelativeTimes, 30000);
+    
+    // Receive check-ins and payments as they happen
+    connectLiveFeed();
 });
 
+// Live feed: one Server-Sent Events connection per dashboard tab
+// Each event is re-dispatched as a 'dashboard:live' DOM event for the widgets
+window.dashboardLiveConnected = false;
+
+function connectLiveFeed() {
+    if (!window.EventSource || !document.querySelector('.activity-card')) return;
+    
+    const source = new EventSource('/dashboard/live/');
+    
+    source.onopen = () => {
+        window.dashboardLiveConnected = true;
+    };
+    
+    // The browser reconnects on its own; widgets fall back to polling meanwhile
+    source.onerror = () => {
+        window.dashboardLiveConnected = false;
+    };
+    
+    source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        document.dispatchEvent(new CustomEvent('dashboard:live', { detail: event }));
+    };
+}
+
+// Relative time for an ISO timestamp, e.g. "5 minutes ago"
+function formatTimeAgo(isoTime) {
+    const seconds = Math.max(0, Math.floor((Date.now() - new Date(isoTime).getTime()) / 1000));
+    if (seconds < 60) {
+        return 'Just now';
+    }
+    if (seconds < 3600) {
+        const minutes = Math.floor(seconds / 60);
+        return `${minutes} minute${minutes !== 1 ? 's' : ''} ago`;
+    }
+    const hours = Math.floor(seconds / 3600);
+    return `${hours} hour${hours !== 1 ? 's' : ''} ago`;
+}
+
+// Update relative times computed in the browser (server-rendered items show clock time)
+function refreshRelativeTimes() {
+    document.querySelectorAll('.activity-time[data-relative]').forEach(el => {
+        el.textContent = formatTimeAgo(el.dataset.time);
+    });
+}
+
 // Animate stat cards
 function animateStatCards() {
     const statCards = document.querySelectorAll('.stat-card');
@@ -87,13 +138,6 @@ function setupRevenueToggle() {
     // Always start hidden on page load
     let isHidden = true;
     
-    // Get values from data attributes
-    const todayValue = revenueAmount.dataset.today;
-    const monthlyValue = revenueMonthly.dataset.monthly;
-    
-    console.log('[REVENUE TOGGLE] Today value:', todayValue);
-    console.log('[REVENUE TOGGLE] Monthly value:', monthlyValue);
-    
     // Format number with commas
     function formatCurrency(value) {
         const num = parseFloat(value);
@@ -103,27 +147,15 @@ function setupRevenueToggle() {
         });
     }
     
-    // Hide revenue immediately on page load (always default to hidden)
-    const todayAsterisks = '₱' + '*'.repeat(formatCurrency(todayValue).length);
-    const monthlyAsterisks = '₱' + '*'.repeat(formatCurrency(monthlyValue).length);
-    
-    revenueAmount.textContent = todayAsterisks;
-    revenueMonthly.textContent = monthlyAsterisks;
-    
-    // Show eye-off icon
-    eyeIcon.style.display = 'none';
-    eyeOffIcon.style.display = 'block';
-    
-    toggleBtn.addEventListener('click', () => {
-        isHidden = !isHidden;
+    // Values are read from the data attributes each time, since the live feed updates today's
+    function renderRevenue() {
+        const todayValue = revenueAmount.dataset.today;
+        const monthlyValue = revenueMonthly.dataset.monthly;
         
         if (isHidden) {
             // Hide revenue - show asterisks
-            const todayAsterisks = '₱' + '*'.repeat(formatCurrency(todayValue).length);
-            const monthlyAsterisks = '₱' + '*'.repeat(formatCurrency(monthlyValue).length);
-            
-            revenueAmount.textContent = todayAsterisks;
-            revenueMonthly.textContent = monthlyAsterisks;
+            revenueAmount.textContent = '₱' + '*'.repeat(formatCurrency(todayValue).length);
+            revenueMonthly.textContent = '₱' + '*'.repeat(formatCurrency(monthlyValue).length);
             
             // Swap icons
             eyeIcon.style.display = 'none';
@@ -137,11 +169,28 @@ function setupRevenueToggle() {
             eyeIcon.style.display = 'block';
             eyeOffIcon.style.display = 'none';
         }
+    }
+    
+    // Hide revenue immediately on page load (always default to hidden)
+    renderRevenue();
+    
+    toggleBtn.addEventListener('click', () => {
+        isHidden = !isHidden;
+        renderRevenue();
         
         console.log('[REVENUE TOGGLE] Is hidden:', isHidden);
         console.log('[REVENUE TOGGLE] Today displayed:', revenueAmount.textContent);
         console.log('[REVENUE TOGGLE] Monthly displayed:', revenueMonthly.textContent);
     });
+    
+    // Monthly revenue moves by the same amount as today's
+    document.addEventListener('dashboard:live', (e) => {
+        const previousToday = parseFloat(revenueAmount.dataset.today);
+        const currentToday = parseFloat(e.detail.counters.today_revenue);
+        revenueMonthly.dataset.monthly = parseFloat(revenueMonthly.dataset.monthly) + (currentToday - previousToday);
+        revenueAmount.dataset.today = currentToday;
+        renderRevenue();
+    });
 }
 
 // Optional: Auto-refresh dashboard data (if needed)
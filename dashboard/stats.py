@@ -0,0 +1,51 @@
+"""
+Dashboard statistics shared by the dashboard page and the get_stats endpoint
+Today's counters come from the live DashboardStats row; month and member
+numbers from a fixed set of conditional-aggregate queries
+"""
+from django.db.models import Count, Sum, Q
+
+from .models import DashboardStats
+from memberships.models import Member
+from metrics.models import DailyRollup, HourlyAttendance
+
+
+def dashboard_stats(today):
+    """
+    Dashboard numbers for a Manila business date in three queries:
+    the day's live counters row, the month's revenue and the member counts
+    """
+    month_start = today.replace(day=1)
+    counters = DashboardStats.for_date(today)
+
+    monthly_revenue = DailyRollup.objects.filter(
+        date__gte=month_start,
+        date__lte=today
+    ).aggregate(total=Sum('revenue'))['total']
+
+    members = Member.objects.filter(is_deleted=False).aggregate(
+        expiring_soon=Count('id', filter=Q(status=Member.EXPIRING)),
+        new_members=Count('id', filter=Q(business_date__gte=month_start, business_date__lte=today)),
+    )
+
+    return {
+        'daily_walk_ins': counters.daily_walk_ins,
+        'member_check_ins': counters.member_check_ins,
+        'check_ins_today': counters.total_check_ins,
+        'active_in_gym': counters.in_gym,
+        'today_revenue': counters.total_revenue,
+        'monthly_revenue': monthly_revenue or 0,
+        'active_members': counters.active_members,
+        'expiring_soon': members['expiring_soon'],
+        'new_members': members['new_members'],
+    }
+
+
+def peak_hours(today):
+    """Member check-ins plus walk-ins for each Manila hour of a date, in one query"""
+    counts = [0] * 24
+    for hour, check_ins, walk_ins in HourlyAttendance.objects.filter(date=today).values_list(
+        'hour', 'check_in_count', 'walk_in_count'
+    ):
+        counts[hour] += check_ins + walk_ins
+    return [{'hour': hour, 'count': count} for hour, count in enumerate(counts)]
@@ -1,3 +1,329 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from datetime import timedelta
+from django.utils import timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from .models import GymCheckIn, DashboardStats
+from .stats import dashboard_stats
+from .activity import activity_feed, encode_cursor, decode_cursor
+from .checkin import log_member_checkin, log_checkin_batch, CheckInRefused
+from .occupancy import check_out, expire_visits
+from memberships.models import Member
+from memberships.cards import card_token
+from payments.models import Payment
+from metrics.utils import local_today
+from users.models import StaffUser
+
+
+def create_member(member_id, name='Member', days_left=10):
+    """A member whose membership started ten days ago and runs for `days_left` more"""
+    today = local_today()
+    return Member.objects.create(
+        member_id=member_id,
+        name=name,
+        phone_number='09170000000',
+        address='Manila',
+        emergency_contact='Contact',
+        emergency_phone='09170000001',
+        start_date=today - timedelta(days=10),
+        end_date=today + timedelta(days=days_left),
+        membership_fee=Decimal('1000.00'),
+    )
+
+
+class DashboardTestCase(TestCase):
+    """A day with five members checked in (GYM0000 to GYM0004, all still in the gym) and five walk-ins"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = StaffUser.objects.create_user(username='owner', password='testpass123', email='owner@example.com')
+        # Start the day's counters so the writes below increment them
+        DashboardStats.reconcile(local_today())
+        for index in range(5):
+            member = create_member(f'GYM{index:04d}', name=f'Member {index}', days_left=index)
+            GymCheckIn.objects.create(member=member)
+            Payment.objects.create(
+                stored_member_id='GYMMSGUEST',
+                stored_member_name=f'Guest {index}',
+                amount=Decimal('100.00'),
+            )
+
+    def setUp(self):
+        # Check-in rule state and the expiry sweep throttle are cached; start every test cold
+        cache.clear()
+
+
+class DashboardStatsTests(DashboardTestCase):
+    """The dashboard must not issue more queries as the day's activity grows"""
+
+    # Session, user, expiry sweep, counters, month revenue, members, recent activity and peak hours
+    DASHBOARD_QUERY_BUDGET = 10
+
+    def test_dashboard_stats_query_count(self):
+        with self.assertNumQueries(3):
+            stats = dashboard_stats(local_today())
+        self.assertEqual(stats['daily_walk_ins'], 5)
+        self.assertEqual(stats['member_check_ins'], 5)
+        self.assertEqual(stats['active_in_gym'], 5)
+        self.assertEqual(stats['active_members'], 5)
+        self.assertEqual(stats['today_revenue'], Decimal('500.00'))
+
+    def test_dashboard_view_query_budget(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), self.DASHBOARD_QUERY_BUDGET)
+
+    def test_dashboard_view_leaves_member_statuses_to_the_nightly_command(self):
+        self.client.force_login(self.user)
+        with mock.patch('memberships.status.refresh_statuses') as refresh:
+            self.client.get(reverse('dashboard:dashboard'))
+        refresh.assert_not_called()
+
+    def test_get_stats_query_budget(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:get_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), self.DASHBOARD_QUERY_BUDGET)
+
+
+class DashboardCountersTests(DashboardTestCase):
+    """The day's counters row is moved by signals and agrees with the raw rows"""
+
+    def test_live_counters_match_reconciled_counts(self):
+        today = local_today()
+        live = DashboardStats.for_date(today)
+        rebuilt = DashboardStats.reconcile(today)
+        for field in ('daily_walk_ins', 'total_check_ins', 'member_check_ins', 'in_gym',
+                      'total_revenue', 'active_members', 'new_members'):
+            self.assertEqual(getattr(live, field), getattr(rebuilt, field), field)
+
+    def test_write_to_a_date_without_counters_builds_them(self):
+        today = local_today()
+        DashboardStats.objects.filter(date=today).delete()
+        Payment.objects.create(stored_member_id='GYMMSGUEST', stored_member_name='Late Guest', amount=Decimal('100.00'))
+        stats = DashboardStats.objects.get(date=today)
+        self.assertEqual(stats.daily_walk_ins, 6)
+        self.assertEqual(stats.total_revenue, Decimal('600.00'))
+
+    def test_back_dated_write_leaves_other_dates_to_their_first_read(self):
+        last_year = local_today() - timedelta(days=365)
+        Payment.objects.create(
+            stored_member_id='GYMMSGUEST',
+            stored_member_name='Old Guest',
+            amount=Decimal('100.00'),
+            payment_date=timezone.now() - timedelta(days=365),
+        )
+        self.assertFalse(DashboardStats.objects.filter(date=last_year).exists())
+        stats = DashboardStats.for_date(last_year)
+        self.assertEqual((stats.daily_walk_ins, stats.total_revenue), (1, Decimal('100.00')))
+
+
+class LockOrderTests(DashboardTestCase):
+    """Writers lock the day's counters row before the rollup rows, as check_capacity does"""
+
+    ROLLUP_TABLES = ('metrics_dailyrollup', 'metrics_dailypaymentmethodrollup',
+                     'metrics_hourlyattendance', 'metrics_activemembersnapshot')
+
+    def assertCountersLockedFirst(self, queries):
+        def first_lock(tables):
+            return min(
+                index for index, query in enumerate(queries.captured_queries)
+                if any(f'"{table}"' in query['sql'] for table in tables)
+                and (query['sql'].startswith('UPDATE') or query['sql'].endswith('FOR UPDATE'))
+            )
+        self.assertLess(first_lock(('dashboard_dashboardstats',)), first_lock(self.ROLLUP_TABLES))
+
+    @override_settings(GYM_MAX_CAPACITY=50)
+    def test_checkin_and_its_delete(self):
+        create_member('GYM0600', name='Lock Member')
+        with CaptureQueriesContext(connection) as queries:
+            checkin = log_member_checkin('GYM0600')
+        self.assertCountersLockedFirst(queries)
+        with CaptureQueriesContext(connection) as queries:
+            checkin.delete()
+        self.assertCountersLockedFirst(queries)
+
+    def test_payment_and_its_move_to_another_day(self):
+        DashboardStats.reconcile(local_today() - timedelta(days=1))
+        with CaptureQueriesContext(connection) as queries:
+            payment = Payment.objects.create(stored_member_id='GYMMSGUEST', stored_member_name='Guest', amount=Decimal('100.00'))
+        self.assertCountersLockedFirst(queries)
+        with CaptureQueriesContext(connection) as queries:
+            payment.payment_date -= timedelta(days=1)
+            payment.save()
+        self.assertCountersLockedFirst(queries)
+
+
+class LiveFeedTests(DashboardTestCase):
+    """Only writes to today reach live dashboards, whose tiles show today"""
+
+    def test_back_dated_writes_are_not_published(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        with mock.patch('dashboard.live.publish') as publish:
+            GymCheckIn.objects.create(
+                member=Member.objects.get(member_id='GYM0001'),
+                check_in_time=yesterday,
+                date=local_today() - timedelta(days=1),
+            )
+            payment = Payment.objects.create(
+                stored_member_id='GYMMSGUEST',
+                stored_member_name='Late Guest',
+                amount=Decimal('100.00'),
+                payment_date=yesterday,
+            )
+            payment.delete()
+        publish.assert_not_called()
+
+    def test_todays_walk_in_is_published(self):
+        with mock.patch('dashboard.live.publish') as publish:
+            Payment.objects.create(stored_member_id='GYMMSGUEST', stored_member_name='Guest', amount=Decimal('100.00'))
+        publish.assert_called_once()
+
+
+class ActivityFeedTests(DashboardTestCase):
+    """The recent activity feed merges check-ins and payments, one page per query"""
+
+    def test_activity_feed_pages_by_keyset(self):
+        today = local_today()
+        with self.assertNumQueries(1):
+            page = activity_feed(today, limit=3)
+        seen = list(page)
+        while len(page) == 3:
+            page = activity_feed(today, limit=3, before=decode_cursor(encode_cursor(page[-1])))
+            seen.extend(page)
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len({(event['type'], event['id']) for event in seen}), 10)
+        self.assertEqual([event['time'] for event in seen], sorted((event['time'] for event in seen), reverse=True))
+
+    def tie_all_events(self):
+        """Give every check-in and walk-in the same timestamp and return the whole feed"""
+        tied = timezone.now().replace(microsecond=0)
+        GymCheckIn.objects.update(check_in_time=tied)
+        Payment.objects.update(payment_date=tied)
+        return activity_feed(local_today(), limit=50)
+
+    def test_since_returns_events_newer_than_the_cursor_despite_ties(self):
+        feed = self.tie_all_events()
+        self.assertEqual(len(feed), 10)
+        for position, event in enumerate(feed):
+            with self.subTest(position=position):
+                newer = activity_feed(local_today(), since=decode_cursor(encode_cursor(event)))
+                self.assertEqual(newer, feed[:position])
+
+    def test_get_stats_polls_by_cursor(self):
+        self.client.force_login(self.user)
+        feed = self.tie_all_events()
+        url = reverse('dashboard:get_stats')
+
+        data = self.client.get(url, {'since': encode_cursor(feed[4])}).json()
+        self.assertEqual(
+            [(event['type'], event['id']) for event in data['recent_check_ins']],
+            [(event['type'], event['id']) for event in feed[:4]]
+        )
+        self.assertEqual(data['cursor'], encode_cursor(feed[0]))
+
+        # Nothing newer: the cursor stays where it was
+        data = self.client.get(url, {'since': encode_cursor(feed[0])}).json()
+        self.assertEqual(data['recent_check_ins'], [])
+        self.assertEqual(data['cursor'], encode_cursor(feed[0]))
+
+        # A missing or malformed cursor returns the whole day
+        data = self.client.get(url, {'since': 'not-a-cursor'}).json()
+        self.assertEqual(len(data['recent_check_ins']), 10)
+
+
+class CheckInTests(DashboardTestCase):
+    """A single check-in enforces the daily rules in a short transaction"""
+
+    # Savepoint, member lock, rule aggregate, insert, four counter updates and release (9),
+    # plus creating the hour's attendance row if the clock just ticked over (5)
+    CHECKIN_QUERY_BUDGET = 14
+
+    def test_checkin_cooldown_refuses_second_tap(self):
+        with self.assertRaises(CheckInRefused) as refused:
+            log_member_checkin('GYM0000')
+        self.assertEqual(refused.exception.extra['time_left_minutes'], 60)
+        self.assertEqual(GymCheckIn.objects.filter(member__member_id='GYM0000').count(), 1)
+        # The refusal cached the member's state: the next tap is answered without a query
+        with self.assertNumQueries(0):
+            with self.assertRaises(CheckInRefused):
+                log_member_checkin('GYM0000')
+
+    def test_checkin_write_query_budget(self):
+        create_member('GYM0400', name='Budget Member')
+        with CaptureQueriesContext(connection) as queries:
+            log_member_checkin('GYM0400')
+        self.assertLessEqual(len(queries), self.CHECKIN_QUERY_BUDGET)
+        self.assertEqual(DashboardStats.for_date(local_today()).member_check_ins, 6)
+
+
+class CheckInBatchTests(DashboardTestCase):
+    """Devices replay offline check-ins in batches"""
+
+    def test_checkin_batch_is_idempotent_on_replay(self):
+        member = create_member('GYM0100', name='Batch Member')
+        now = timezone.now()
+        events = [
+            {'member_id': 'GYM0100', 'device_id': 'turnstile-1', 'timestamp': (now - timedelta(minutes=90)).isoformat()},
+            {'member_id': 'GYM0100', 'device_id': 'turnstile-1', 'timestamp': (now - timedelta(minutes=80)).isoformat()},
+            {'member_id': 'NOSUCH', 'device_id': 'turnstile-1', 'timestamp': now.isoformat()},
+        ]
+        first = log_checkin_batch(events)
+        self.assertEqual([result['status'] for result in first], ['accepted', 'refused', 'refused'])
+        replay = log_checkin_batch(events)
+        self.assertEqual(replay[0]['status'], 'duplicate')
+        self.assertEqual(member.check_ins.count(), 1)
+
+    @override_settings(GYM_SESSION_MINUTES=180)
+    def test_checkin_batch_replay_older_than_a_session_is_not_in_gym(self):
+        create_member('GYM0500', name='Offline Member')
+        timestamp = timezone.now() - timedelta(hours=4)
+        result = log_checkin_batch([{'member_id': 'GYM0500', 'device_id': 'kiosk-1', 'timestamp': timestamp.isoformat()}])
+        self.assertEqual(result[0]['status'], 'accepted')
+        checkin = GymCheckIn.objects.get(pk=result[0]['checkin_id'])
+        self.assertEqual(checkin.check_out_time, checkin.check_in_time + timedelta(minutes=180))
+        stats = DashboardStats.for_date(checkin.date)
+        self.assertEqual(stats.in_gym, DashboardStats.reconcile(checkin.date).in_gym)
+
+
+class CardCheckInTests(DashboardTestCase):
+    """Member cards carry a signed token that checks the member in"""
+
+    def test_scan_checkin_verifies_card_token(self):
+        self.client.force_login(self.user)
+        member = create_member('GYM0200', name='Card Member')
+        forged = card_token(member).rsplit(':', 1)[0] + ':forged'
+        response = self.client.post(reverse('dashboard:scan_checkin'), {'token': forged}, content_type='application/json')
+        self.assertFalse(response.json()['success'])
+        response = self.client.post(reverse('dashboard:scan_checkin'), {'token': card_token(member)}, content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(member.check_ins.count(), 1)
+
+
+class OccupancyTests(DashboardTestCase):
+    """Who is in the gym: capacity at check-in, check-outs and expiry"""
+
+    @override_settings(GYM_MAX_CAPACITY=5)
+    def test_checkin_refused_at_capacity_until_someone_leaves(self):
+        member = create_member('GYM0300', name='Late Member')
+        with self.assertRaises(CheckInRefused):
+            log_member_checkin('GYM0300')
+        check_out(GymCheckIn.objects.filter(member__member_id='GYM0000').get().id)
+        self.assertEqual(DashboardStats.for_date(local_today()).in_gym, 4)
+        log_member_checkin('GYM0300')
+        self.assertEqual(member.check_ins.count(), 1)
+
+    @override_settings(GYM_SESSION_MINUTES=180)
+    def test_expire_visits_closes_overstayed_visits(self):
+        checkin = GymCheckIn.objects.filter(member__member_id='GYM0001').get()
+        GymCheckIn.objects.filter(pk=checkin.pk).update(check_in_time=timezone.now() - timedelta(hours=4))
+        self.assertEqual(expire_visits(), 1)
+        self.assertEqual(DashboardStats.for_date(local_today()).in_gym, 4)
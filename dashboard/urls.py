@@ -7,6 +7,12 @@ urlpatterns = [
     path("", views.dashboard, name="dashboard"),
     path("search-active-members/", views.search_active_members, name="search_active_members"),
     path("log-checkin/", views.log_checkin, name="log_checkin"),
+    path("scan-checkin/", views.scan_checkin, name="scan_checkin"),
+    path("log-checkin/batch/", views.log_checkin_batch_view, name="log_checkin_batch"),
+    path("check-out/", views.check_out_view, name="check_out"),
+    path("occupancy/", views.get_occupancy, name="get_occupancy"),
     path("get-stats/", views.get_stats, name="get_stats"),
+    path("activity/", views.get_activity, name="get_activity"),
+    path("live/", views.live_feed, name="live_feed"),
     path("debug-checkins/", views.debug_checkins, name="debug_checkins"),
 ]
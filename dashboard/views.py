@@ -1,16 +1,22 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Count, Sum, Q
-from django.http import JsonResponse
+from django.conf import settings
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
-from datetime import timedelta, datetime
 import json
 import zoneinfo
 
 from .models import GymCheckIn, DashboardStats
-from memberships.models import Member
-from payments.models import Payment
+from memberships.cards import member_id_from_token
+from memberships.search import search_members
+from memberships.status import EXPIRING_SOON_DAYS
+from .stats import dashboard_stats, peak_hours
+from .activity import activity_feed, activity_json, encode_cursor, decode_cursor, ACTIVITY_PAGE_SIZE, POLL_EVENT_LIMIT
+from .live import event_stream
+from .checkin import log_member_checkin, log_checkin_batch, CheckInRefused, MAX_BATCH_EVENTS
+from .occupancy import check_out, current_occupancy, expire_due_visits
 
 @login_required
 def dashboard(request):
@@ -20,181 +26,42 @@ def dashboard(request):
     manila_now = now.astimezone(manila_tz)
     today = manila_now.date()
     
-    # Get today's check-ins
-    today_check_ins = GymCheckIn.objects.filter(date=today)
-    
-    # Calculate start and end of today in Manila timezone
-    manila_today_start = datetime.combine(today, datetime.min.time()).replace(tzinfo=manila_tz)
-    manila_today_end = datetime.combine(today, datetime.max.time()).replace(tzinfo=manila_tz)
-    
-    # Daily walk-ins (guest payments only - GYMMSGUEST)
-    daily_walk_ins = Payment.objects.filter(
-        payment_date__gte=manila_today_start,
-        payment_date__lte=manila_today_end,
-        stored_member_id='GYMMSGUEST',
-        status='Completed'
-    ).count()
-    
-    # Member check-ins (unique registered members who checked in today)
-    member_check_ins = today_check_ins.values('member').distinct().count()
-    
-    # Active members currently in gym (checked in but not checked out)
-    active_in_gym = today_check_ins.filter(check_out_time__isnull=True).count()
-    
-    # Monthly statistics
-    month_start = today.replace(day=1)
-    
-    # Total active members
-    total_active_members = Member.objects.filter(is_active=True, is_deleted=False).count()
-    
-    # New members this month (exclude deleted members)
-    new_members_this_month = Member.objects.filter(
-        date_created__gte=month_start,
-        date_created__lte=now,
-        is_deleted=False
-    ).count()
-    
-    # Revenue statistics
-    # Debug: Print today's date for verification
-    print(f"[DASHBOARD REVENUE] Today's date (Manila): {today}")
-    print(f"[DASHBOARD REVENUE] Manila now: {manila_now}")
-    print(f"[DASHBOARD REVENUE] UTC now: {now}")
-    
-    # Calculate start and end of today in Manila timezone
-    manila_today_start = datetime.combine(today, datetime.min.time()).replace(tzinfo=manila_tz)
-    manila_today_end = datetime.combine(today, datetime.max.time()).replace(tzinfo=manila_tz)
-    
-    print(f"[DASHBOARD REVENUE] Today start (Manila): {manila_today_start}")
-    print(f"[DASHBOARD REVENUE] Today end (Manila): {manila_today_end}")
-    
-    # Get today's payments with detailed logging
-    today_payments = Payment.objects.filter(
-        payment_date__gte=manila_today_start,
-        payment_date__lte=manila_today_end,
-        status='Completed'
-    )
-    print(f"[DASHBOARD REVENUE] Today's payment count: {today_payments.count()}")
-    for payment in today_payments:
-        print(f"[DASHBOARD REVENUE] Payment: {payment.id} - Amount: {payment.amount} - Date: {payment.payment_date} - Status: {payment.status}")
-    
-    today_revenue = today_payments.aggregate(total=Sum('amount'))['total'] or 0
-    print(f"[DASHBOARD REVENUE] Today's total revenue: {today_revenue}")
-    
-    # Calculate start of month in Manila timezone
-    month_start_dt = datetime.combine(month_start, datetime.min.time()).replace(tzinfo=manila_tz)
-    
-    # Get monthly payments
-    monthly_payments = Payment.objects.filter(
-        payment_date__gte=month_start_dt,
-        payment_date__lte=manila_now,
-        status='Completed'
-    )
-    print(f"[DASHBOARD REVENUE] Monthly payment count: {monthly_payments.count()}")
-    
-    monthly_revenue = monthly_payments.aggregate(total=Sum('amount'))['total'] or 0
-    print(f"[DASHBOARD REVENUE] Monthly total revenue: {monthly_revenue}")
-    
-    # Recent check-ins - combine member check-ins and walk-in payments
-    # Get member check-ins (ALL, no limit)
-    member_checkins = list(today_check_ins.select_related('member').order_by('-check_in_time'))
-    
-    # Get walk-in payments from today (ALL, no limit)
-    walkin_payments = Payment.objects.filter(
-        payment_date__gte=manila_today_start,
-        payment_date__lte=manila_today_end,
-        stored_member_id='GYMMSGUEST',
-        status='Completed'
-    ).order_by('-payment_date')
-    
-    # Combine both into a unified list with consistent structure
-    combined_checkins = []
-    
-    # Add member check-ins
-    for checkin in member_checkins:
-        photo_url = checkin.member.photo.url if checkin.member.photo else None
-        combined_checkins.append({
-            'type': 'member',
-            'name': checkin.member.name,
-            'photo': photo_url,
-            'time': checkin.check_in_time,
-            'check_out_time': checkin.check_out_time,
-            'duration': None  # We'll calculate this in template
-        })
+    # Close overstayed visits so the in-gym count is current. The only write left on this read:
+    # it runs at most once a minute across workers and updates nothing unless a visit overstayed,
+    # which keeps the count right without an expire_visits cron every minute.
+    # Member statuses are refreshed by the nightly refresh_member_statuses command
+    expire_due_visits()
     
-    # Add walk-in payments
-    for payment in walkin_payments:
-        combined_checkins.append({
-            'type': 'walkin',
-            'name': payment.stored_member_name,
-            'photo': None,  # Walk-ins don't have photos
-            'time': payment.payment_date,
-            'check_out_time': None,
-            'duration': None
-        })
+    # Walk-ins, check-ins, in-gym count, revenue and member counts in a fixed number of queries
+    stats = dashboard_stats(today)
     
-    # Sort by time (most recent first) - NO LIMIT
-    combined_checkins.sort(key=lambda x: x['time'], reverse=True)
-    recent_check_ins = combined_checkins
-    
-    # Membership expiring soon (within 3 days, exclude deleted members)
-    expiring_soon = Member.objects.filter(
-        is_active=True,
-        is_deleted=False,
-        end_date__gte=today,
-        end_date__lte=today + timedelta(days=3)
-    ).count()
-    
-    # Peak hours data (check-ins by hour today) - Use Manila timezone for hour extraction
-    # Include both member check-ins and walk-in payments
-    peak_hours_raw = today_check_ins.select_related('member')
-    
-    # Get walk-in payments from today
-    walkin_payments_for_peak = Payment.objects.filter(
-        payment_date__gte=manila_today_start,
-        payment_date__lte=manila_today_end,
-        stored_member_id='GYMMSGUEST',
-        status='Completed'
-    )
-    
-    # Convert to Manila timezone and group by hour
-    from collections import defaultdict
-    hour_counts = defaultdict(int)
-    
-    # Add member check-ins
-    for checkin in peak_hours_raw:
-        # Convert check_in_time to Manila timezone
-        manila_checkin_time = checkin.check_in_time.astimezone(manila_tz)
-        hour = manila_checkin_time.hour
-        hour_counts[hour] += 1
-    
-    # Add walk-in payments
-    for payment in walkin_payments_for_peak:
-        # Convert payment_date to Manila timezone
-        manila_payment_time = payment.payment_date.astimezone(manila_tz)
-        hour = manila_payment_time.hour
-        hour_counts[hour] += 1
-    
-    # Convert to list format
-    peak_hours_data = []
-    for hour, count in hour_counts.items():
-        peak_hours_data.append({
-            'hour': hour,
-            'count': count
-        })
+    # Recent check-ins - newest member check-ins and walk-in payments, one bounded query
+    recent_check_ins = activity_feed(today)
+    
+    # Polling cursor: get_stats only returns events after the newest one shown
+    activity_cursor = encode_cursor(recent_check_ins[0]) if recent_check_ins else ''
+    
+    # "Load more" cursor, only when the window is full
+    more_cursor = encode_cursor(recent_check_ins[-1]) if len(recent_check_ins) == ACTIVITY_PAGE_SIZE else ''
     
-    # Sort by hour
-    peak_hours_data.sort(key=lambda x: x['hour'])
+    # Peak hours data (member check-ins plus walk-ins by Manila hour today)
+    peak_hours_data = peak_hours(today)
     
     context = {
-        'daily_walk_ins': daily_walk_ins,
-        'member_check_ins': member_check_ins,
-        'active_in_gym': active_in_gym,
-        'today_revenue': today_revenue,
-        'monthly_revenue': monthly_revenue,
-        'active_members': total_active_members,
-        'expiring_soon': expiring_soon,
-        'new_members': new_members_this_month,
+        'daily_walk_ins': stats['daily_walk_ins'],
+        'member_check_ins': stats['member_check_ins'],
+        'active_in_gym': stats['active_in_gym'],
+        'gym_capacity': settings.GYM_MAX_CAPACITY,
+        'today_revenue': stats['today_revenue'],
+        'monthly_revenue': stats['monthly_revenue'],
+        'active_members': stats['active_members'],
+        'expiring_soon': stats['expiring_soon'],
+        'expiring_soon_days': EXPIRING_SOON_DAYS,
+        'new_members': stats['new_members'],
         'recent_check_ins': recent_check_ins,
+        'total_check_ins': stats['check_ins_today'] + stats['daily_walk_ins'],
+        'activity_cursor': activity_cursor,
+        'more_cursor': more_cursor,
         'peak_hours': json.dumps(peak_hours_data),  # JSON for JavaScript
         'current_time': now,
     }
@@ -211,33 +78,15 @@ def search_active_members(request):
     if len(query) < 2:
         return JsonResponse({'members': []})
     
-    today = timezone.now().date()
-    expiring_threshold = today + timedelta(days=7)
-    
-    # Search members (active, expiring, and inactive)
-    members = Member.objects.filter(
-        is_deleted=False
-    ).filter(
-        Q(member_id__icontains=query) |
-        Q(name__icontains=query)
-    )[:10]
+    # Search members (active, expiring, and inactive), best match first
+    members = search_members(query)
     
     results = []
     for member in members:
-        # Determine status based on end_date and is_active flag
-        if member.end_date < today:
-            status = 'expired'
-        elif not member.is_active:
-            status = 'inactive'
-        elif member.end_date <= expiring_threshold:
-            status = 'expiring'
-        else:
-            status = 'active'
-        
         results.append({
             'member_id': member.member_id,
             'name': member.name,
-            'status': status,
+            'status': member.status,
             'end_date': member.end_date.strftime('%Y-%m-%d'),
             'photo': member.photo.url if member.photo else None
         })
@@ -259,69 +108,13 @@ def log_checkin(request):
             print("[CHECK-IN] Error: No member_id provided")
             return JsonResponse({'success': False, 'error': 'Member ID is required'})
         
-        # Get member
+        # Rules and insert in one transaction, with the member row locked
         try:
-            member = Member.objects.get(member_id=member_id, is_deleted=False)
-            print(f"[CHECK-IN] Found member: {member.name} ({member.member_id})")
-        except Member.DoesNotExist:
-            print(f"[CHECK-IN] Error: Member {member_id} not found")
-            return JsonResponse({'success': False, 'error': 'Member not found'})
-        
-        # Check if member is active or expiring soon
-        today = timezone.now().date()
-        if member.end_date < today:
-            print(f"[CHECK-IN] Error: Member {member_id} has expired")
-            return JsonResponse({'success': False, 'error': 'Member membership has expired. Please renew membership first.'})
-        
-        if not member.is_active:
-            print(f"[CHECK-IN] Error: Member {member_id} is inactive")
-            return JsonResponse({'success': False, 'error': 'Member account is inactive. Please process payment first.'})
-        
-        # Get Manila timezone for accurate time comparison
-        manila_tz = zoneinfo.ZoneInfo('Asia/Manila')
-        now = timezone.now()
-        manila_now = now.astimezone(manila_tz)
-        
-        # Check how many times member has checked in today (max 3)
-        today_checkins = GymCheckIn.objects.filter(
-            member=member,
-            date=today
-        ).order_by('-check_in_time')
-        
-        today_checkins_count = today_checkins.count()
-        
-        if today_checkins_count >= 3:
-            print(f"[CHECK-IN] Error: Member {member_id} has reached maximum check-ins (3) for today")
-            return JsonResponse({'success': False, 'error': 'Maximum check-ins (3) reached for today.'})
-        
-        # Check if member has checked in recently (within last hour)
-        if today_checkins_count > 0:
-            last_checkin = today_checkins.first()
-            last_checkin_time = last_checkin.check_in_time.astimezone(manila_tz)
-            time_diff = manila_now - last_checkin_time
-            time_diff_minutes = int(time_diff.total_seconds() / 60)
-            
-            if time_diff_minutes < 60:
-                # Calculate remaining time
-                remaining_minutes = 60 - time_diff_minutes
-                hours = remaining_minutes // 60
-                minutes = remaining_minutes % 60
-                
-                if hours > 0:
-                    time_left = f"{hours} hour{'s' if hours != 1 else ''} and {minutes} minute{'s' if minutes != 1 else ''}"
-                else:
-                    time_left = f"{minutes} minute{'s' if minutes != 1 else ''}"
-                
-                print(f"[CHECK-IN] Error: Member {member_id} checked in {time_diff_minutes} minutes ago. Must wait {remaining_minutes} more minutes.")
-                return JsonResponse({
-                    'success': False, 
-                    'error': f'Please wait {time_left} before checking in again.',
-                    'time_left_minutes': remaining_minutes
-                })
-        
-        # Create check-in record (member can check in up to 3 times)
-        checkin = GymCheckIn.objects.create(member=member)
-        print(f"[CHECK-IN] Success: Created check-in record ID {checkin.id} for {member.name} at {checkin.check_in_time}")
+            checkin = log_member_checkin(member_id)
+        except CheckInRefused as e:
+            print(f"[CHECK-IN] Refused for member {member_id}: {e.message}")
+            return JsonResponse({'success': False, 'error': e.message, **e.extra})
+        print(f"[CHECK-IN] Success: Created check-in record ID {checkin.id} for {checkin.member.name} at {checkin.check_in_time}")
         
         return JsonResponse({'success': True, 'checkin_id': checkin.id})
         
@@ -332,103 +125,157 @@ def log_checkin(request):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+@login_required
+@require_http_methods(["POST"])
+def scan_checkin(request):
+    """
+    Log a check-in from a scanned member card
+    The signature is checked before any query; the member is then read by exact member_id
+    """
+    try:
+        token = json.loads(request.body).get('token') or ''
+        member_id = member_id_from_token(str(token))
+    except (ValueError, AttributeError, signing.BadSignature):
+        print("[CHECK-IN] Error: Unrecognised card scanned")
+        return JsonResponse({'success': False, 'error': 'Card not recognised. Please search for the member instead.'})
+    
+    try:
+        checkin = log_member_checkin(member_id)
+    except CheckInRefused as e:
+        print(f"[CHECK-IN] Refused for member {member_id}: {e.message}")
+        return JsonResponse({'success': False, 'error': e.message, **e.extra})
+    print(f"[CHECK-IN] Success: Card check-in ID {checkin.id} for {checkin.member.name}")
+    
+    return JsonResponse({'success': True, 'checkin_id': checkin.id, 'member_name': checkin.member.name})
+
+
+@login_required
+@require_http_methods(["POST"])
+def log_checkin_batch_view(request):
+    """
+    Log a batch of check-ins from a kiosk or turnstile
+    Body: {"events": [{"member_id", "device_id", "timestamp"}, ...]}; replaying a batch is safe
+    """
+    try:
+        events = json.loads(request.body).get('events')
+    except (ValueError, AttributeError):
+        events = None
+    
+    if not isinstance(events, list) or not events:
+        return JsonResponse({'success': False, 'error': 'A list of events is required'}, status=400)
+    
+    if len(events) > MAX_BATCH_EVENTS:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_BATCH_EVENTS} events per batch'}, status=400)
+    
+    results = log_checkin_batch(events)
+    accepted = sum(1 for result in results if result['status'] == 'accepted')
+    print(f"[CHECK-IN] Batch of {len(events)} events: {accepted} accepted")
+    
+    return JsonResponse({'success': True, 'results': results})
+
+
 @login_required
 @require_http_methods(["GET"])
 def get_stats(request):
-    """Get updated dashboard statistics for AJAX refresh"""
+    """
+    Get updated dashboard statistics for AJAX refresh
+    `since` is the cursor of the newest event the browser already shows; only
+    newer events are returned, so each poll costs the same all day
+    """
     # Get current time in Manila timezone
     manila_tz = zoneinfo.ZoneInfo('Asia/Manila')
     now = timezone.now()
     manila_now = now.astimezone(manila_tz)
     today = manila_now.date()
     
-    # Get today's check-ins
-    today_check_ins = GymCheckIn.objects.filter(date=today)
-    
-    # Calculate today's date range in Manila timezone
-    manila_today_start = datetime.combine(today, datetime.min.time()).replace(tzinfo=manila_tz)
-    manila_today_end = datetime.combine(today, datetime.max.time()).replace(tzinfo=manila_tz)
-    
-    # Daily walk-ins (guest payments only - GYMMSGUEST)
-    daily_walk_ins = Payment.objects.filter(
-        payment_date__gte=manila_today_start,
-        payment_date__lte=manila_today_end,
-        stored_member_id='GYMMSGUEST',
-        status='Completed'
-    ).count()
-    
-    # Member check-ins (registered members who checked in today)
-    member_check_ins = today_check_ins.count()
-    
-    # Recent check-ins - combine member check-ins and walk-in payments
-    # Get member check-ins (ALL, no limit)
-    member_checkins = list(today_check_ins.select_related('member').order_by('-check_in_time'))
-    
-    # Get walk-in payments from today (ALL, no limit)
-    walkin_payments = Payment.objects.filter(
-        payment_date__gte=manila_today_start,
-        payment_date__lte=manila_today_end,
-        stored_member_id='GYMMSGUEST',
-        status='Completed'
-    ).order_by('-payment_date')
-    
-    # Combine both into a unified list
-    combined_checkins = []
-    
-    # Add member check-ins
-    for ci in member_checkins:
-        photo_url = ci.member.photo.url if ci.member.photo else None
-        combined_checkins.append({
-            'type': 'member',
-            'name': ci.member.name,
-            'photo': photo_url,
-            'time': ci.check_in_time,
-            'check_out_time': ci.check_out_time
-        })
+    # Same (time, kind, id) cursor as "load more": events sharing a timestamp aren't skipped
+    since = decode_cursor(request.GET.get('since', '').strip())
     
-    # Add walk-in payments
-    for payment in walkin_payments:
-        combined_checkins.append({
-            'type': 'walkin',
-            'name': payment.stored_member_name,
-            'photo': None,
-            'time': payment.payment_date,
-            'check_out_time': None
-        })
+    # Today's live counters: a single row instead of re-counting every poll
+    counters = DashboardStats.for_date(today)
     
-    # Sort by time (most recent first) - NO LIMIT
-    combined_checkins.sort(key=lambda x: x['time'], reverse=True)
-    recent_check_ins = combined_checkins
-    
-    # Format recent check-ins
-    recent_list = []
-    for item in recent_check_ins:
-        # Calculate time ago
-        time_diff = timezone.now() - item['time']
-        if time_diff.seconds < 60:
-            time_ago = "Just now"
-        elif time_diff.seconds < 3600:
-            minutes = time_diff.seconds // 60
-            time_ago = f"{minutes} minute{'s' if minutes != 1 else ''} ago"
-        else:
-            hours = time_diff.seconds // 3600
-            time_ago = f"{hours} hour{'s' if hours != 1 else ''} ago"
-        
-        recent_list.append({
-            'type': item['type'],
-            'member_name': item['name'],
-            'photo': item['photo'],
-            'time_ago': time_ago,
-        })
+    # Only the events after the cursor (all of today's when no cursor is given)
+    new_events = activity_feed(today, limit=POLL_EVENT_LIMIT, since=since)
+    
+    # Relative times are computed client-side from the ISO timestamp
+    recent_list = [activity_json(item) for item in new_events]
+    
+    cursor = encode_cursor(new_events[0]) if new_events else (request.GET.get('since', '').strip() if since else '')
     
     return JsonResponse({
         'success': True,
-        'daily_walk_ins': daily_walk_ins,
-        'member_check_ins': member_check_ins,
-        'recent_check_ins': recent_list
+        'daily_walk_ins': counters.daily_walk_ins,
+        'member_check_ins': counters.total_check_ins,
+        'total_check_ins': counters.total_check_ins + counters.daily_walk_ins,
+        'active_in_gym': counters.in_gym,
+        'recent_check_ins': recent_list,
+        'cursor': cursor,
     })
 
 
+@login_required
+@require_http_methods(["POST"])
+def check_out_view(request):
+    """Check a member out of the gym, freeing their place"""
+    try:
+        checkin_id = int(json.loads(request.body).get('checkin_id'))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Check-in ID is required'}, status=400)
+    
+    checkin = check_out(checkin_id)
+    if checkin is None:
+        return JsonResponse({'success': False, 'error': 'This visit has already been checked out.'})
+    print(f"[CHECK-OUT] Check-in ID {checkin.id} checked out at {checkin.check_out_time}")
+    
+    return JsonResponse({'success': True, 'checkin_id': checkin.id})
+
+
+@login_required
+@require_http_methods(["GET"])
+def get_occupancy(request):
+    """Current occupancy for displays that poll often; never reads GymCheckIn"""
+    manila_tz = zoneinfo.ZoneInfo('Asia/Manila')
+    today = timezone.now().astimezone(manila_tz).date()
+    
+    return JsonResponse({'success': True, **current_occupancy(today)})
+
+
+@login_required
+@require_http_methods(["GET"])
+def get_activity(request):
+    """
+    Next page of today's recent activity for "load more"
+    `before` is the cursor of the last event shown; pages are read by keyset, not offset
+    """
+    manila_tz = zoneinfo.ZoneInfo('Asia/Manila')
+    today = timezone.now().astimezone(manila_tz).date()
+    
+    before = decode_cursor(request.GET.get('before', ''))
+    if before is None:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+    
+    events = activity_feed(today, before=before)
+    
+    return JsonResponse({
+        'success': True,
+        'events': [activity_json(item) for item in events],
+        'next_cursor': encode_cursor(events[-1]) if len(events) == ACTIVITY_PAGE_SIZE else '',
+    })
+
+
+@login_required
+async def live_feed(request):
+    """
+    Server-Sent Events stream of check-ins, walk-ins and counter changes
+    Replaces get_stats polling while the browser stays connected
+    """
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def debug_checkins(request):
     """Debug endpoint to check check-in data"""
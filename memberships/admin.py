@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Member, MembershipConfig
+from .search import matching
 
 
 @admin.register(Member)
@@ -52,6 +53,12 @@ class MemberAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        # Same trigram-indexed match as the app's member search, instead of an icontains scan per field
+        if not search_term.strip():
+            return queryset, False
+        return matching(queryset, search_term), False
+    
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new object
             obj.created_by = request.user
@@ -0,0 +1,60 @@
+"""
+Browser member index
+A compact copy of the member table that the check-in and payment pages keep in
+IndexedDB and search locally, so typing ahead needs no request. After the first
+download a browser only asks for members changed since its last sync; hard
+deletes reach it through tombstones, and a browser away longer than they are
+kept downloads everything again
+"""
+from django.utils import timezone
+from datetime import timedelta
+
+from .models import Member, MemberTombstone
+
+
+# A member saved just before a sync can commit just after it; every delta re-reads this window
+SYNC_OVERLAP = timedelta(minutes=5)
+
+# Tombstones of hard-deleted members are kept this long; older cursors get a full download
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+INDEX_FIELDS = ('member_id', 'name', 'phone_number', 'email', 'photo', 'has_photo', 'status', 'end_date', 'is_deleted')
+
+
+def index_entry(member):
+    """One member as the browser stores it"""
+    return {
+        'member_id': member.member_id,
+        'name': member.name,
+        'phone_number': member.phone_number,
+        'email': member.email or '',
+        'photo': member.photo.url if member.has_photo else None,
+        'status': member.status,
+        'end_date': member.end_date.isoformat(),
+        'deleted': member.is_deleted,
+    }
+
+
+def member_index(since=None):
+    """
+    (entries, cursor, full) for a full download, or with `since` (a previous cursor)
+    the members changed after it; soft- and hard-deleted ones come flagged so browsers drop them
+    """
+    cursor = timezone.now()
+    if since is not None and since < cursor - TOMBSTONE_RETENTION:
+        since = None
+
+    if since is None:
+        MemberTombstone.objects.filter(deleted_at__lt=cursor - TOMBSTONE_RETENTION).delete()
+        members = Member.objects.filter(is_deleted=False).only(*INDEX_FIELDS).order_by()
+        return [index_entry(member) for member in members.iterator(chunk_size=2000)], cursor, True
+
+    window = since - SYNC_OVERLAP
+    # Tombstones first, so a member ID deleted and then reused ends up present
+    entries = [
+        {'member_id': member_id, 'deleted': True}
+        for member_id in MemberTombstone.objects.filter(deleted_at__gte=window).values_list('member_id', flat=True)
+    ]
+    members = Member.objects.filter(updated_at__gte=window).only(*INDEX_FIELDS).order_by()
+    entries += [index_entry(member) for member in members.iterator(chunk_size=2000)]
+    return entries, cursor, False
@@ -0,0 +1,52 @@
+"""
+Member list
+The memberships page's filter, search and sort, done in the database so each
+request reads one page of members however many there are. Status filters use
+the stored Member.status and search goes through memberships.search
+"""
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Case, IntegerField, Value, When
+
+from .models import Member
+from .search import matching, MIN_QUERY_LENGTH
+
+
+MEMBERS_PER_PAGE = 25
+PER_PAGE_OPTIONS = (10, 25, 50, 100)
+
+STATUS_FILTERS = ('all', Member.ACTIVE, Member.EXPIRING, Member.EXPIRED, Member.INACTIVE)
+
+# Sort options of the list; `id` breaks ties so pages never overlap
+SORT_ORDERS = {
+    'newest': ('-date_created', '-id'),
+    'oldest': ('date_created', 'id'),
+    'name': ('name', 'id'),
+    # Expiring soon first, then by end date
+    'expiring': ('-expiring', 'end_date', 'id'),
+}
+
+
+def member_list(status='all', query='', sort='newest'):
+    """Non-deleted members with a status (or all), matching a search, in a sort order"""
+    members = Member.objects.filter(is_deleted=False).select_related('created_by')
+    if status in STATUS_FILTERS and status != 'all':
+        members = members.filter(status=status)
+    query = query.strip()
+    if len(query) >= MIN_QUERY_LENGTH:
+        members = matching(members, query)
+    if sort == 'expiring':
+        members = members.annotate(expiring=Case(
+            When(status=Member.EXPIRING, then=Value(1)), default=Value(0), output_field=IntegerField()
+        ))
+    return members.order_by(*SORT_ORDERS.get(sort, SORT_ORDERS['newest']))
+
+
+def member_page(members, page, per_page=MEMBERS_PER_PAGE):
+    """(page, paginator) for a page number from the query string; out-of-range numbers are clamped"""
+    paginator = Paginator(members, per_page)
+    try:
+        return paginator.page(page), paginator
+    except PageNotAnInteger:
+        return paginator.page(1), paginator
+    except EmptyPage:
+        return paginator.page(paginator.num_pages), paginator
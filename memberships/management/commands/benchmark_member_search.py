@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.benchmarks import throwaway_database
+from datetime import timedelta
+from decimal import Decimal
+import random
+import time
+from memberships.models import Member
+from memberships.search import search_members
+from metrics.utils import local_today
+
+
+BENCH_PREFIX = 'BM'
+
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Angel', 'John', 'Grace', 'Paolo', 'Liza', 'Carlo', 'Joy']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Villanueva', 'Ramos']
+
+QUERIES = ['BM00', 'Santos', 'maria cruz', 'vill', '0917', 'grace@', 'BM054321', 'zzzz']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark member search latency on a throwaway test database of synthetic members (default: 100,000)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100000, help='Synthetic members to insert (default: 100000)')
+        parser.add_argument('--runs', type=int, default=20, help='Runs per query (default: 20)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Creating a throwaway test database (the live database is not touched)...'))
+        with throwaway_database():
+            self.benchmark(options['members'], options['runs'])
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def benchmark(self, count, runs):
+        self.stdout.write(self.style.WARNING(f'Inserting {count} synthetic members...'))
+        self.create_members(count)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Member._meta.db_table}')
+
+        for query in QUERIES:
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                results = list(search_members(query))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'  {query!r:14} {len(results):2} results  '
+                f'median {timings[len(timings) // 2]:6.1f} ms  max {timings[-1]:6.1f} ms'
+            )
+
+        # Show that the plan uses the trigram indexes rather than a sequential scan
+        sql, params = search_members('Santos').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = [row[0] for row in cursor.fetchall()]
+        self.stdout.write('  Plan for \'Santos\':')
+        for line in plan:
+            self.stdout.write(f'    {line}')
+
+    def create_members(self, count):
+        today = local_today()
+        batch = []
+        for index in range(count):
+            first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+            batch.append(Member(
+                member_id=f'{BENCH_PREFIX}{index:06d}',
+                name=f'{first} {last}',
+                email=f'{first.lower()}.{last.lower()}{index}@example.com',
+                phone_number=f'09{random.randint(100000000, 999999999)}',
+                address='Benchmark',
+                emergency_contact='Benchmark',
+                emergency_phone='09000000000',
+                start_date=today - timedelta(days=random.randint(0, 365)),
+                end_date=today + timedelta(days=random.randint(-30, 365)),
+                membership_fee=Decimal('1000.00'),
+            ))
+            if len(batch) == 5000:
+                Member.objects.bulk_create(batch)
+                batch = []
+        Member.objects.bulk_create(batch)
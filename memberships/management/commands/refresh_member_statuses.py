@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from memberships.status import refresh_statuses
+
+
+class Command(BaseCommand):
+    help = 'Move member statuses along as memberships start expiring or expire (run from cron just after midnight)'
+
+    def handle(self, *args, **options):
+        changed = refresh_statuses()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the status of {changed} member(s) for {timezone.localdate()}'
+        ))
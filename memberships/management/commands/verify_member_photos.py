@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from memberships.photos import verify_photos
+
+
+class Command(BaseCommand):
+    help = 'Check member photo files against storage and update has_photo (run from cron nightly, and after migrating)'
+
+    def handle(self, *args, **options):
+        missing, restored = verify_photos()
+        self.stdout.write(self.style.SUCCESS(
+            f'Photos verified: {missing} missing, {restored} restored'
+        ))
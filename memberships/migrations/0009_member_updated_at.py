@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0008_member_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Last change, for browser member index sync'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:05
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_status(apps, schema_editor):
+    # Same rule as memberships.status (historical models can't import it)
+    Member = apps.get_model('memberships', 'Member')
+    today = timezone.localdate()
+    expiring_until = today + timedelta(days=7)
+    Member.objects.filter(end_date__lt=today).update(status='expired')
+    Member.objects.filter(is_active=False, end_date__gte=today).update(status='inactive')
+    Member.objects.filter(is_active=True, end_date__gte=today, end_date__lte=expiring_until).update(status='expiring')
+    Member.objects.filter(is_active=True, end_date__gt=expiring_until).update(status='active')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0009_member_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('expiring', 'Expiring Soon'), ('expired', 'Expired'), ('inactive', 'Inactive')], default='inactive', editable=False, help_text='Derived from is_active and end_date on save and by the nightly refresh_member_statuses command', max_length=10),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['status'], name='member_status_idx'),
+        ),
+    ]
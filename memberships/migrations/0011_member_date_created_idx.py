@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0010_member_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['date_created', 'id'], name='member_date_created_idx'),
+        ),
+    ]
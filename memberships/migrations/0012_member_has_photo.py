@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+def backfill_has_photo(apps, schema_editor):
+    # Trusts the photo column; run verify_member_photos afterwards to check storage
+    Member = apps.get_model('memberships', 'Member')
+    Member.objects.exclude(photo__isnull=True).exclude(photo='').update(has_photo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0011_member_date_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='has_photo',
+            field=models.BooleanField(default=False, editable=False, help_text='Photo file is in storage; set on save and checked by the verify_member_photos command'),
+        ),
+        migrations.RunPython(backfill_has_photo, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 
 from django.db import models
+from django.db.models import DEFERRED
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
@@ -25,6 +29,18 @@ class Member(models.Model):
         ('Female', 'Female'),
     ]
     
+    # Membership status, kept by memberships.status
+    ACTIVE = 'active'
+    EXPIRING = 'expiring'
+    EXPIRED = 'expired'
+    INACTIVE = 'inactive'
+    STATUS_CHOICES = [
+        (ACTIVE, 'Active'),
+        (EXPIRING, 'Expiring Soon'),
+        (EXPIRED, 'Expired'),
+        (INACTIVE, 'Inactive'),
+    ]
+    
     # Basic Information
     member_id = models.CharField(
         max_length=10,
@@ -46,6 +62,11 @@ class Member(models.Model):
     
     # Photo
     photo = models.ImageField(upload_to=member_photo_path, blank=True, null=True)
+    has_photo = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text='Photo file is in storage; set on save and checked by the verify_member_photos command'
+    )
     
     # Emergency Contact
     emergency_contact = models.CharField(max_length=100)
@@ -66,6 +87,13 @@ class Member(models.Model):
         help_text='Monthly fee at the time of registration/renewal'
     )
     is_active = models.BooleanField(default=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=INACTIVE,
+        editable=False,
+        help_text='Derived from is_active and end_date on save and by the nightly refresh_member_statuses command'
+    )
     
     # Tracking
     created_by = models.ForeignKey(
@@ -76,6 +104,13 @@ class Member(models.Model):
         related_name='created_members'
     )
     date_created = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, help_text='Last change, for browser member index sync')
+    business_date = models.DateField(
+        null=True,
+        editable=False,
+        db_index=True,
+        help_text='Manila date of date_created, set automatically on save'
+    )
     
     # Soft Delete
     is_deleted = models.BooleanField(default=False)
@@ -84,6 +119,40 @@ class Member(models.Model):
     def __str__(self):
         return f"{self.name} ({self.member_id})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        member = super().from_db(db, field_names, values)
+        # The row as read, so save signals can tell what changed without reading it again
+        member._stored_values = dict(zip(field_names, (value for value in values if value is not DEFERRED)))
+        return member
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('_stored_values', None)
+    
+    def stored_values(self):
+        """
+        The member's row as the database holds it ({attname: value}), or None for a new member
+        Kept from the load and the last save; a member built by hand, partly loaded or
+        refreshed reads its row once and keeps that
+        """
+        if self._state.adding:
+            return None
+        stored = self.__dict__.get('_stored_values')
+        if stored is None or len(stored) < len(self._meta.concrete_fields):
+            stored = Member.objects.filter(pk=self.pk).values().first()
+            self._stored_values = stored
+        return stored
+    
+    def remember_stored_values(self, update_fields=None):
+        """Record what a save just wrote as the stored row"""
+        stored = self.__dict__.get('_stored_values') or {}
+        for field in self._meta.concrete_fields:
+            if update_fields is None or field.name in update_fields:
+                value = field.value_from_object(self)
+                stored[field.attname] = value.name if isinstance(value, FieldFile) else value
+        self._stored_values = stored
+    
     def is_membership_active(self):
         """
         Check if the membership is still valid
@@ -99,12 +168,11 @@ class Member(models.Model):
         today = timezone.now().date()
         return (self.end_date - today).days
     
-    def is_expiring_soon(self, days=7):
+    def is_expiring_soon(self):
         """
-        Check if membership is expiring within specified days
+        Check if membership is expiring soon (see memberships.status)
         """
-        days_left = self.days_until_expiry()
-        return 0 <= days_left <= days
+        return self.status == self.EXPIRING
     
     class Meta:
         ordering = ['-date_created']
@@ -112,9 +180,29 @@ class Member(models.Model):
             models.Index(fields=['member_id']),
             models.Index(fields=['is_active']),
             models.Index(fields=['end_date']),
+            models.Index(fields=['status'], name='member_status_idx'),
+            # Member list's default newest-first order, read a page at a time
+            models.Index(fields=['date_created', 'id'], name='member_date_created_idx'),
+            # Trigram indexes for memberships.search (substring match on UPPER(column))
+            GinIndex(OpClass(Upper('member_id'), name='gin_trgm_ops'), name='member_member_id_trgm_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='member_name_trgm_idx'),
+            GinIndex(OpClass(Upper('phone_number'), name='gin_trgm_ops'), name='member_phone_trgm_idx'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='member_email_trgm_idx'),
         ]
 
 
+class MemberTombstone(models.Model):
+    """
+    A hard-deleted member, kept so browser member indexes can drop it
+    Pruned once older than memberships.index.TOMBSTONE_RETENTION
+    """
+    member_id = models.CharField(max_length=10)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f"{self.member_id} (deleted {self.deleted_at})"
+
+
 class MembershipConfig(models.Model):
     """
     Global configuration for membership fees
@@ -0,0 +1,38 @@
+"""
+Member photo integrity
+Pages decide whether to show a member's photo from the stored Member.has_photo
+flag instead of asking storage per row. Saves keep the flag right; this check
+catches files removed or restored behind the app's back (a cleared media
+volume, a restored backup) and runs from cron, off the request path
+"""
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Member
+
+
+def verify_photos():
+    """
+    Compare every member photo with storage and fix has_photo where they disagree
+    Returns (missing, restored): members whose file has gone, and whose file is back
+    updated_at is bumped too so browser member indexes drop or show the photo
+    """
+    missing, restored = [], []
+    members = Member.objects.exclude(photo__isnull=True).exclude(photo='').only('id', 'photo', 'has_photo')
+    for member in members.iterator(chunk_size=500):
+        try:
+            exists = default_storage.exists(member.photo.name)
+        except Exception:
+            # Storage unreachable: leave the flag until a later run can tell
+            continue
+        if member.has_photo and not exists:
+            missing.append(member.id)
+        elif exists and not member.has_photo:
+            restored.append(member.id)
+
+    now = timezone.now()
+    if missing:
+        Member.objects.filter(id__in=missing).update(has_photo=False, updated_at=now)
+    if restored:
+        Member.objects.filter(id__in=restored).update(has_photo=True, updated_at=now)
+    return len(missing), len(restored)
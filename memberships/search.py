@@ -0,0 +1,56 @@
+"""
+Member search
+Every member lookup (check-in search, payment member search, admin) goes through
+here. Matching is a case-insensitive substring test on member ID, name, phone
+and email, served by pg_trgm GIN indexes on UPPER(column) instead of a
+sequential scan; results are ranked by trigram similarity and limited in the
+database
+"""
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from .models import Member
+
+
+# Columns searched; each has a trigram index on UPPER(column) (see Member.Meta.indexes)
+SEARCH_FIELDS = ('member_id', 'name', 'phone_number', 'email')
+
+# Shorter queries match too much to be useful
+MIN_QUERY_LENGTH = 2
+
+# Results returned to search-as-you-type endpoints
+SEARCH_LIMIT = 10
+
+
+def matching(queryset, query):
+    """Members of `queryset` with `query` in any search field, as an indexed trigram match"""
+    needle = query.strip().upper()
+    terms = Q()
+    for field in SEARCH_FIELDS:
+        # UPPER(column) LIKE '%NEEDLE%' is what the expression indexes cover
+        queryset = queryset.alias(**{f'{field}_upper': Upper(field)})
+        terms |= Q(**{f'{field}_upper__contains': needle})
+    return queryset.filter(terms)
+
+
+def search_members(query, limit=SEARCH_LIMIT, queryset=None):
+    """
+    Non-deleted members matching `query`, best match first, at most `limit`
+    An exact member ID comes first, then trigram similarity across the fields
+    """
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return Member.objects.none()
+    if queryset is None:
+        queryset = Member.objects.filter(is_deleted=False)
+
+    return matching(queryset, query).annotate(
+        exact=Case(When(member_id__iexact=query, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        rank=Greatest(
+            TrigramSimilarity('member_id', query),
+            TrigramWordSimilarity(query, 'name'),
+            TrigramSimilarity('phone_number', query),
+            TrigramWordSimilarity(query, 'email'),
+        ),
+    ).order_by('-exact', '-rank', 'name')[:limit]
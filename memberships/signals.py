@@ -0,0 +1,47 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Member, MemberTombstone
+from .status import membership_status
+
+
+@receiver(pre_save, sender=Member)
+def set_member_business_date(sender, instance, **kwargs):
+    """
+    Keep business_date in step with date_created (Manila date)
+    date_created is only filled after this signal for new members, so use now
+    """
+    instance.business_date = timezone.localdate(instance.date_created or timezone.now())
+
+
+@receiver(pre_save, sender=Member)
+def set_member_status(sender, instance, **kwargs):
+    """Keep status in step with is_active and end_date (payments, edits, new members)"""
+    instance.status = membership_status(instance.is_active, instance.end_date)
+
+
+@receiver(pre_save, sender=Member)
+def set_member_has_photo(sender, instance, raw=False, **kwargs):
+    """
+    An assigned photo is written to storage by this save; a removed one was deleted with it
+    Saves that leave the photo alone keep the flag, so one verify_photos found missing stays off
+    """
+    if raw:
+        return
+    previous = instance.stored_values()
+    if previous is not None and (previous['photo'] or '') == (instance.photo.name or ''):
+        return
+    instance.has_photo = bool(instance.photo)
+
+
+@receiver(post_save, sender=Member)
+def remember_saved_member(sender, instance, raw=False, update_fields=None, **kwargs):
+    """The saved values are what the next save of this instance compares against"""
+    if not raw:
+        instance.remember_stored_values(update_fields)
+
+
+@receiver(post_delete, sender=Member)
+def record_member_tombstone(sender, instance, **kwargs):
+    """Hard deletes leave no row with a fresh updated_at; a tombstone tells browser indexes instead"""
+    MemberTombstone.objects.create(member_id=instance.member_id)
@@ -0,0 +1,214 @@
+/**
+ * Member Index
+ * Keeps a copy of the member list in IndexedDB so the check-in and payment
+ * searches run in the browser. The first visit downloads every member; later
+ * syncs only fetch the members changed since the last one (see memberships/index.py)
+ */
+
+(function() {
+    const DB_NAME = 'gymms-members';
+    // Bumped when entries change shape; an upgrade starts over with a full download
+    const DB_VERSION = 2;
+    const INDEX_URL = '/memberships/index/';
+    const SYNC_INTERVAL = 60 * 1000;
+
+    let db = null;
+    let members = new Map();
+    let cursor = '';
+    let syncing = null;
+
+    function openDatabase() {
+        return new Promise((resolve, reject) => {
+            if (!window.indexedDB) {
+                reject(new Error('IndexedDB is not available'));
+                return;
+            }
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                const upgraded = request.result;
+                Array.from(upgraded.objectStoreNames).forEach(name => upgraded.deleteObjectStore(name));
+                upgraded.createObjectStore('members', { keyPath: 'member_id' });
+                upgraded.createObjectStore('meta');
+            };
+            request.onsuccess = () => {
+                // Let logout (or a newer version) delete the database
+                request.result.onversionchange = () => {
+                    request.result.close();
+                    db = null;
+                };
+                resolve(request.result);
+            };
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    // Session gone: nothing about members stays in this browser
+    function forget() {
+        members = new Map();
+        cursor = '';
+        if (db) {
+            db.close();
+            db = null;
+        }
+        if (window.indexedDB) {
+            indexedDB.deleteDatabase(DB_NAME);
+        }
+    }
+
+    function readAll() {
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(['members', 'meta'], 'readonly');
+            const entries = tx.objectStore('members').getAll();
+            const saved = tx.objectStore('meta').get('cursor');
+            tx.oncomplete = () => resolve({ entries: entries.result, cursor: saved.result || '' });
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function store(data) {
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(['members', 'meta'], 'readwrite');
+            const memberStore = tx.objectStore('members');
+            if (data.full) {
+                memberStore.clear();
+            }
+            data.members.forEach(entry => {
+                if (entry.deleted) {
+                    memberStore.delete(entry.member_id);
+                } else {
+                    memberStore.put(entry);
+                }
+            });
+            tx.objectStore('meta').put(data.cursor, 'cursor');
+            tx.oncomplete = () => resolve();
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function apply(data) {
+        if (data.full) {
+            members = new Map();
+        }
+        data.members.forEach(entry => {
+            if (entry.deleted) {
+                members.delete(entry.member_id);
+            } else {
+                members.set(entry.member_id, prepare(entry));
+            }
+        });
+    }
+
+    // Lowercased text searched against, built once per entry
+    function prepare(entry) {
+        entry.haystack = [entry.member_id, entry.name, entry.phone_number, entry.email].join('\n').toLowerCase();
+        return entry;
+    }
+
+    async function sync() {
+        if (syncing) {
+            return syncing;
+        }
+        syncing = (async () => {
+            const url = cursor ? `${INDEX_URL}?since=${encodeURIComponent(cursor)}` : INDEX_URL;
+            const response = await fetch(url, { credentials: 'same-origin' });
+            // login_required sends expired sessions to the login page
+            if (response.redirected || response.status === 401 || response.status === 403) {
+                forget();
+                throw new Error('Member index sync needs a signed-in session');
+            }
+            if (!response.ok) {
+                throw new Error(`Member index sync failed (${response.status})`);
+            }
+            const data = await response.json();
+            apply(data);
+            if (db) {
+                await store(data);
+            }
+            cursor = data.cursor;
+        })();
+        try {
+            await syncing;
+        } finally {
+            syncing = null;
+        }
+    }
+
+    // The fields the search callers expect; status is the server's stored one
+    function result(entry) {
+        return {
+            member_id: entry.member_id,
+            name: entry.name,
+            phone_number: entry.phone_number,
+            email: entry.email,
+            photo: entry.photo,
+            end_date: entry.end_date,
+            status: entry.status,
+            is_expiring_soon: entry.status === 'expiring',
+        };
+    }
+
+    /**
+     * Best `limit` matches for a query: exact member ID, then prefix matches, then the rest
+     */
+    function search(query, limit = 10) {
+        const needle = query.trim().toLowerCase();
+        if (needle.length < 2) {
+            return [];
+        }
+        const ranked = [];
+        members.forEach(entry => {
+            const position = entry.haystack.indexOf(needle);
+            if (position === -1) {
+                return;
+            }
+            let rank = 2;
+            if (entry.member_id.toLowerCase() === needle) {
+                rank = 0;
+            } else if (position === 0 || entry.haystack[position - 1] === '\n' || entry.haystack[position - 1] === ' ') {
+                rank = 1;
+            }
+            ranked.push({ rank, entry });
+        });
+        ranked.sort((a, b) => a.rank - b.rank || a.entry.name.localeCompare(b.entry.name));
+        return ranked.slice(0, limit).map(item => result(item.entry));
+    }
+
+    async function load() {
+        try {
+            db = await openDatabase();
+            const saved = await readAll();
+            saved.entries.forEach(entry => members.set(entry.member_id, prepare(entry)));
+            cursor = saved.cursor;
+        } catch (error) {
+            // Private windows may refuse IndexedDB; keep the index in memory only
+            console.warn('[MEMBER INDEX] IndexedDB unavailable, keeping the index in memory:', error);
+            db = null;
+        }
+        try {
+            await sync();
+        } catch (error) {
+            // Offline: an index from an earlier visit is still worth searching
+            console.error('[MEMBER INDEX] Could not sync the member index:', error);
+        }
+        return cursor !== '';
+    }
+
+    // Resolves to whether the index can be searched; callers fall back to the server if not
+    const ready = load();
+
+    setInterval(() => {
+        sync().catch(error => console.error('[MEMBER INDEX]', error));
+    }, SYNC_INTERVAL);
+
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible') {
+            sync().catch(error => console.error('[MEMBER INDEX]', error));
+        }
+    });
+
+    window.MemberIndex = {
+        ready: ready,
+        search: search,
+        sync: sync,
+    };
+})();
@@ -42,31 +42,8 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    // Search functionality
-    const searchInput = document.getElementById('searchInput');
-    if (searchInput) {
-        searchInput.addEventListener('input', filterMembers);
-    }
-
-    // Status filter
-    const statusFilter = document.getElementById('statusFilter');
-    if (statusFilter) {
-        statusFilter.addEventListener('change', filterMembers);
-    }
-
-    // Sort filter - default to newest
-    const sortFilter = document.getElementById('sortFilter');
-    if (sortFilter) {
-        sortFilter.value = 'newest'; // Set default to newest first
-        sortFilter.addEventListener('change', sortMembers);
-        // Trigger initial sort
-        sortMembers();
-    }
-
-    // Apply URL filter parameter if present
-    if (typeof filterParam !== 'undefined' && filterParam) {
-        applyUrlFilter(filterParam);
-    }
+    // Search, status filter, sort and paging are done by the server
+    setupMemberList();
 
     // Set default dates for add member form
     const startDateInput = document.getElementById('start_date');
@@ -163,43 +140,160 @@ function removePhotoPreview() {
     if (cameraInput) cameraInput.value = '';
 }
 
-// Search and Filter Members
-function filterMembers() {
-    const searchTerm = document.getElementById('searchInput').value.toLowerCase();
-    const statusFilter = document.getElementById('statusFilter').value;
-    const table = document.getElementById('membersTable');
-    const rows = table.getElementsByTagName('tbody')[0].getElementsByTagName('tr');
-
-    for (let row of rows) {
-        // Skip empty state row
-        if (row.cells.length === 1) continue;
-
-        const memberName = row.querySelector('.member-name')?.textContent.toLowerCase() || '';
-        const memberEmail = row.querySelector('.member-email')?.textContent.toLowerCase() || '';
-        const memberId = row.querySelector('.member-id')?.textContent.toLowerCase() || '';
-        const phone = row.cells[2]?.textContent.toLowerCase() || '';
-        const status = row.dataset.status || '';
-
-        // Check search match
-        const searchMatch = !searchTerm || 
-            memberName.includes(searchTerm) || 
-            memberEmail.includes(searchTerm) || 
-            memberId.includes(searchTerm) || 
-            phone.includes(searchTerm);
-
-        // Check status filter
-        let statusMatch = true;
-        if (statusFilter !== 'all') {
-            statusMatch = status === statusFilter;
+// ===== MEMBER LIST (server-side filter, search, sort and paging) =====
+
+const memberListState = {
+    q: '',
+    status: 'all',
+    sort: 'newest',
+    page: 1,
+    per_page: 25,
+};
+
+let memberListRequest = null;
+
+function setupMemberList() {
+    const searchInput = document.getElementById('searchInput');
+    const statusFilter = document.getElementById('statusFilter');
+    const sortFilter = document.getElementById('sortFilter');
+    const prevPageBtn = document.getElementById('prevPage');
+    const nextPageBtn = document.getElementById('nextPage');
+    const pageInput = document.getElementById('pageInput');
+    const perPageSelect = document.getElementById('perPageSelect');
+    if (!searchInput || !statusFilter || !sortFilter) return;
+
+    // The first page is rendered by the server with these values
+    memberListState.q = searchInput.value.trim();
+    memberListState.status = statusFilter.value;
+    memberListState.sort = sortFilter.value;
+    memberListState.page = parseInt(pageInput?.value) || 1;
+    memberListState.per_page = parseInt(perPageSelect?.value) || 25;
+
+    let searchTimeout = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(() => {
+            memberListState.q = searchInput.value.trim();
+            memberListState.page = 1;
+            loadMembers();
+        }, 300);
+    });
+
+    statusFilter.addEventListener('change', () => filterByStatus(statusFilter.value));
+
+    sortFilter.addEventListener('change', () => {
+        memberListState.sort = sortFilter.value;
+        memberListState.page = 1;
+        loadMembers();
+    });
+
+    prevPageBtn?.addEventListener('click', () => {
+        if (memberListState.page > 1) {
+            memberListState.page--;
+            loadMembers();
         }
+    });
 
-        // Show/hide row with smooth transition
-        if (searchMatch && statusMatch) {
-            row.style.display = '';
-        } else {
-            row.style.display = 'none';
+    nextPageBtn?.addEventListener('click', () => {
+        if (memberListState.page < parseInt(pageInput.max)) {
+            memberListState.page++;
+            loadMembers();
         }
+    });
+
+    pageInput?.addEventListener('change', () => {
+        const page = Math.min(Math.max(parseInt(pageInput.value) || 1, 1), parseInt(pageInput.max) || 1);
+        memberListState.page = page;
+        loadMembers();
+    });
+
+    perPageSelect?.addEventListener('change', () => {
+        memberListState.per_page = parseInt(perPageSelect.value);
+        memberListState.page = 1;
+        loadMembers();
+    });
+
+    // Back/forward between filtered views
+    window.addEventListener('popstate', () => {
+        const params = new URLSearchParams(window.location.search);
+        memberListState.q = params.get('q') || '';
+        memberListState.status = params.get('status') || 'all';
+        memberListState.sort = params.get('sort') || 'newest';
+        memberListState.page = parseInt(params.get('page')) || 1;
+        memberListState.per_page = parseInt(params.get('per_page')) || 25;
+        searchInput.value = memberListState.q;
+        statusFilter.value = memberListState.status;
+        sortFilter.value = memberListState.sort;
+        if (perPageSelect) perPageSelect.value = memberListState.per_page;
+        loadMembers(false);
+    });
+}
+
+function memberListParams() {
+    const params = new URLSearchParams();
+    if (memberListState.q) params.set('q', memberListState.q);
+    if (memberListState.status !== 'all') params.set('status', memberListState.status);
+    if (memberListState.sort !== 'newest') params.set('sort', memberListState.sort);
+    if (memberListState.page > 1) params.set('page', memberListState.page);
+    if (memberListState.per_page !== 25) params.set('per_page', memberListState.per_page);
+    return params;
+}
+
+// Fetch the current page of members and replace the table rows
+function loadMembers(pushHistory = true) {
+    const params = memberListParams();
+
+    // Keep the URL shareable and the back button working
+    if (pushHistory) {
+        const query = params.toString();
+        window.history.pushState({}, '', `${window.location.pathname}${query ? '?' + query : ''}`);
+    }
+
+    // Only the latest request's response is shown
+    if (memberListRequest) memberListRequest.abort();
+    memberListRequest = new AbortController();
+
+    fetch(`/memberships/list/?${params.toString()}`, { signal: memberListRequest.signal })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            document.querySelector('#membersTable tbody').innerHTML = data.html;
+            updateMemberPagination(data.pagination);
+
+            // Status badges of the new rows open the payment bridge
+            if (typeof initializePaymentBridge === 'function') {
+                initializePaymentBridge();
+            }
+        })
+        .catch(error => {
+            if (error.name === 'AbortError') return;
+            console.error('Error loading members:', error);
+            showNotification('Failed to load members. Please try again.', 'error');
+        });
+}
+
+function updateMemberPagination(pagination) {
+    const pageInput = document.getElementById('pageInput');
+    if (pageInput) {
+        pageInput.value = pagination.current_page;
+        pageInput.max = pagination.total_pages;
+    }
+
+    const paginationInfo = document.querySelector('.pagination-info');
+    if (paginationInfo) {
+        paginationInfo.textContent = `Showing ${pagination.start_index} to ${pagination.end_index} of ${pagination.total_count} members`;
     }
+
+    const prevPageBtn = document.getElementById('prevPage');
+    const nextPageBtn = document.getElementById('nextPage');
+    if (prevPageBtn) prevPageBtn.disabled = !pagination.has_previous;
+    if (nextPageBtn) nextPageBtn.disabled = !pagination.has_next;
+
+    memberListState.page = pagination.current_page;
 }
 
 // Filter by status (for clickable stat cards)
@@ -207,83 +301,10 @@ function filterByStatus(status) {
     const statusFilter = document.getElementById('statusFilter');
     if (statusFilter) {
         statusFilter.value = status;
-        filterMembers();
     }
-}
-
-// Sort Members
-function sortMembers() {
-    const sortValue = document.getElementById('sortFilter').value;
-    const table = document.getElementById('membersTable');
-    const tbody = table.getElementsByTagName('tbody')[0];
-    const rows = Array.from(tbody.getElementsByTagName('tr'));
-
-    // Skip if only empty state row
-    if (rows.length <= 1 && rows[0]?.cells.length === 1) return;
-
-    // Filter out empty state row if it exists
-    const dataRows = rows.filter(row => row.cells.length > 1);
-
-    dataRows.sort((a, b) => {
-        switch (sortValue) {
-            case 'newest':
-                const createdA = parseFloat(a.dataset.created || 0);
-                const createdB = parseFloat(b.dataset.created || 0);
-                return createdB - createdA; // Newest first
-            
-            case 'oldest':
-                const createdOldA = parseFloat(a.dataset.created || 0);
-                const createdOldB = parseFloat(b.dataset.created || 0);
-                return createdOldA - createdOldB; // Oldest first
-            
-            case 'name':
-                const nameA = (a.dataset.name || '').toLowerCase();
-                const nameB = (b.dataset.name || '').toLowerCase();
-                return nameA.localeCompare(nameB);
-            
-            case 'expiring':
-                const endDateA = new Date(a.dataset.endDate || '');
-                const endDateB = new Date(b.dataset.endDate || '');
-                const today = new Date();
-                
-                // Calculate days until expiry
-                const daysA = Math.ceil((endDateA - today) / (1000 * 60 * 60 * 24));
-                const daysB = Math.ceil((endDateB - today) / (1000 * 60 * 60 * 24));
-                
-                // Prioritize expiring soon (0-3 days), then sort by days
-                const isExpiringA = daysA >= 0 && daysA <= 3;
-                const isExpiringB = daysB >= 0 && daysB <= 3;
-                
-                if (isExpiringA && !isExpiringB) return -1;
-                if (!isExpiringA && isExpiringB) return 1;
-                
-                return daysA - daysB;
-            
-            case 'expired':
-                const expEndDateA = new Date(a.dataset.endDate || '');
-                const expEndDateB = new Date(b.dataset.endDate || '');
-                const nowDate = new Date();
-                
-                // Check if expired
-                const isExpiredA = expEndDateA < nowDate;
-                const isExpiredB = expEndDateB < nowDate;
-                
-                // Expired first, then sort by end date (most recently expired first)
-                if (isExpiredA && !isExpiredB) return -1;
-                if (!isExpiredA && isExpiredB) return 1;
-                
-                return expEndDateB - expEndDateA;
-            
-            default:
-                return 0;
-        }
-    });
-
-    // Clear tbody and re-append in sorted order without animation
-    tbody.innerHTML = '';
-    dataRows.forEach(row => {
-        tbody.appendChild(row);
-    });
+    memberListState.status = status;
+    memberListState.page = 1;
+    loadMembers();
 }
 
 // View Member Details - Both view and edit in one page
@@ -337,17 +358,13 @@ function performDelete(memberId) {
 	.then(response => response.json())
 	.then(data => {
 		if (data.success) {
-			// Remove row from table with animation
+			// Fade the row out, then reload the page so it stays full
 			const row = document.querySelector(`tr[data-member-id="${memberId}"]`);
 			if (row) {
 				row.style.transition = 'opacity 0.3s ease';
 				row.style.opacity = '0';
-				setTimeout(() => {
-					row.remove();
-					// Check if table is empty
-					checkEmptyTable();
-				}, 300);
 			}
+			setTimeout(() => loadMembers(false), 300);
 			
 			// Show success message (you can replace this with a toast notification)
 			showNotification('Member deleted successfully', 'success');
@@ -361,25 +378,6 @@ function performDelete(memberId) {
 	});
 }
 
-// Check if table is empty and show empty state
-function checkEmptyTable() {
-	const tbody = document.querySelector('#membersTable tbody');
-	const rows = tbody.querySelectorAll('tr');
-	const dataRows = Array.from(rows).filter(row => row.cells.length > 1);
-	
-	if (dataRows.length === 0) {
-		tbody.innerHTML = `
-			<tr>
-				<td colspan="7" class="empty-state">
-					<div class="empty-icon">👥</div>
-					<p>No members found</p>
-					<button class="btn-secondary" onclick="document.getElementById('addMemberBtn').click()">Add Your First Member</button>
-				</td>
-			</tr>
-		`;
-	}
-}
-
 // Show notification (simple version - you can enhance this)
 function showNotification(message, type = 'info') {
 	// Create notification element
@@ -452,43 +450,6 @@ function getCookie(name) {
     return cookieValue;
 }
 
-// Apply URL filter parameter
-function applyUrlFilter(filter) {
-    const statusFilter = document.getElementById('statusFilter');
-    const sortFilter = document.getElementById('sortFilter');
-    
-    switch(filter) {
-        case 'active':
-            // Set status filter to active
-            if (statusFilter) {
-                statusFilter.value = 'active';
-                filterMembers();
-            }
-            break;
-        
-        case 'expiring':
-            // Set status filter to expiring
-            if (statusFilter) {
-                statusFilter.value = 'expiring';
-                filterMembers();
-            }
-            // Optionally also sort by expiring
-            if (sortFilter) {
-                sortFilter.value = 'expiring';
-                sortMembers();
-            }
-            break;
-        
-        case 'newest':
-            // Already defaults to newest, just ensure it's set
-            if (sortFilter) {
-                sortFilter.value = 'newest';
-                sortMembers();
-            }
-            break;
-    }
-}
-
 // Form validation
 document.addEventListener('DOMContentLoaded', () => {
     const form = document.getElementById('addMemberForm');
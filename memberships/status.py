@@ -0,0 +1,64 @@
+"""
+Membership status
+The one definition of active, expiring soon, expired and inactive. Member.status
+stores it: set on every save (payments, edits) and moved along by the nightly
+refresh_member_statuses command as dates pass, so lists, filters and counts
+are indexed lookups instead of per-row date arithmetic
+"""
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+
+from .models import Member
+
+
+# Memberships ending within this many days are expiring soon
+EXPIRING_SOON_DAYS = 7
+
+# Statuses of members whose membership is still running
+CURRENT_STATUSES = (Member.ACTIVE, Member.EXPIRING)
+
+
+def membership_status(is_active, end_date, today=None):
+    """Status of a membership on a Manila date (today by default)"""
+    today = today or timezone.localdate()
+    if end_date < today:
+        return Member.EXPIRED
+    if not is_active:
+        return Member.INACTIVE
+    if end_date <= today + timedelta(days=EXPIRING_SOON_DAYS):
+        return Member.EXPIRING
+    return Member.ACTIVE
+
+
+def status_conditions(today):
+    """membership_status as one filter per status, for bulk updates"""
+    expiring_until = today + timedelta(days=EXPIRING_SOON_DAYS)
+    return {
+        Member.EXPIRED: Q(end_date__lt=today),
+        Member.INACTIVE: Q(is_active=False, end_date__gte=today),
+        Member.EXPIRING: Q(is_active=True, end_date__gte=today, end_date__lte=expiring_until),
+        Member.ACTIVE: Q(is_active=True, end_date__gt=expiring_until),
+    }
+
+
+def refresh_statuses(today=None):
+    """
+    Move every member whose stored status is out of date, one UPDATE per status
+    updated_at is bumped too so browser member indexes pick the change up
+    Returns the number of members changed
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    changed = 0
+    for status, condition in status_conditions(today).items():
+        changed += Member.objects.filter(condition).exclude(status=status).update(status=status, updated_at=now)
+    return changed
+
+
+def refresh_due_statuses():
+    """refresh_statuses once per Manila date across workers, for read paths if the nightly run was missed"""
+    today = timezone.localdate()
+    if cache.add(f'memberships:status-refresh:{today.isoformat()}', True, 60 * 60 * 24):
+        refresh_statuses(today)
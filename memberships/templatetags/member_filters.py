@@ -1,6 +1,4 @@
 from django import template
-from django.core.files.storage import default_storage
-import os
 
 register = template.Library()
 
@@ -8,14 +6,10 @@ register = template.Library()
 @register.filter(name='photo_exists')
 def photo_exists(photo_field):
     """
-    Check if a photo file actually exists on disk
+    Check if a member's photo file exists, from the stored Member.has_photo flag
+    No storage call is made; verify_member_photos keeps the flag honest
     Usage: {% if member.photo|photo_exists %}
     """
     if not photo_field:
         return False
-    
-    try:
-        # Check if file exists in storage
-        return default_storage.exists(photo_field.name)
-    except Exception:
-        return False
+    return getattr(photo_field.instance, 'has_photo', False)
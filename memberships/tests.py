@@ -1,3 +1,242 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.urls import reverse
+from datetime import timedelta
+from decimal import Decimal
+import shutil
+import tempfile
 
-# Create your tests here.
+from .models import Member
+from .search import search_members
+from .index import member_index, SYNC_OVERLAP, TOMBSTONE_RETENTION
+from .status import refresh_statuses
+from .listing import member_list, member_page
+from .photos import verify_photos
+from dashboard.models import DashboardStats
+from metrics.utils import local_today
+from users.models import StaffUser
+
+
+def create_member(member_id='GYM0000001', name='Maria Santos', phone_number='09171111111',
+                  start_date=None, end_date=None, is_active=True):
+    """A member starting today (by default) with a 30-day membership"""
+    start_date = start_date or local_today()
+    return Member.objects.create(
+        member_id=member_id,
+        name=name,
+        phone_number=phone_number,
+        address='Manila',
+        emergency_contact='Contact',
+        emergency_phone='09170000001',
+        start_date=start_date,
+        end_date=end_date or start_date + timedelta(days=30),
+        membership_fee=Decimal('1000.00'),
+        is_active=is_active,
+    )
+
+
+class MemberSearchTests(TestCase):
+    """Every member lookup shares one ranked, trigram-indexed search"""
+
+    def setUp(self):
+        for member_id, name, phone in [
+            ('GYM0000001', 'Maria Santos', '09171111111'),
+            ('GYM0000002', 'Mario Santiago', '09172222222'),
+            ('GYM0000003', 'Jose Cruz', '09173333333'),
+        ]:
+            create_member(member_id, name, phone)
+
+    def test_substring_match_ranked_by_similarity(self):
+        names = [member.name for member in search_members('santos')]
+        self.assertEqual(names, ['Maria Santos'])
+        names = [member.name for member in search_members('mari')]
+        self.assertEqual(set(names), {'Maria Santos', 'Mario Santiago'})
+
+    def test_exact_member_id_first_and_phone_match(self):
+        self.assertEqual(search_members('gym0000003')[0].name, 'Jose Cruz')
+        self.assertEqual([member.name for member in search_members('2222')], ['Mario Santiago'])
+
+    def test_short_query_returns_nothing(self):
+        self.assertEqual(list(search_members('m')), [])
+
+
+class MemberIndexTests(TestCase):
+    """Browsers download the member index once, then only the changes"""
+
+    def setUp(self):
+        self.member = create_member()
+
+    def test_full_download_then_delta(self):
+        entries, cursor, full = member_index()
+        self.assertTrue(full)
+        self.assertEqual([entry['member_id'] for entry in entries], ['GYM0000001'])
+
+        # Nothing changed: only the overlap window is re-read
+        entries, _, full = member_index(cursor + SYNC_OVERLAP * 2)
+        self.assertFalse(full)
+        self.assertEqual(entries, [])
+
+        # A cursor older than the tombstones are kept gets everything again
+        self.assertTrue(member_index(cursor - TOMBSTONE_RETENTION * 2)[2])
+
+    def test_soft_deleted_member_sent_as_deleted(self):
+        _, cursor, _ = member_index()
+        self.member.is_deleted = True
+        self.member.save()
+
+        entries, _, _ = member_index(cursor)
+        self.assertEqual(len(entries), 1)
+        self.assertTrue(entries[0]['deleted'])
+        self.assertEqual(member_index()[0], [])
+
+    def test_hard_deleted_member_sent_as_deleted(self):
+        _, cursor, _ = member_index()
+        self.member.delete()
+
+        entries, _, _ = member_index(cursor)
+        self.assertEqual(entries, [{'member_id': 'GYM0000001', 'deleted': True}])
+
+
+class MemberStatusTests(TestCase):
+    """Status is stored on save and moved along by the nightly refresh"""
+
+    def test_status_set_on_save(self):
+        today = local_today()
+        member = create_member(end_date=today + timedelta(days=30))
+        self.assertEqual(member.status, Member.ACTIVE)
+
+        member.end_date = today + timedelta(days=7)
+        member.save()
+        self.assertEqual(member.status, Member.EXPIRING)
+        self.assertTrue(member.is_expiring_soon())
+
+        member.is_active = False
+        member.save()
+        self.assertEqual(member.status, Member.INACTIVE)
+
+    def test_refresh_moves_members_as_dates_pass(self):
+        today = local_today()
+        member = create_member(end_date=today + timedelta(days=8))
+
+        self.assertEqual(refresh_statuses(today), 0)
+        self.assertEqual(refresh_statuses(today + timedelta(days=1)), 1)
+        member.refresh_from_db()
+        self.assertEqual(member.status, Member.EXPIRING)
+
+        refresh_statuses(today + timedelta(days=9))
+        member.refresh_from_db()
+        self.assertEqual(member.status, Member.EXPIRED)
+
+    def test_delete_decides_from_dates_not_the_stored_status(self):
+        user = StaffUser.objects.create_user(username='owner', password='testpass123', email='owner@example.com')
+        self.client.force_login(user)
+        today = local_today()
+        # Statuses a missed nightly refresh leaves behind
+        running = create_member('GYM0000001', end_date=today + timedelta(days=30))
+        lapsed = create_member('GYM0000002', start_date=today - timedelta(days=40), end_date=today - timedelta(days=1))
+        Member.objects.filter(pk=running.pk).update(status=Member.EXPIRED)
+        Member.objects.filter(pk=lapsed.pk).update(status=Member.ACTIVE)
+
+        response = self.client.post(reverse('memberships:delete_member', args=[running.member_id]))
+        self.assertFalse(response.json()['success'])
+        response = self.client.post(reverse('memberships:delete_member', args=[lapsed.member_id]))
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(list(Member.objects.filter(is_deleted=True)), [lapsed])
+
+
+class MemberSaveTests(TestCase):
+    """Save signals compare against the row as loaded instead of reading it again"""
+
+    def member_selects(self, queries):
+        return [query['sql'] for query in queries.captured_queries
+                if query['sql'].startswith('SELECT') and 'FROM "memberships_member"' in query['sql']]
+
+    def test_saving_a_loaded_member_reads_nothing_back(self):
+        create_member()
+        member = Member.objects.get(member_id='GYM0000001')
+        with CaptureQueriesContext(connection) as queries:
+            member.is_active = False
+            member.save()
+            member.is_active = True
+            member.save()
+        self.assertEqual(self.member_selects(queries), [])
+        today = local_today()
+        self.assertEqual(DashboardStats.for_date(today).active_members, DashboardStats.reconcile(today).active_members)
+
+    def test_member_built_by_hand_reads_its_row_once(self):
+        stored = create_member(is_active=False)
+        member = Member(**{field.attname: getattr(stored, field.attname) for field in Member._meta.concrete_fields})
+        member._state.adding = False
+        member.is_active = True
+        with CaptureQueriesContext(connection) as queries:
+            member.save()
+        self.assertEqual(len(self.member_selects(queries)), 1)
+        self.assertEqual(DashboardStats.for_date(local_today()).active_members, 1)
+
+
+class MemberListTests(TestCase):
+    """The memberships list is filtered, searched, sorted and paged in the database"""
+
+    def setUp(self):
+        today = local_today()
+        for member_id, name, days_left in [
+            ('GYM0000001', 'Maria Santos', 30),
+            ('GYM0000002', 'Mario Santiago', 3),
+            ('GYM0000003', 'Jose Cruz', -1),
+        ]:
+            create_member(member_id, name, start_date=today - timedelta(days=30), end_date=today + timedelta(days=days_left))
+
+    def test_status_filter_and_search(self):
+        self.assertEqual([m.name for m in member_list(status=Member.EXPIRED)], ['Jose Cruz'])
+        self.assertEqual([m.name for m in member_list(query='santo', sort='name')], ['Maria Santos', 'Mario Santiago'])
+
+    def test_expiring_sort_and_paging(self):
+        members = member_list(sort='expiring')
+        self.assertEqual(members[0].name, 'Mario Santiago')
+
+        page, paginator = member_page(member_list(), 5, per_page=2)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual([m.name for m in page], ['Maria Santos'])
+
+
+class MemberPhotoTests(TestCase):
+    """Photo presence is stored on the member and verified against storage off the request path"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Uploads go to a scratch directory, removed with everything in it afterwards
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+
+    def setUp(self):
+        self.member = create_member()
+
+    def test_has_photo_follows_upload_and_removal(self):
+        self.assertFalse(self.member.has_photo)
+        self.member.photo.save('photo.jpg', ContentFile(b'photo'))
+        self.assertTrue(self.member.has_photo)
+
+        self.member.photo.delete(save=False)
+        self.member.photo = None
+        self.member.save()
+        self.assertFalse(self.member.has_photo)
+
+    def test_verify_flags_missing_file(self):
+        self.member.photo.save('photo.jpg', ContentFile(b'photo'))
+        default_storage.delete(self.member.photo.name)
+
+        self.assertEqual(verify_photos(), (1, 0))
+        self.member.refresh_from_db()
+        self.assertFalse(self.member.has_photo)
+
+        # A renewal or edit that leaves the photo alone keeps the flag off
+        self.member.is_active = True
+        self.member.save()
+        self.member.refresh_from_db()
+        self.assertFalse(self.member.has_photo)
@@ -1,69 +1,124 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
+from django.template.loader import render_to_string
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, Q
 from datetime import datetime, timedelta
 import string
 import random
 from .models import Member
 from .forms import MemberForm
+from .cards import card_token
+from .index import member_index
+from .listing import member_list, member_page, MEMBERS_PER_PAGE, PER_PAGE_OPTIONS
+from .status import refresh_due_statuses, membership_status, CURRENT_STATUSES, EXPIRING_SOON_DAYS
+import qrcode
+import qrcode.image.svg
+
+
+def member_list_params(request):
+    """
+    (status, query, sort, page, per_page) of the member list from the query string
+    The dashboard's ?filter= links (active, expiring, newest) map onto status and sort
+    """
+    status = request.GET.get('status', 'all')
+    sort = request.GET.get('sort', 'newest')
+    legacy_filter = request.GET.get('filter')
+    if legacy_filter in (Member.ACTIVE, Member.EXPIRING):
+        status = legacy_filter
+    if legacy_filter in ('expiring', 'newest'):
+        sort = legacy_filter
+    
+    try:
+        per_page = int(request.GET.get('per_page', MEMBERS_PER_PAGE))
+    except ValueError:
+        per_page = MEMBERS_PER_PAGE
+    if per_page not in PER_PAGE_OPTIONS:
+        per_page = MEMBERS_PER_PAGE
+    
+    return status, request.GET.get('q', '').strip(), sort, request.GET.get('page', '1'), per_page
+
+
+def member_list_pagination(members_page, paginator, per_page):
+    """Pagination details for the page footer, in the shape transaction history uses"""
+    return {
+        'current_page': members_page.number,
+        'total_pages': paginator.num_pages,
+        'has_previous': members_page.has_previous(),
+        'has_next': members_page.has_next(),
+        'start_index': members_page.start_index(),
+        'end_index': members_page.end_index(),
+        'total_count': paginator.count,
+        'per_page': per_page,
+    }
 
 
 @login_required
 def memberships(request):
     """
     Main memberships list view with search, filter, and statistics
+    Only one page of members is rendered; memberships.js loads others from member_list_view
     """
-    # Get all members
-    members = Member.objects.filter(is_deleted=False).select_related('created_by').order_by('-date_created')
+    # Catch up on status changes if the nightly refresh was missed
+    refresh_due_statuses()
     
-    # Get today's date for status calculation
     today = timezone.now().date()
     
-    # Calculate statistics
-    total_members = members.count()
-    active_members = 0
-    expired_members = 0
-    expiring_soon = 0
-    
-    # Add status to each member and count statistics
-    members_with_status = []
-    for member in members:
-        # Determine status
-        if member.is_active and member.end_date >= today:
-            days_until_expiry = (member.end_date - today).days
-            if days_until_expiry <= 3:
-                member.status = 'expiring'
-                expiring_soon += 1
-            else:
-                member.status = 'active'
-            active_members += 1
-        elif member.end_date < today:
-            member.status = 'expired'
-            expired_members += 1
-        else:
-            member.status = 'inactive'
-        
-        members_with_status.append(member)
+    # Header statistics from the stored status (one indexed aggregate)
+    counts = Member.objects.filter(is_deleted=False).aggregate(
+        total_members=Count('id'),
+        active_members=Count('id', filter=Q(status__in=CURRENT_STATUSES)),
+        expired_members=Count('id', filter=Q(status=Member.EXPIRED)),
+        expiring_soon=Count('id', filter=Q(status=Member.EXPIRING)),
+    )
     
-    # Get filter parameter from URL
-    filter_param = request.GET.get('filter', None)
+    # Filtered, sorted and paginated in the database
+    status, search_query, sort, page, per_page = member_list_params(request)
+    members_page, paginator = member_page(member_list(status, search_query, sort), page, per_page)
     
     context = {
-        'members': members_with_status,
-        'total_members': total_members,
-        'active_members': active_members,
-        'expired_members': expired_members,
-        'expiring_soon': expiring_soon,
+        'members': members_page,
+        'filtered': status != 'all' or bool(search_query),
+        'total_members': counts['total_members'],
+        'active_members': counts['active_members'],
+        'expired_members': counts['expired_members'],
+        'expiring_soon': counts['expiring_soon'],
+        'expiring_soon_days': EXPIRING_SOON_DAYS,
         'today': today,
-        'filter': filter_param,
+        'status': status,
+        'search_query': search_query,
+        'sort': sort,
+        'per_page_options': PER_PAGE_OPTIONS,
+        **member_list_pagination(members_page, paginator, per_page),
     }
     
     return render(request, 'memberships/memberships.html', context)
 
 
+@login_required
+def member_list_view(request):
+    """
+    One page of the member list for AJAX filtering, search, sort and paging
+    Rows are rendered with the same partial as the full page
+    """
+    status, search_query, sort, page, per_page = member_list_params(request)
+    members_page, paginator = member_page(member_list(status, search_query, sort), page, per_page)
+    
+    html = render_to_string('memberships/_member_rows.html', {
+        'members': members_page,
+        'filtered': status != 'all' or bool(search_query),
+    }, request=request)
+    
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'pagination': member_list_pagination(members_page, paginator, per_page),
+    })
+
+
 @login_required
 def create_member(request):
     """
@@ -129,6 +184,36 @@ def member_detail(request, member_id):
     return render(request, 'memberships/member_details.html', context)
 
 
+@login_required
+def member_index_view(request):
+    """
+    Member index for client-side search (JSON)
+    Without `since` (or with a stale one) every member; with the cursor of the last sync only the changes
+    """
+    try:
+        since = parse_datetime(request.GET.get('since', '').strip().replace(' ', '+'))
+    except ValueError:
+        since = None
+    
+    entries, cursor, full = member_index(since)
+    
+    return JsonResponse({
+        'full': full,
+        'members': entries,
+        'cursor': cursor.isoformat(),
+    })
+
+
+@login_required
+def member_card_qr(request, member_id):
+    """
+    QR code (SVG) of a member's signed card token, for printing or showing on a phone
+    """
+    member = get_object_or_404(Member, member_id=member_id, is_deleted=False)
+    image = qrcode.make(card_token(member), image_factory=qrcode.image.svg.SvgPathImage, border=2)
+    return HttpResponse(image.to_string(), content_type='image/svg+xml')
+
+
 @login_required
 def update_member(request, member_id):
     """
@@ -174,9 +259,8 @@ def delete_member(request, member_id):
     if request.method == 'POST':
         member = get_object_or_404(Member, member_id=member_id, is_deleted=False)
         
-        # Check if member has active subscription
-        today = timezone.now().date()
-        if member.is_active and member.end_date >= today:
+        # Check if member has active subscription; from the dates, as the stored status may be a day behind
+        if membership_status(member.is_active, member.end_date) in CURRENT_STATUSES:
             return JsonResponse({
                 'success': False,
                 'message': 'Cannot delete member with active subscription'
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PaymentSummary, ActiveMemberSnapshot
+from .models import PaymentSummary, ActiveMemberSnapshot, DailyRollup, DailyPaymentMethodRollup, HourlyAttendance
 
 @admin.register(PaymentSummary)
 class PaymentSummaryAdmin(admin.ModelAdmin):
@@ -43,3 +43,57 @@ class ActiveMemberSnapshotAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Prevent manual creation - should be generated by management command
         return False
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        'date',
+        'revenue',
+        'transaction_count',
+        'walk_in_count',
+        'check_in_count',
+        'unique_members_checked_in',
+        'updated_at'
+    )
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+    readonly_fields = (
+        'date',
+        'revenue',
+        'transaction_count',
+        'walk_in_count',
+        'walk_in_revenue',
+        'check_in_count',
+        'unique_members_checked_in',
+        'updated_at'
+    )
+    
+    def has_add_permission(self, request):
+        # Maintained by signals and the rebuild_daily_rollups command
+        return False
+
+
+@admin.register(DailyPaymentMethodRollup)
+class DailyPaymentMethodRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'payment_method', 'transaction_count', 'revenue')
+    list_filter = ('payment_method',)
+    date_hierarchy = 'date'
+    ordering = ('-date', 'payment_method')
+    readonly_fields = ('date', 'payment_method', 'transaction_count', 'revenue')
+    
+    def has_add_permission(self, request):
+        # Maintained by signals and the rebuild_daily_rollups command
+        return False
+
+
+@admin.register(HourlyAttendance)
+class HourlyAttendanceAdmin(admin.ModelAdmin):
+    list_display = ('date', 'hour', 'check_in_count', 'walk_in_count')
+    date_hierarchy = 'date'
+    ordering = ('-date', 'hour')
+    readonly_fields = ('date', 'hour', 'check_in_count', 'walk_in_count')
+    
+    def has_add_permission(self, request):
+        # Maintained by signals and the rebuild_daily_rollups command
+        return False
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.conf import settings
+from django.db import transaction
+from datetime import datetime
+import uuid
+
+from .utils import local_today
+
+
+# Source tables whose writes invalidate cached metrics
+PAYMENTS = 'payments'
+CHECK_INS = 'check_ins'
+MEMBERS = 'members'
+SNAPSHOTS = 'snapshots'
+
+METRIC_TABLES = {
+    'check_ins': (CHECK_INS,),
+    'walk_ins': (PAYMENTS,),
+    'member_check_ins': (CHECK_INS, PAYMENTS),
+    'total_transactions': (PAYMENTS,),
+    'revenue': (PAYMENTS,),
+    'payment_methods': (PAYMENTS,),
+    'attendance_heatmap': (CHECK_INS, PAYMENTS),
+    'new_members': (MEMBERS,),
+    'active_members': (MEMBERS, SNAPSHOTS),
+    'revenue_per_member': (PAYMENTS, MEMBERS, SNAPSHOTS),
+}
+
+
+def version_key(table):
+    return f'metrics:version:{table}'
+
+
+def current_tokens(keys):
+    """
+    Version tokens stored under `keys`, creating missing ones
+    Tokens live in the shared cache so every worker sees the same value
+    """
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            token = uuid.uuid4().hex
+            # Another worker may create the token first; keep whichever won
+            cache.add(key, token, None)
+            tokens[key] = cache.get(key, token)
+    return [tokens[key] for key in keys]
+
+
+def replace_tokens(keys):
+    """
+    Give `keys` fresh tokens once the surrounding transaction commits, so
+    readers never cache old data under the new token
+    """
+    def replace():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+    transaction.on_commit(replace)
+
+
+def data_versions(tables):
+    """Current version token of each table"""
+    return current_tokens([version_key(table) for table in tables])
+
+
+def bump_data_version(*tables):
+    """Invalidate every cached response built from these tables"""
+    replace_tokens([version_key(table) for table in tables])
+
+
+def normalized_range(date_from, date_to):
+    """
+    A custom range as ISO dates, or ('', '') when either date doesn't parse
+    Mirrors build_layout, which ignores the whole range then, so requests laid
+    out the same share one key and raw query strings never reach the cache key
+    """
+    try:
+        return tuple(
+            datetime.strptime(value, '%Y-%m-%d').date().isoformat() if value else ''
+            for value in (date_from, date_to)
+        )
+    except ValueError:
+        return '', ''
+
+
+def cached_metric(metric_type, period, date_from, date_to, compute):
+    """
+    Return the cached response for a metric request, computing it on a miss
+    Keyed by the request parameters, today's business date and the versions
+    of the tables the metric reads
+    """
+    tables = METRIC_TABLES.get(metric_type, (PAYMENTS, CHECK_INS, MEMBERS, SNAPSHOTS))
+    versions = ':'.join(data_versions(tables))
+    date_from, date_to = normalized_range(date_from, date_to)
+    key = f'metrics:data:{metric_type}:{period}:{date_from}:{date_to}:{local_today()}:{versions}'
+
+    response = cache.get(key)
+    if response is None:
+        response = compute()
+        cache.set(key, response, settings.METRICS_CACHE_TIMEOUT)
+    return response
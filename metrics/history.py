@@ -0,0 +1,211 @@
+"""
+Closed-day history for metrics
+
+Days before today's business date only change through a back-dated payment,
+a refund, a deleted check-in or a deleted member. Their values are read once
+from the persisted daily tables (DailyRollup, DailyPaymentMethodRollup,
+ActiveMemberSnapshot) or, for new members, one grouped query over Member, in
+month-sized chunks cached until a write touches that month again; only
+today's value is computed from raw rows on each request.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+import calendar
+
+from dashboard.models import GymCheckIn
+from memberships.models import Member
+from payments.models import Payment
+from .cache import current_tokens, replace_tokens, PAYMENTS, CHECK_INS, MEMBERS, SNAPSHOTS
+from .models import ActiveMemberSnapshot, DailyRollup, DailyPaymentMethodRollup
+from .utils import local_today, GUEST_MEMBER_ID
+
+
+# Daily inputs stored in DailyRollup: name -> (source table, field)
+ROLLUP_INPUTS = {
+    'check_ins': (CHECK_INS, 'check_in_count'),
+    'walk_ins': (PAYMENTS, 'walk_in_count'),
+    'walk_in_revenue': (PAYMENTS, 'walk_in_revenue'),
+    'revenue': (PAYMENTS, 'revenue'),
+    'transactions': (PAYMENTS, 'transaction_count'),
+}
+
+# Daily inputs stored in ActiveMemberSnapshot: name -> field
+# Active members can't be recounted for a past day once memberships change,
+# so they come from the snapshot taken after the day closed
+SNAPSHOT_INPUTS = {
+    'active_members': 'active_count',
+}
+
+# Daily inputs counted from Member by business date; a snapshot taken before
+# the day ends would miss members registered after it
+MEMBER_INPUTS = ('new_members',)
+
+
+def method_input(payment_method, field):
+    """Input name for one payment method's daily 'revenue' or 'transaction_count'"""
+    return f'method:{payment_method}:{field}'
+
+
+def input_table(name):
+    if name in ROLLUP_INPUTS:
+        return ROLLUP_INPUTS[name][0]
+    if name in SNAPSHOT_INPUTS:
+        return SNAPSHOTS
+    if name in MEMBER_INPUTS:
+        return MEMBERS
+    return PAYMENTS
+
+
+def generation_key(table):
+    return f'metrics:history:{table}'
+
+
+def month_key(table, month):
+    return f'metrics:history:{table}:{month:%Y-%m}'
+
+
+def mark_days_changed(table, *days):
+    """
+    Invalidate cached history for the months holding these days
+    Days on or after today are live anyway and are ignored
+    """
+    today = local_today()
+    months = {day.replace(day=1) for day in days if day is not None and day < today}
+    if months:
+        replace_tokens([month_key(table, month) for month in months])
+
+
+def mark_history_rebuilt(*tables):
+    """Invalidate all cached history for these tables"""
+    replace_tokens([generation_key(table) for table in tables])
+
+
+def ensure_snapshots(start_date, end_date):
+    """Create any missing snapshots between two closed dates (each is computed once)"""
+    existing = set(ActiveMemberSnapshot.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date
+    ).values_list('date', flat=True))
+    missing = []
+    current = start_date
+    while current <= end_date:
+        if current not in existing:
+            missing.append(current)
+        current += timedelta(days=1)
+    if missing:
+        # Snapshots already taken keep their recorded values
+        ActiveMemberSnapshot.backfill(missing[0], missing[-1], overwrite=False)
+
+
+def load_closed(name, start_date, end_date):
+    """Read an input's stored daily values between two closed dates"""
+    if name in ROLLUP_INPUTS:
+        rows = DailyRollup.objects.filter(date__gte=start_date, date__lte=end_date)
+        field = ROLLUP_INPUTS[name][1]
+    elif name in SNAPSHOT_INPUTS:
+        ensure_snapshots(start_date, end_date)
+        rows = ActiveMemberSnapshot.objects.filter(date__gte=start_date, date__lte=end_date)
+        field = SNAPSHOT_INPUTS[name]
+    elif name in MEMBER_INPUTS:
+        return dict(
+            Member.objects.filter(is_deleted=False, business_date__gte=start_date, business_date__lte=end_date)
+            .order_by().values('business_date').annotate(total=Count('id')).values_list('business_date', 'total')
+        )
+    else:
+        _, payment_method, field = name.split(':', 2)
+        rows = DailyPaymentMethodRollup.objects.filter(
+            payment_method=payment_method,
+            date__gte=start_date,
+            date__lte=end_date
+        )
+    return dict(rows.order_by().values_list('date', field))
+
+
+def closed_daily_values(name, start_date, end_date):
+    """
+    Stored values of an input for every closed day in [start_date, end_date]
+    Served from cached month chunks; missing chunks are loaded in one query
+    """
+    yesterday = local_today() - timedelta(days=1)
+    end_date = min(end_date, yesterday)
+    if start_date > end_date:
+        return {}
+
+    table = input_table(name)
+    months = []
+    current = start_date.replace(day=1)
+    while current <= end_date:
+        months.append(current)
+        current += relativedelta(months=1)
+
+    tokens = current_tokens([generation_key(table)] + [month_key(table, month) for month in months])
+    generation, month_tokens = tokens[0], tokens[1:]
+
+    chunk_keys = {}
+    for month, token in zip(months, month_tokens):
+        # The current month keeps growing, so its chunk is also keyed by its last closed day
+        closed_through = min(month.replace(day=calendar.monthrange(month.year, month.month)[1]), yesterday)
+        chunk_keys[month] = f'metrics:closed:{name}:{month:%Y-%m}:{closed_through}:{generation}:{token}'
+
+    chunks = cache.get_many(list(chunk_keys.values()))
+    missing = [month for month in months if chunk_keys[month] not in chunks]
+    if missing:
+        loaded = load_closed(name, missing[0], min(missing[-1] + relativedelta(months=1, days=-1), yesterday))
+        new_chunks = {}
+        for month in missing:
+            month_end = month + relativedelta(months=1)
+            new_chunks[chunk_keys[month]] = {
+                day: value for day, value in loaded.items() if month <= day < month_end
+            }
+        cache.set_many(new_chunks, None)
+        chunks.update(new_chunks)
+
+    values = {}
+    for month in months:
+        for day, value in chunks[chunk_keys[month]].items():
+            if start_date <= day <= end_date:
+                values[day] = value
+    return values
+
+
+def live_value(name, today):
+    """An input's value for today, computed from raw rows"""
+    if name == 'check_ins':
+        return GymCheckIn.objects.filter(date=today).count()
+
+    if name == 'new_members':
+        return Member.objects.filter(is_deleted=False, business_date=today).count()
+
+    if name == 'active_members':
+        return Member.objects.filter(
+            is_active=True,
+            is_deleted=False,
+            start_date__lte=today,
+            end_date__gte=today
+        ).count()
+
+    payments = Payment.objects.filter(status='Completed', business_date=today)
+    if name in ('walk_ins', 'walk_in_revenue'):
+        payments = payments.filter(stored_member_id=GUEST_MEMBER_ID)
+    if name.startswith('method:'):
+        _, payment_method, field = name.split(':', 2)
+        payments = payments.filter(payment_method=payment_method)
+        name = 'revenue' if field == 'revenue' else 'transactions'
+
+    if name in ('revenue', 'walk_in_revenue'):
+        return payments.aggregate(total=Sum('amount'))['total'] or 0
+    return payments.aggregate(total=Count('id'))['total']
+
+
+def daily_values(name, start_date, end_date):
+    """
+    An input's value for every day in range that has data
+    Closed days come from history; today, when in range, is computed live
+    """
+    today = local_today()
+    values = closed_daily_values(name, start_date, end_date)
+    if start_date <= today <= end_date:
+        values[today] = live_value(name, today)
+    return values
@@ -1,7 +1,9 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from datetime import timedelta
+from metrics.cache import bump_data_version, SNAPSHOTS
+from metrics.history import mark_history_rebuilt
 from metrics.models import ActiveMemberSnapshot
+from metrics.utils import local_today
 
 
 class Command(BaseCommand):
@@ -25,34 +27,26 @@ class Command(BaseCommand):
         backfill = options.get('backfill')
         
         if backfill:
-            # Backfill mode: create snapshots for the last N days
+            # Backfill mode: compute every day of the range in one set-based pass
             self.stdout.write(self.style.WARNING(f'Backfilling snapshots for the last {backfill} days...'))
-            end_date = timezone.now().date()
+            end_date = local_today()
             start_date = end_date - timedelta(days=backfill - 1)
             
-            created_count = 0
-            updated_count = 0
+            existing = ActiveMemberSnapshot.objects.filter(
+                date__gte=start_date,
+                date__lte=end_date
+            ).count()
+            snapshots = ActiveMemberSnapshot.backfill(start_date, end_date)
             
-            current_date = start_date
-            while current_date <= end_date:
-                existing = ActiveMemberSnapshot.objects.filter(date=current_date).exists()
-                snapshot = ActiveMemberSnapshot.create_snapshot(current_date)
-                
-                if existing:
-                    updated_count += 1
-                    self.stdout.write(f'  Updated snapshot for {current_date}')
-                else:
-                    created_count += 1
-                    self.stdout.write(f'  Created snapshot for {current_date}')
-                
-                current_date += timedelta(days=1)
+            created_count = len(snapshots) - existing
+            updated_count = existing
             
             self.stdout.write(self.style.SUCCESS(
                 f'\nBackfill complete: {created_count} created, {updated_count} updated'
             ))
         else:
             # Normal mode: create snapshot for today or last N days
-            end_date = timezone.now().date()
+            end_date = local_today()
             start_date = end_date - timedelta(days=days - 1)
             
             created_count = 0
@@ -79,3 +73,7 @@ class Command(BaseCommand):
                     f'Created/updated {created_count + updated_count} snapshots '
                     f'({created_count} new, {updated_count} updated)'
                 ))
+        
+        # Only once the snapshots are written: a chart read in between would re-cache the old ones
+        bump_data_version(SNAPSHOTS)
+        mark_history_rebuilt(SNAPSHOTS)
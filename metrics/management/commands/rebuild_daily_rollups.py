@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from datetime import timedelta
+from metrics.cache import bump_data_version, PAYMENTS, CHECK_INS
+from metrics.history import mark_history_rebuilt
+from metrics.models import DailyRollup, HourlyAttendance
+from metrics.utils import local_today
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily payment and check-in rollups and hourly attendance from raw records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only rebuild the last N days (default: all history)'
+        )
+
+    def handle(self, *args, **options):
+        days = options.get('days')
+        
+        if days:
+            end_date = local_today()
+            start_date = end_date - timedelta(days=days - 1)
+            self.stdout.write(self.style.WARNING(f'Rebuilding rollups from {start_date} to {end_date}...'))
+            written = DailyRollup.rebuild(start_date, end_date)
+            HourlyAttendance.rebuild(start_date, end_date)
+        else:
+            self.stdout.write(self.style.WARNING('Rebuilding rollups for all history...'))
+            written = DailyRollup.rebuild()
+            HourlyAttendance.rebuild()
+        
+        bump_data_version(PAYMENTS, CHECK_INS)
+        mark_history_rebuilt(PAYMENTS, CHECK_INS)
+        self.stdout.write(self.style.SUCCESS(f'Rebuild complete: {written} days written'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0003_activemembersnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Completed payment revenue on this date', max_digits=12)),
+                ('transaction_count', models.PositiveIntegerField(default=0, help_text='Completed payments on this date')),
+                ('walk_in_count', models.PositiveIntegerField(default=0, help_text='Completed walk-in (guest) payments on this date')),
+                ('walk_in_revenue', models.DecimalField(decimal_places=2, default=0, help_text='Completed walk-in (guest) revenue on this date', max_digits=12)),
+                ('check_in_count', models.PositiveIntegerField(default=0, help_text='Member check-ins on this date')),
+                ('unique_members_checked_in', models.PositiveIntegerField(default=0, help_text='Distinct members who checked in on this date')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentMethodRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(max_length=50)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Daily Payment Method Rollup',
+                'verbose_name_plural': 'Daily Payment Method Rollups',
+                'ordering': ['-date', 'payment_method'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'payment_method'), name='unique_daily_payment_method')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0004_dailyrollup_dailypaymentmethodrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField(help_text='Hour of day in Manila time (0-23)')),
+                ('check_in_count', models.PositiveIntegerField(default=0)),
+                ('walk_in_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Hourly Attendance',
+                'verbose_name_plural': 'Hourly Attendance',
+                'ordering': ['-date', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'hour'), name='unique_hourly_attendance')],
+            },
+        ),
+    ]
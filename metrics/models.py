@@ -2,6 +2,7 @@ from django.db import models
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from decimal import Decimal
+from datetime import timedelta
 
 
 class PaymentSummary(models.Model):
@@ -92,13 +93,13 @@ class ActiveMemberSnapshot(models.Model):
         # Total non-deleted members
         total_members = Member.objects.filter(
             is_deleted=False,
-            date_created__date__lte=target_date
+            business_date__lte=target_date
         ).count()
         
         # New members created on this date
         new_members_today = Member.objects.filter(
             is_deleted=False,
-            date_created__date=target_date
+            business_date=target_date
         ).count()
         
         # Memberships that expired on this date
@@ -109,7 +110,7 @@ class ActiveMemberSnapshot(models.Model):
         
         # Revenue collected on this date
         total_revenue_today = Payment.objects.filter(
-            payment_date__date=target_date,
+            business_date=target_date,
             status='Completed'
         ).aggregate(total=Coalesce(models.Sum('amount'), Decimal('0.00')))['total']
         
@@ -132,3 +133,328 @@ class ActiveMemberSnapshot(models.Model):
         )
         
         return snapshot
+    
+    @classmethod
+    def backfill(cls, start_date, end_date, overwrite=True):
+        """
+        Create or update snapshots for every date in [start_date, end_date]
+        Uses one grouped query per statistic instead of six queries per day and
+        writes all rows with a single bulk upsert; with overwrite=False existing
+        snapshots are kept as they are. Returns the snapshots written
+        """
+        from django.db.models import Count, Sum
+        from memberships.models import Member
+        from payments.models import Payment
+        from dashboard.models import GymCheckIn
+        from metrics.utils import active_member_counts
+        
+        if start_date > end_date:
+            return []
+        
+        members = Member.objects.filter(is_deleted=False).order_by()
+        
+        # Active members per date from one sweep over membership intervals
+        active_counts = active_member_counts(start_date, end_date)
+        
+        new_members = dict(
+            members.filter(business_date__gte=start_date, business_date__lte=end_date)
+            .values('business_date').annotate(total=Count('id')).values_list('business_date', 'total')
+        )
+        members_before = members.filter(business_date__lt=start_date).count()
+        
+        expired = dict(
+            members.filter(end_date__gte=start_date, end_date__lte=end_date)
+            .values('end_date').annotate(total=Count('id')).values_list('end_date', 'total')
+        )
+        
+        revenue = dict(
+            Payment.objects.filter(
+                status='Completed',
+                business_date__gte=start_date,
+                business_date__lte=end_date
+            ).order_by()
+            .values('business_date').annotate(total=Sum('amount')).values_list('business_date', 'total')
+        )
+        
+        check_ins = dict(
+            GymCheckIn.objects.filter(date__gte=start_date, date__lte=end_date).order_by()
+            .values('date').annotate(total=Count('id')).values_list('date', 'total')
+        )
+        
+        snapshots = []
+        total_members = members_before
+        current = start_date
+        while current <= end_date:
+            total_members += new_members.get(current, 0)
+            snapshots.append(cls(
+                date=current,
+                active_count=active_counts.get(current, 0),
+                total_members=total_members,
+                new_members_today=new_members.get(current, 0),
+                expired_today=expired.get(current, 0),
+                total_revenue_today=revenue.get(current) or Decimal('0.00'),
+                check_ins_today=check_ins.get(current, 0),
+            ))
+            current += timedelta(days=1)
+        
+        if overwrite:
+            cls.objects.bulk_create(
+                snapshots,
+                update_conflicts=True,
+                unique_fields=['date'],
+                update_fields=[
+                    'active_count', 'total_members', 'new_members_today',
+                    'expired_today', 'total_revenue_today', 'check_ins_today',
+                ],
+            )
+        else:
+            cls.objects.bulk_create(snapshots, ignore_conflicts=True)
+        return snapshots
+
+
+class DailyRollup(models.Model):
+    """
+    Per-day totals for payments and check-ins (Manila business date)
+    Kept current by signals on Payment and GymCheckIn, rebuilt with
+    the rebuild_daily_rollups management command
+    """
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Completed payment revenue on this date'
+    )
+    transaction_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Completed payments on this date'
+    )
+    walk_in_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Completed walk-in (guest) payments on this date'
+    )
+    walk_in_revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Completed walk-in (guest) revenue on this date'
+    )
+    check_in_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Member check-ins on this date'
+    )
+    unique_members_checked_in = models.PositiveIntegerField(
+        default=0,
+        help_text='Distinct members who checked in on this date'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily Rollup'
+        verbose_name_plural = 'Daily Rollups'
+    
+    def __str__(self):
+        return f"Rollup for {self.date}"
+    
+    @classmethod
+    def apply(cls, target_date, **deltas):
+        """
+        Atomically add deltas to the row for a date, creating it if needed
+        Example: DailyRollup.apply(date, revenue=Decimal('500.00'), transaction_count=1)
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        # One UPDATE once the day's row exists; the first write of a day creates it and retries
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if not cls.objects.filter(date=target_date).update(updated_at=timezone.now(), **changes):
+            cls.objects.get_or_create(date=target_date)
+            cls.objects.filter(date=target_date).update(updated_at=timezone.now(), **changes)
+    
+    @classmethod
+    def rebuild(cls, start_date=None, end_date=None):
+        """
+        Recompute rollups from raw Payment and GymCheckIn rows
+        Limits to [start_date, end_date] when given; returns the number of days written
+        """
+        from django.db import transaction
+        from django.db.models import Count, Sum, Q, F
+        from dashboard.models import GymCheckIn
+        from payments.models import Payment
+        from metrics.utils import GUEST_MEMBER_ID
+        
+        payments = Payment.objects.filter(status='Completed').order_by()
+        check_ins = GymCheckIn.objects.order_by()
+        if start_date:
+            payments = payments.filter(business_date__gte=start_date)
+            check_ins = check_ins.filter(date__gte=start_date)
+        if end_date:
+            payments = payments.filter(business_date__lte=end_date)
+            check_ins = check_ins.filter(date__lte=end_date)
+        
+        payments = payments.annotate(day=F('business_date'))
+        walk_in = Q(stored_member_id=GUEST_MEMBER_ID)
+        
+        rows = {}
+        
+        def row_for(day):
+            return rows.setdefault(day, cls(date=day))
+        
+        for item in payments.values('day').annotate(
+            revenue=Sum('amount'),
+            transaction_count=Count('id'),
+            walk_in_count=Count('id', filter=walk_in),
+            walk_in_revenue=Sum('amount', filter=walk_in),
+        ):
+            row = row_for(item['day'])
+            row.revenue = item['revenue'] or 0
+            row.transaction_count = item['transaction_count']
+            row.walk_in_count = item['walk_in_count']
+            row.walk_in_revenue = item['walk_in_revenue'] or 0
+        
+        for item in check_ins.values('date').annotate(
+            check_in_count=Count('id'),
+            unique_members=Count('member', distinct=True),
+        ):
+            row = row_for(item['date'])
+            row.check_in_count = item['check_in_count']
+            row.unique_members_checked_in = item['unique_members']
+        
+        method_rows = [
+            DailyPaymentMethodRollup(
+                date=item['day'],
+                payment_method=item['payment_method'],
+                transaction_count=item['transaction_count'],
+                revenue=item['revenue'] or 0,
+            )
+            for item in payments.values('day', 'payment_method').annotate(
+                transaction_count=Count('id'),
+                revenue=Sum('amount'),
+            )
+        ]
+        
+        with transaction.atomic():
+            stale = cls.objects.all()
+            stale_methods = DailyPaymentMethodRollup.objects.all()
+            if start_date:
+                stale = stale.filter(date__gte=start_date)
+                stale_methods = stale_methods.filter(date__gte=start_date)
+            if end_date:
+                stale = stale.filter(date__lte=end_date)
+                stale_methods = stale_methods.filter(date__lte=end_date)
+            stale.delete()
+            stale_methods.delete()
+            cls.objects.bulk_create(rows.values(), batch_size=1000)
+            DailyPaymentMethodRollup.objects.bulk_create(method_rows, batch_size=1000)
+        
+        return len(rows)
+
+
+class DailyPaymentMethodRollup(models.Model):
+    """Completed payment count and revenue per payment method per day"""
+    date = models.DateField()
+    payment_method = models.CharField(max_length=50)
+    transaction_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date', 'payment_method']
+        verbose_name = 'Daily Payment Method Rollup'
+        verbose_name_plural = 'Daily Payment Method Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'payment_method'], name='unique_daily_payment_method'),
+        ]
+    
+    def __str__(self):
+        return f"{self.payment_method} on {self.date}"
+    
+    @classmethod
+    def apply(cls, target_date, payment_method, **deltas):
+        """Atomically add deltas to the row for a date and payment method"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if not cls.objects.filter(date=target_date, payment_method=payment_method).update(**changes):
+            cls.objects.get_or_create(date=target_date, payment_method=payment_method)
+            cls.objects.filter(date=target_date, payment_method=payment_method).update(**changes)
+
+
+class HourlyAttendance(models.Model):
+    """
+    Check-ins and walk-ins per Manila hour of each day
+    Feeds the weekday x hour attendance heatmap without scanning raw rows
+    """
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField(help_text='Hour of day in Manila time (0-23)')
+    check_in_count = models.PositiveIntegerField(default=0)
+    walk_in_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date', 'hour']
+        verbose_name = 'Hourly Attendance'
+        verbose_name_plural = 'Hourly Attendance'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'hour'], name='unique_hourly_attendance'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}:00"
+    
+    @classmethod
+    def apply(cls, target_date, hour, **deltas):
+        """Atomically add deltas to the row for a date and hour"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if not cls.objects.filter(date=target_date, hour=hour).update(**changes):
+            cls.objects.get_or_create(date=target_date, hour=hour)
+            cls.objects.filter(date=target_date, hour=hour).update(**changes)
+    
+    @classmethod
+    def rebuild(cls, start_date=None, end_date=None):
+        """
+        Recompute hourly attendance from raw GymCheckIn rows and walk-in payments
+        Limits to [start_date, end_date] when given; returns the number of rows written
+        """
+        from django.db import transaction
+        from django.db.models import Count
+        from django.db.models.functions import ExtractHour
+        from dashboard.models import GymCheckIn
+        from payments.models import Payment
+        from metrics.utils import MANILA_TZ, GUEST_MEMBER_ID
+        
+        check_ins = GymCheckIn.objects.order_by()
+        walk_ins = Payment.objects.filter(status='Completed', stored_member_id=GUEST_MEMBER_ID).order_by()
+        stale = cls.objects.all()
+        if start_date:
+            check_ins = check_ins.filter(date__gte=start_date)
+            walk_ins = walk_ins.filter(business_date__gte=start_date)
+            stale = stale.filter(date__gte=start_date)
+        if end_date:
+            check_ins = check_ins.filter(date__lte=end_date)
+            walk_ins = walk_ins.filter(business_date__lte=end_date)
+            stale = stale.filter(date__lte=end_date)
+        
+        rows = {}
+        
+        def row_for(day, hour):
+            return rows.setdefault((day, hour), cls(date=day, hour=hour))
+        
+        for item in check_ins.annotate(
+            hour=ExtractHour('check_in_time', tzinfo=MANILA_TZ)
+        ).values('date', 'hour').annotate(total=Count('id')):
+            row_for(item['date'], item['hour']).check_in_count = item['total']
+        
+        for item in walk_ins.annotate(
+            hour=ExtractHour('payment_date', tzinfo=MANILA_TZ)
+        ).values('business_date', 'hour').annotate(total=Count('id')):
+            row_for(item['business_date'], item['hour']).walk_in_count = item['total']
+        
+        with transaction.atomic():
+            stale.delete()
+            cls.objects.bulk_create(rows.values(), batch_size=1000)
+        
+        return len(rows)
@@ -0,0 +1,271 @@
+from django.db.models import F, Count
+from collections import Counter
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from dashboard.live import publish_checkin, publish_payment, publish_counters
+from dashboard.models import GymCheckIn, DashboardStats
+from memberships.models import Member
+from payments.models import Payment
+from .cache import bump_data_version, PAYMENTS, CHECK_INS, MEMBERS
+from .history import mark_days_changed
+from .models import ActiveMemberSnapshot, DailyRollup, DailyPaymentMethodRollup, HourlyAttendance
+from .utils import MANILA_TZ, GUEST_MEMBER_ID, local_today
+
+
+# Lock order: every writer moves a day's DashboardStats row before its rollup rows
+# (DailyRollup, DailyPaymentMethodRollup, HourlyAttendance, ActiveMemberSnapshot).
+# check_capacity holds the counters row while a check-in is inserted, so a writer
+# taking a rollup row first could deadlock with it
+
+
+def payment_contribution(payment):
+    """
+    What a payment adds to the rollups: (date, hour, method, amount, is_walk_in)
+    Only completed payments count towards revenue and transactions
+    """
+    if payment.status != 'Completed' or payment.payment_date is None:
+        return None
+    local_time = payment.payment_date.astimezone(MANILA_TZ)
+    return (
+        local_time.date(),
+        local_time.hour,
+        payment.payment_method,
+        payment.amount or 0,
+        payment.stored_member_id == GUEST_MEMBER_ID,
+    )
+
+
+def apply_payment_contribution(contribution, sign):
+    if contribution is None:
+        return
+    day, hour, method, amount, is_walk_in = contribution
+    DashboardStats.apply(
+        day,
+        total_revenue=sign * amount,
+        daily_walk_ins=sign if is_walk_in else 0,
+    )
+    DailyRollup.apply(
+        day,
+        revenue=sign * amount,
+        transaction_count=sign,
+        walk_in_count=sign if is_walk_in else 0,
+        walk_in_revenue=sign * amount if is_walk_in else 0,
+    )
+    DailyPaymentMethodRollup.apply(day, method, transaction_count=sign, revenue=sign * amount)
+    if is_walk_in:
+        HourlyAttendance.apply(day, hour, walk_in_count=sign)
+    ActiveMemberSnapshot.objects.filter(date=day).update(
+        total_revenue_today=F('total_revenue_today') + sign * amount
+    )
+    # A back-dated payment or refund only invalidates the history of its own day
+    mark_days_changed(PAYMENTS, day)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of an edited payment so its old contribution can be removed"""
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    previous = Payment.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_previous = payment_contribution(previous)
+
+
+@receiver(post_save, sender=Payment)
+def update_rollups_for_payment(sender, instance, raw=False, **kwargs):
+    """Move a payment's contribution when it is created or its status, amount or date changes"""
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = payment_contribution(instance)
+    if previous == current:
+        return
+    # A payment moved between days takes the earlier day's rows first, as batches do
+    changes = [(contribution, sign) for contribution, sign in ((previous, -1), (current, 1)) if contribution]
+    for contribution, sign in sorted(changes, key=lambda change: change[0][0]):
+        apply_payment_contribution(contribution, sign)
+
+    # Push the new counters (and a new walk-in) to live dashboards
+    if current is not None:
+        publish_payment(instance, current[0], kwargs.get('created', False) and current[4])
+    if previous is not None and (current is None or previous[0] != current[0]):
+        publish_payment(instance, previous[0], False)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_rollups(sender, instance, **kwargs):
+    contribution = payment_contribution(instance)
+    apply_payment_contribution(contribution, -1)
+    if contribution is not None:
+        publish_payment(instance, contribution[0], False)
+
+
+def checkin_hour(checkin):
+    return checkin.check_in_time.astimezone(MANILA_TZ).hour
+
+
+@receiver(post_save, sender=GymCheckIn)
+def update_rollups_for_checkin(sender, instance, created, raw=False, **kwargs):
+    """Count a new check-in, and the member the first time they check in that day"""
+    if raw or not created:
+        return
+    # log_member_checkin knows this from its rule check; other writers pay for the lookup
+    first_today = getattr(instance, '_first_today', None)
+    if first_today is None:
+        first_today = not GymCheckIn.objects.filter(
+            member_id=instance.member_id,
+            date=instance.date
+        ).exclude(pk=instance.pk).exists()
+    DashboardStats.apply(
+        instance.date,
+        total_check_ins=1,
+        member_check_ins=1 if first_today else 0,
+        in_gym=1 if instance.check_out_time is None else 0,
+    )
+    DailyRollup.apply(
+        instance.date,
+        check_in_count=1,
+        unique_members_checked_in=1 if first_today else 0,
+    )
+    HourlyAttendance.apply(instance.date, checkin_hour(instance), check_in_count=1)
+    ActiveMemberSnapshot.objects.filter(date=instance.date).update(check_ins_today=F('check_ins_today') + 1)
+    mark_days_changed(CHECK_INS, instance.date)
+    publish_checkin(instance)
+
+
+def apply_checkin_batch(checkins):
+    """
+    What update_rollups_for_checkin does per row, for check-ins inserted with bulk_create
+    (which sends no signals), as one set of deltas per day and hour
+    """
+    if not checkins:
+        return
+    per_day = Counter(checkin.date for checkin in checkins)
+    # Replays older than a session arrive already checked out
+    open_per_day = Counter(checkin.date for checkin in checkins if checkin.check_out_time is None)
+    per_hour = Counter((checkin.date, checkin_hour(checkin)) for checkin in checkins)
+    batch_members = Counter((checkin.member_id, checkin.date) for checkin in checkins)
+
+    # A member is new to a day when all of their check-ins that day are in this batch
+    totals = GymCheckIn.objects.filter(
+        member_id__in={member_id for member_id, _ in batch_members},
+        date__in=set(per_day)
+    ).values('member_id', 'date').annotate(count=Count('id'))
+    first_today = Counter(
+        row['date'] for row in totals
+        if batch_members.get((row['member_id'], row['date'])) == row['count']
+    )
+
+    for day, count in sorted(per_day.items()):
+        DashboardStats.apply(day, total_check_ins=count, member_check_ins=first_today[day], in_gym=open_per_day[day])
+    for day, count in sorted(per_day.items()):
+        DailyRollup.apply(day, check_in_count=count, unique_members_checked_in=first_today[day])
+        ActiveMemberSnapshot.objects.filter(date=day).update(check_ins_today=F('check_ins_today') + count)
+    for (day, hour), count in sorted(per_hour.items()):
+        HourlyAttendance.apply(day, hour, check_in_count=count)
+
+    bump_data_version(CHECK_INS)
+    mark_days_changed(CHECK_INS, *per_day)
+    today = local_today()
+    if today in per_day:
+        publish_counters(today)
+
+
+@receiver(post_delete, sender=GymCheckIn)
+def remove_checkin_from_rollups(sender, instance, **kwargs):
+    last_today = not GymCheckIn.objects.filter(
+        member_id=instance.member_id,
+        date=instance.date
+    ).exists()
+    DashboardStats.apply(
+        instance.date,
+        total_check_ins=-1,
+        member_check_ins=-1 if last_today else 0,
+        in_gym=-1 if instance.check_out_time is None else 0,
+    )
+    DailyRollup.apply(
+        instance.date,
+        check_in_count=-1,
+        unique_members_checked_in=-1 if last_today else 0,
+    )
+    HourlyAttendance.apply(instance.date, checkin_hour(instance), check_in_count=-1)
+    ActiveMemberSnapshot.objects.filter(date=instance.date).update(check_ins_today=F('check_ins_today') - 1)
+    mark_days_changed(CHECK_INS, instance.date)
+
+
+@receiver(pre_save, sender=GymCheckIn)
+def remember_previous_checkout(sender, instance, raw=False, **kwargs):
+    instance._was_checked_out = None
+    if raw or instance._state.adding:
+        return
+    instance._was_checked_out = GymCheckIn.objects.filter(
+        pk=instance.pk,
+        check_out_time__isnull=False
+    ).exists()
+
+
+@receiver(post_save, sender=GymCheckIn)
+def update_in_gym_for_checkout(sender, instance, created, raw=False, **kwargs):
+    """A check-out (or an undone one) moves the day's in-gym counter"""
+    was_checked_out = getattr(instance, '_was_checked_out', None)
+    if raw or created or was_checked_out is None:
+        return
+    is_checked_out = instance.check_out_time is not None
+    if is_checked_out != was_checked_out:
+        DashboardStats.apply(instance.date, in_gym=-1 if is_checked_out else 1)
+        if instance.date == local_today():
+            publish_counters(instance.date)
+
+
+def is_active_today(is_active, is_deleted, start_date, end_date):
+    today = local_today()
+    return is_active and not is_deleted and start_date <= today <= end_date
+
+
+@receiver(pre_save, sender=Member)
+def remember_previous_member(sender, instance, raw=False, **kwargs):
+    instance._was_active_today = False
+    if raw:
+        return
+    # The row as loaded: no extra query, shared with the memberships signals
+    previous = instance.stored_values()
+    if previous is not None:
+        instance._was_active_today = is_active_today(
+            previous['is_active'], previous['is_deleted'], previous['start_date'], previous['end_date']
+        )
+
+
+@receiver(post_save, sender=Member)
+def update_member_counters(sender, instance, created, raw=False, **kwargs):
+    """Count new members and members whose membership became active or inactive today"""
+    if raw:
+        return
+    today = local_today()
+    is_active = is_active_today(instance.is_active, instance.is_deleted, instance.start_date, instance.end_date)
+    active_delta = int(is_active) - int(getattr(instance, '_was_active_today', False))
+    DashboardStats.apply(
+        today,
+        new_members=1 if created and not instance.is_deleted else 0,
+        active_members=active_delta,
+    )
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_payment_metrics(sender, **kwargs):
+    bump_data_version(PAYMENTS)
+
+
+@receiver(post_save, sender=GymCheckIn)
+@receiver(post_delete, sender=GymCheckIn)
+def invalidate_checkin_metrics(sender, **kwargs):
+    bump_data_version(CHECK_INS)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_member_metrics(sender, instance, **kwargs):
+    bump_data_version(MEMBERS)
+    # A member deleted or restored after their registration day changes that day's new members
+    mark_days_changed(MEMBERS, instance.business_date)
@@ -9,6 +9,7 @@ document.addEventListener('DOMContentLoaded', function () {
     const dateFrom = document.getElementById('dateFrom');
     const dateTo = document.getElementById('dateTo');
     const clearDatesBtn = document.getElementById('clearDates');
+    const heatmapGrid = document.getElementById('heatmapGrid');
 
     let currentChart = null;
     let currentMetric = 'check_ins';
@@ -43,12 +44,17 @@ document.addEventListener('DOMContentLoaded', function () {
         new_members: 'New Members',
         active_members: 'Active Members',
         revenue_per_member: 'Revenue per Member (₱)',
-        payment_methods: 'Count'
+        payment_methods: 'Count',
+        attendance_heatmap: 'Average Attendance'
     };
 
+    // Series for every metric in the current period, loaded in one request
+    let seriesCache = {};
+
     function fetchAndUpdateChart() {
-        // Build URL with all parameters
-        let url = `/metrics/api/data/?metric=${currentMetric}&period=${currentPeriod}`;
+        // Request every metric in the selector so switching metrics needs no round-trip
+        const metrics = Array.from(metricSelect.options).map(option => option.value).join(',');
+        let url = `/metrics/api/batch/?metrics=${metrics}&period=${currentPeriod}`;
         
         // Add custom date range if set
         if (customDateFrom) {
@@ -65,7 +71,8 @@ document.addEventListener('DOMContentLoaded', function () {
         fetch(url)
             .then(response => response.json())
             .then(data => {
-                updateChart(data.labels, data.data, data.scale);
+                seriesCache = data.series;
+                renderCurrentMetric();
                 graphContainer.classList.remove('loading');
             })
             .catch(error => {
@@ -74,6 +81,57 @@ document.addEventListener('DOMContentLoaded', function () {
             });
     }
 
+    function renderCurrentMetric() {
+        const series = seriesCache[currentMetric];
+        if (!series) return;
+        
+        // The heatmap is a weekday x hour grid rather than a Chart.js chart
+        const isHeatmap = currentMetric === 'attendance_heatmap';
+        canvas.hidden = isHeatmap;
+        heatmapGrid.hidden = !isHeatmap;
+        if (isHeatmap) {
+            if (currentChart) {
+                currentChart.destroy();
+                currentChart = null;
+            }
+            renderHeatmap(series.labels, series.data);
+            return;
+        }
+        updateChart(series.labels, series.data, series.scale);
+    }
+
+    function renderHeatmap(weekdays, rows) {
+        const maxValue = Math.max(...rows.flat(), 0);
+        heatmapGrid.innerHTML = '';
+        
+        // Header row: hours of the day
+        heatmapGrid.appendChild(document.createElement('div'));
+        for (let hour = 0; hour < 24; hour++) {
+            const label = document.createElement('div');
+            label.className = 'heatmap-label';
+            label.textContent = hour % 3 === 0 ? String(hour).padStart(2, '0') : '';
+            heatmapGrid.appendChild(label);
+        }
+        
+        rows.forEach((hours, index) => {
+            const label = document.createElement('div');
+            label.className = 'heatmap-label';
+            label.textContent = weekdays[index];
+            heatmapGrid.appendChild(label);
+            
+            hours.forEach((value, hour) => {
+                const cell = document.createElement('div');
+                cell.className = 'heatmap-cell';
+                const intensity = maxValue > 0 ? value / maxValue : 0;
+                if (intensity > 0) {
+                    cell.style.background = `rgba(59,130,246,${(0.15 + intensity * 0.85).toFixed(2)})`;
+                }
+                cell.title = `${weekdays[index]} ${String(hour).padStart(2, '0')}:00 - ${value} avg check-ins`;
+                heatmapGrid.appendChild(cell);
+            });
+        });
+    }
+
     function updateChart(labels, data, scale) {
         // Destroy existing chart
         if (currentChart) {
@@ -227,12 +285,12 @@ document.addEventListener('DOMContentLoaded', function () {
             graphTypeSelect.value = 'doughnut';
         }
         
-        fetchAndUpdateChart();
+        renderCurrentMetric();
     });
 
     graphTypeSelect.addEventListener('change', function() {
         currentGraphType = this.value;
-        fetchAndUpdateChart();
+        renderCurrentMetric();
     });
 
     timeframeBtns.forEach(btn => {
@@ -1,3 +1,739 @@
+from django.apps import apps as django_apps
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from dashboard.models import GymCheckIn
+from dashboard.stats import peak_hours
+from memberships.models import Member
+from payments.models import Payment
+from users.models import StaffUser
+from .cache import cached_metric, data_versions, normalized_range, CHECK_INS, PAYMENTS
+from .history import daily_values
+from .models import ActiveMemberSnapshot, DailyRollup, DailyPaymentMethodRollup, HourlyAttendance
+from .views import metric_payload
+from .utils import (
+    MANILA_TZ, GUEST_MEMBER_ID, local_today, local_midnight,
+    build_layout, all_time_layout, build_metric, metric_series, SeriesInputs, active_member_counts,
+    source_histogram, attendance_heatmap,
+)
+
+
+PERIODS = ('1d', '1w', '1m', '3m', '6m', '1y', '3y')
+
+
+def create_member(member_id, start_date, end_date, is_active=True):
+    return Member.objects.create(
+        member_id=member_id,
+        name=f'Member {member_id}',
+        phone_number='09171111111',
+        address='Manila',
+        emergency_contact='Contact',
+        emergency_phone='09170000001',
+        start_date=start_date,
+        end_date=end_date,
+        membership_fee=Decimal('1000.00'),
+        is_active=is_active,
+    )
+
+
+def bucket_totals(layout, rows):
+    """Naive per-bucket sums of (date, value) rows"""
+    return [sum(value for day, value in rows if bucket.start <= day <= bucket.end) for bucket in layout.buckets]
+
+
+class MetricsTestCase(TestCase):
+    """Check-ins, member payments and walk-ins spread over the last three years"""
+
+    # Days before today with activity; every period's buckets get some and miss some
+    DAYS_AGO = (0, 1, 3, 6, 7, 12, 29, 30, 45, 95, 170, 200, 364, 400, 900)
+
+    @classmethod
+    def setUpTestData(cls):
+        today = local_today()
+        cls.member = create_member('GYM0000001', today - timedelta(days=1000), today + timedelta(days=30))
+        for index, days_ago in enumerate(cls.DAYS_AGO):
+            day = today - timedelta(days=days_ago)
+            # Hours vary so hourly buckets differ; evening rows land on the Manila day, not the UTC one
+            when = local_midnight(day) + timedelta(hours=(index * 5) % 24, minutes=30)
+            GymCheckIn.objects.create(member=cls.member, check_in_time=when, date=day)
+            Payment.objects.create(
+                member=cls.member,
+                stored_member_id=cls.member.member_id,
+                stored_member_name=cls.member.name,
+                amount=Decimal('500.00') + index,
+                payment_date=when,
+            )
+            if index % 2:
+                Payment.objects.create(
+                    stored_member_id=GUEST_MEMBER_ID,
+                    stored_member_name='Guest',
+                    amount=Decimal('100.00'),
+                    payment_method='GCash',
+                    payment_date=when + timedelta(minutes=10),
+                )
+        # Refunds never count
+        Payment.objects.create(
+            stored_member_id=GUEST_MEMBER_ID,
+            stored_member_name='Refunded Guest',
+            amount=Decimal('100.00'),
+            status='Refunded',
+            payment_date=local_midnight(today - timedelta(days=3)),
+        )
+
+    def setUp(self):
+        # History chunks and responses live in the shared cache, whose version
+        # tokens only move on commit; start every test cold
+        cache.clear()
+
+    def raw_check_ins(self):
+        return [(day, 1) for day in GymCheckIn.objects.values_list('date', flat=True)]
+
+    def raw_payments(self, **filters):
+        return list(Payment.objects.filter(status='Completed', **filters).values_list('business_date', 'amount'))
+
+
+class MetricLayoutTests(TestCase):
+    """Every period is laid out as contiguous buckets ending on today"""
+
+    def assertContiguous(self, layout):
+        for previous, bucket in zip(layout.buckets, layout.buckets[1:]):
+            self.assertEqual(bucket.start, previous.end + timedelta(days=1))
+        for bucket in layout.buckets:
+            self.assertLessEqual(bucket.start, bucket.end)
+
+    def test_predefined_periods(self):
+        today = local_today()
+
+        layout = build_layout('1d')
+        self.assertEqual(layout.grain, 'hour')
+        self.assertEqual([(bucket.start, bucket.end) for bucket in layout.buckets], [(hour, hour) for hour in range(24)])
+        self.assertEqual(layout.labels[0], '12AM')
+        self.assertEqual(layout.labels[13], '1PM')
+        self.assertEqual((layout.start_date, layout.end_date), (today, today))
+
+        layout = build_layout('1w')
+        self.assertEqual(len(layout.buckets), 7)
+        self.assertEqual((layout.start_date, layout.end_date), (today - timedelta(days=6), today))
+
+        layout = build_layout('1m')
+        self.assertEqual(len(layout.buckets), 7)
+        self.assertEqual((layout.start_date, layout.end_date), (today - timedelta(days=29), today))
+        self.assertEqual(layout.buckets[-1].start, today)
+
+        layout = build_layout('3m')
+        self.assertEqual(layout.grain, 'month')
+        self.assertEqual(layout.start_date.day, 1)
+        self.assertLessEqual(layout.buckets[-1].start, today)
+        self.assertGreaterEqual(layout.end_date, today)
+        self.assertEqual(layout.end_date.month, today.month)
+
+        layout = build_layout('6m')
+        self.assertEqual(layout.end_date, today)
+        self.assertTrue(all((bucket.end - bucket.start).days <= 2 for bucket in layout.buckets))
+
+        layout = build_layout('1y')
+        self.assertEqual(layout.grain, 'week')
+        self.assertTrue(all(bucket.start.weekday() == 0 for bucket in layout.buckets))
+        self.assertLessEqual(layout.buckets[-1].start, today)
+        self.assertGreaterEqual(layout.end_date, today)
+
+        layout = build_layout('3y')
+        self.assertEqual(layout.grain, 'year')
+        self.assertEqual(layout.labels, [str(year) for year in range(today.year - 3, today.year + 1)])
+
+        for period in PERIODS[1:]:
+            self.assertContiguous(build_layout(period))
+        self.assertIsNone(build_layout('all'))
+
+    def test_custom_ranges(self):
+        layout = build_layout('1m', '2026-01-01', '2026-01-02')
+        self.assertEqual(layout.grain, 'hour')
+        self.assertEqual(len(layout.buckets), 6)
+        self.assertEqual(layout.end_date.isoformat(), '2026-01-02')
+
+        layout = build_layout('1m', '2026-01-01', '2026-01-08')
+        self.assertEqual(len(layout.buckets), 8)
+
+        layout = build_layout('1m', '2026-01-01', '2026-03-01')
+        self.assertEqual((layout.start_date.isoformat(), layout.end_date.isoformat()), ('2026-01-01', '2026-03-01'))
+        self.assertContiguous(layout)
+
+        layout = build_layout('1m', '2025-01-01', '2026-01-01')
+        self.assertEqual(layout.grain, 'week')
+        self.assertContiguous(layout)
+
+        # Unparseable dates fall back to the predefined period
+        layout = build_layout('1w', 'not-a-date', '2026-01-01')
+        self.assertEqual((layout.start_date, layout.end_date), (local_today() - timedelta(days=6), local_today()))
+
+    def test_manila_days_are_24_hours(self):
+        # Asia/Manila has no daylight saving: every business day starts 24 hours after the last
+        day = local_today()
+        for offset in range(0, 366, 30):
+            start = local_midnight(day - timedelta(days=offset))
+            self.assertEqual(local_midnight(day - timedelta(days=offset - 1)) - start, timedelta(days=1))
+            self.assertEqual(start.utcoffset(), timedelta(hours=8))
+
+
+class MetricSeriesTests(MetricsTestCase):
+    """Series built from rollups and history match counts over the raw rows"""
+
+    def test_daily_series_match_raw_rows(self):
+        check_ins = self.raw_check_ins()
+        payments = self.raw_payments()
+        walk_ins = [(day, 1) for day, _ in self.raw_payments(stored_member_id=GUEST_MEMBER_ID)]
+        for period in PERIODS[1:]:
+            layout = build_layout(period)
+            with self.subTest(period=period):
+                self.assertEqual(metric_series('check_ins', layout), bucket_totals(layout, check_ins))
+                self.assertEqual(metric_series('walk_ins', layout), bucket_totals(layout, walk_ins))
+                self.assertEqual(
+                    metric_series('member_check_ins', layout),
+                    bucket_totals(layout, check_ins + walk_ins)
+                )
+                self.assertEqual(
+                    metric_series('total_transactions', layout),
+                    bucket_totals(layout, [(day, 1) for day, _ in payments])
+                )
+                self.assertEqual(
+                    metric_series('revenue', layout),
+                    [float(total) for total in bucket_totals(layout, payments)]
+                )
+
+    def test_hourly_series_match_raw_rows(self):
+        today = local_today()
+        layout = build_layout('1d')
+        hours = [0] * 24
+        for check_in_time in GymCheckIn.objects.filter(date=today).values_list('check_in_time', flat=True):
+            hours[check_in_time.astimezone(MANILA_TZ).hour] += 1
+        self.assertEqual(metric_series('check_ins', layout), hours)
+        self.assertEqual(sum(metric_series('revenue', layout)), float(sum(
+            amount for _, amount in self.raw_payments(business_date=today)
+        )))
+
+    def test_all_time_series_starts_at_first_record(self):
+        labels, data = build_metric('check_ins', 'all')
+        first = local_today() - timedelta(days=max(self.DAYS_AGO))
+        layout = all_time_layout(first)
+        self.assertEqual(labels, layout.labels)
+        self.assertEqual(data, bucket_totals(layout, self.raw_check_ins()))
+
+    def test_late_evening_counts_on_its_manila_day(self):
+        # 00:30 Manila is 16:30 UTC the evening before
+        day = local_today() - timedelta(days=2)
+        GymCheckIn.objects.create(member=self.member, check_in_time=local_midnight(day) + timedelta(minutes=30), date=day)
+        layout = build_layout('1w')
+        series = metric_series('check_ins', layout)
+        index = [bucket.start for bucket in layout.buckets].index(day)
+        self.assertEqual(series[index], bucket_totals(layout, self.raw_check_ins())[index])
+        self.assertEqual(series[index], 1)
+
+
+class MetricCacheTests(MetricsTestCase):
+    """Responses are cached under table versions that committed writes replace"""
+
+    def counting(self):
+        calls = []
+
+        def compute():
+            calls.append(True)
+            return {'data': len(calls)}
+        return calls, compute
+
+    def test_check_in_bumps_version_and_serves_fresh_data(self):
+        before = metric_payload('check_ins', '1w', '', '')
+        versions = data_versions([CHECK_INS, PAYMENTS])
+        with self.captureOnCommitCallbacks(execute=True):
+            GymCheckIn.objects.create(member=self.member)
+        after = data_versions([CHECK_INS, PAYMENTS])
+        self.assertNotEqual(after[0], versions[0])
+        self.assertEqual(after[1], versions[1])
+        self.assertEqual(metric_payload('check_ins', '1w', '', '')['data'][-1], before['data'][-1] + 1)
+
+    def test_payment_bumps_version_and_serves_fresh_data(self):
+        before = metric_payload('revenue', '1m', '', '')
+        version = data_versions([PAYMENTS])
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(stored_member_id=GUEST_MEMBER_ID, stored_member_name='Guest', amount=Decimal('250.00'))
+        self.assertNotEqual(data_versions([PAYMENTS]), version)
+        self.assertEqual(metric_payload('revenue', '1m', '', '')['data'][-1], before['data'][-1] + 250.0)
+
+    def test_unrelated_write_keeps_cached_response(self):
+        calls, compute = self.counting()
+        cached_metric('check_ins', '1w', '', '', compute)
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(stored_member_id=GUEST_MEMBER_ID, stored_member_name='Guest', amount=Decimal('100.00'))
+        self.assertEqual(cached_metric('check_ins', '1w', '', '', compute), {'data': 1})
+        self.assertEqual(len(calls), 1)
+
+    def test_date_range_is_normalized_before_keying(self):
+        self.assertEqual(normalized_range('2026-1-5', ''), ('2026-01-05', ''))
+        self.assertEqual(normalized_range('2026-01-05', 'not-a-date'), ('', ''))
+
+        # Unparseable ranges are laid out as the period, so they share its entry
+        calls, compute = self.counting()
+        cached_metric('check_ins', '1w', '', '', compute)
+        cached_metric('check_ins', '1w', 'not-a-date', '', compute)
+        cached_metric('check_ins', '1w', '', 'x' * 500, compute)
+        self.assertEqual(len(calls), 1)
+        cached_metric('check_ins', '1w', '2026-1-5', '', compute)
+        cached_metric('check_ins', '1w', '2026-01-05', '', compute)
+        self.assertEqual(len(calls), 2)
+
+
+class ClosedHistoryTests(MetricsTestCase):
+    """Closed days come from stored history, cached per month until a write touches it"""
+
+    def registered_on(self, member_id, day):
+        member = create_member(member_id, day, day + timedelta(days=30))
+        Member.objects.filter(pk=member.pk).update(
+            date_created=local_midnight(day) + timedelta(hours=23, minutes=59, seconds=30),
+            business_date=day,
+        )
+        member.refresh_from_db()
+        return member
+
+    def test_closed_days_match_raw_rows_and_today_is_live(self):
+        today = local_today()
+        start = today - timedelta(days=60)
+        values = daily_values('check_ins', start, today)
+        raw = Counter(GymCheckIn.objects.filter(date__gte=start).values_list('date', flat=True))
+        self.assertEqual({day: value for day, value in values.items() if value}, dict(raw))
+        self.assertIn(today, values)
+
+    def test_members_registered_after_the_snapshot_count_as_new(self):
+        yesterday = local_today() - timedelta(days=1)
+        ActiveMemberSnapshot.create_snapshot(yesterday)
+        self.registered_on('GYM0000002', yesterday)
+        self.assertEqual(daily_values('new_members', yesterday, yesterday), {yesterday: 1})
+
+    def test_deleting_a_member_invalidates_their_month(self):
+        day = local_today() - timedelta(days=40)
+        member = self.registered_on('GYM0000003', day)
+        self.assertEqual(daily_values('new_members', day, day), {day: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            member.is_deleted = True
+            member.save()
+        self.assertEqual(daily_values('new_members', day, day), {})
+
+    def test_snapshot_command_retakes_yesterday(self):
+        yesterday = local_today() - timedelta(days=1)
+        # A snapshot taken before the day closed
+        ActiveMemberSnapshot.objects.create(date=yesterday, active_count=0)
+        call_command('create_member_snapshots', '--days', '2', stdout=StringIO())
+        self.assertEqual(ActiveMemberSnapshot.objects.get(date=yesterday).active_count, 1)
+        self.assertTrue(ActiveMemberSnapshot.objects.filter(date=local_today()).exists())
+
+
+class MetricBatchTests(MetricsTestCase):
+    """One batch request returns the same series as one request per metric"""
+
+    METRICS = ('check_ins', 'walk_ins', 'member_check_ins', 'revenue', 'active_members', 'payment_methods')
+
+    def test_batch_matches_single_metrics_and_raw_rows(self):
+        user = StaffUser.objects.create_user(username='owner', password='testpass123', email='owner@example.com')
+        self.client.force_login(user)
+        for period in ('1d', '1m', '1y'):
+            with self.subTest(period=period):
+                response = self.client.get(reverse('metrics:get_metrics_batch'), {
+                    'metrics': ','.join(self.METRICS + ('no_such_metric',)),
+                    'period': period,
+                })
+                series = response.json()['series']
+                self.assertEqual(sorted(series), sorted(self.METRICS))
+
+                cache.clear()
+                for metric_type in self.METRICS:
+                    single = self.client.get(reverse('metrics:get_metrics_data'), {'metric': metric_type, 'period': period})
+                    self.assertEqual(series[metric_type], single.json())
+
+                if period != '1d':
+                    layout = build_layout(period)
+                    self.assertEqual(series['check_ins']['data'], bucket_totals(layout, self.raw_check_ins()))
+                    self.assertEqual(
+                        series['revenue']['data'],
+                        [float(total) for total in bucket_totals(layout, self.raw_payments())]
+                    )
+
+    def test_shared_inputs_are_read_once(self):
+        layout = build_layout('1m')
+        inputs = SeriesInputs()
+        with mock.patch('metrics.history.daily_values', wraps=daily_values) as read:
+            for metric_type in ('check_ins', 'walk_ins', 'member_check_ins'):
+                metric_series(metric_type, layout, inputs)
+        # member_check_ins reuses the check-ins and walk-ins already read
+        self.assertEqual(sorted(call.args[0] for call in read.call_args_list), ['check_ins', 'walk_ins'])
+        self.assertEqual(
+            metric_series('member_check_ins', layout, inputs),
+            metric_series('member_check_ins', layout)
+        )
+
+
+class SnapshotBackfillTests(MetricsTestCase):
+    """A bulk backfill writes the same snapshots as taking them one day at a time"""
+
+    FIELDS = ('active_count', 'total_members', 'new_members_today', 'expired_today',
+              'total_revenue_today', 'check_ins_today')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = local_today()
+        # (registered days ago, start days ago, end days ago, active, deleted)
+        for index, (registered, start, end, is_active, is_deleted) in enumerate([
+            (120, 120, 90, True, False),
+            (100, 95, 60, True, False),
+            (60, 60, -30, True, False),
+            (45, 45, 10, False, False),
+            (30, 30, 0, True, False),
+            (20, 20, -5, True, True),
+            (3, 3, -27, True, False),
+        ]):
+            member = create_member(
+                f'GYM10{index:05d}', today - timedelta(days=start), today - timedelta(days=end), is_active=is_active
+            )
+            Member.objects.filter(pk=member.pk).update(
+                business_date=today - timedelta(days=registered), is_deleted=is_deleted
+            )
+
+    def snapshot_values(self, snapshot):
+        return {field: getattr(snapshot, field) for field in self.FIELDS}
+
+    def test_backfill_matches_daily_snapshots(self):
+        end_date = local_today()
+        start_date = end_date - timedelta(days=130)
+        backfilled = {
+            snapshot.date: self.snapshot_values(snapshot)
+            for snapshot in ActiveMemberSnapshot.backfill(start_date, end_date)
+        }
+        self.assertEqual(len(backfilled), 131)
+        self.assertEqual(
+            {day: self.snapshot_values(ActiveMemberSnapshot.objects.get(date=day)) for day in backfilled},
+            backfilled
+        )
+        day = start_date
+        while day <= end_date:
+            with self.subTest(day=day):
+                self.assertEqual(self.snapshot_values(ActiveMemberSnapshot.create_snapshot(day)), backfilled[day])
+            day += timedelta(days=1)
+
+    def test_backfill_queries_do_not_grow_with_the_range(self):
+        end_date = local_today()
+        with CaptureQueriesContext(connection) as week:
+            ActiveMemberSnapshot.backfill(end_date - timedelta(days=6), end_date)
+        with CaptureQueriesContext(connection) as years:
+            ActiveMemberSnapshot.backfill(end_date - timedelta(days=1094), end_date)
+        self.assertEqual(len(years), len(week))
+
+    def test_backfill_without_overwrite_keeps_existing_snapshots(self):
+        yesterday = local_today() - timedelta(days=1)
+        ActiveMemberSnapshot.objects.create(date=yesterday, active_count=99)
+        ActiveMemberSnapshot.backfill(yesterday - timedelta(days=6), yesterday, overwrite=False)
+        self.assertEqual(ActiveMemberSnapshot.objects.get(date=yesterday).active_count, 99)
+        self.assertEqual(ActiveMemberSnapshot.objects.filter(date__lte=yesterday).count(), 7)
+        ActiveMemberSnapshot.backfill(yesterday, yesterday)
+        self.assertEqual(
+            ActiveMemberSnapshot.objects.get(date=yesterday).active_count,
+            ActiveMemberSnapshot.create_snapshot(yesterday).active_count
+        )
+
+
+class ActiveMemberCountTests(MetricsTestCase):
+    """The interval sweep counts the same members as one overlap query per day"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = local_today()
+        # (start days ago, end days ago, active, deleted)
+        for index, (start, end, is_active, is_deleted) in enumerate([
+            (400, 200, True, False),    # Ends before the range
+            (200, 60, True, False),     # Ends on its first day
+            (90, 30, True, False),
+            (59, 59, True, False),      # A one-day membership
+            (45, -10, True, False),
+            (45, -10, True, False),     # Same interval twice
+            (30, 0, True, False),       # Ends today
+            (20, 5, False, False),
+            (15, -30, True, True),
+            (-5, -40, True, False),     # Starts after the range
+        ]):
+            member = create_member(
+                f'GYM20{index:05d}', today - timedelta(days=start), today - timedelta(days=end), is_active=is_active
+            )
+            if is_deleted:
+                Member.objects.filter(pk=member.pk).update(is_deleted=True)
+
+    def raw_active_count(self, day):
+        return Member.objects.filter(
+            is_active=True, is_deleted=False, start_date__lte=day, end_date__gte=day
+        ).count()
+
+    def test_sweep_matches_per_day_counts(self):
+        today = local_today()
+        start_date = today - timedelta(days=60)
+        counts = active_member_counts(start_date, today)
+        self.assertEqual(list(counts), [start_date + timedelta(days=offset) for offset in range(61)])
+        for day, count in counts.items():
+            with self.subTest(day=day):
+                self.assertEqual(count, self.raw_active_count(day))
+        self.assertEqual(active_member_counts(today, today - timedelta(days=1)), {})
+
+    def test_active_member_series_match_per_day_counts(self):
+        today = local_today()
+        for period in ('1w', '1m', '3m'):
+            layout = build_layout(period)
+            with self.subTest(period=period):
+                self.assertEqual(
+                    metric_series('active_members', layout),
+                    [self.raw_active_count(min(day, today)) for day in layout.bucket_ends]
+                )
+
+
+class HourlyHistogramTests(MetricsTestCase):
+    """Hours grouped in Postgres match converting every row to Manila time in Python"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = local_today()
+        midnight = local_midnight(today)
+        # The day's first and last instants, and the next day's first, which belongs to tomorrow
+        for when in (midnight, midnight + timedelta(hours=13, minutes=15),
+                     midnight + timedelta(days=1, microseconds=-1), midnight + timedelta(days=1)):
+            GymCheckIn.objects.create(member=cls.member, check_in_time=when, date=when.astimezone(MANILA_TZ).date())
+            Payment.objects.create(
+                stored_member_id=GUEST_MEMBER_ID,
+                stored_member_name='Guest',
+                amount=Decimal('80.00'),
+                payment_date=when,
+            )
+
+    def raw_hours(self, rows, day):
+        hours = [0] * 24
+        for when, value in rows:
+            local = when.astimezone(MANILA_TZ)
+            if local.date() == day:
+                hours[local.hour] += value
+        return hours
+
+    def test_histograms_match_python_hours(self):
+        today = local_today()
+        completed = Payment.objects.filter(status='Completed')
+        for day in (today, today - timedelta(days=1)):
+            with self.subTest(day=day):
+                self.assertEqual(source_histogram('check_ins', day), self.raw_hours(
+                    ((when, 1) for when in GymCheckIn.objects.values_list('check_in_time', flat=True)), day
+                ))
+                self.assertEqual(source_histogram('walk_ins', day), self.raw_hours(
+                    ((when, 1) for when in completed.filter(stored_member_id=GUEST_MEMBER_ID)
+                     .values_list('payment_date', flat=True)), day
+                ))
+                self.assertEqual(source_histogram('transactions', day), self.raw_hours(
+                    ((when, 1) for when in completed.values_list('payment_date', flat=True)), day
+                ))
+                self.assertEqual(source_histogram('revenue', day), self.raw_hours(
+                    completed.values_list('payment_date', 'amount'), day
+                ))
+                self.assertEqual(source_histogram('new_members', day), self.raw_hours(
+                    ((when, 1) for when in Member.objects.values_list('date_created', flat=True)), day
+                ))
+        self.assertEqual(source_histogram('check_ins', today)[0], 1)
+        self.assertEqual(source_histogram('check_ins', today)[23], 1)
+
+    def test_peak_hours_match_python_hours(self):
+        today = local_today()
+        rows = [(when, 1) for when in GymCheckIn.objects.values_list('check_in_time', flat=True)]
+        rows += [(when, 1) for when in Payment.objects.filter(
+            status='Completed', stored_member_id=GUEST_MEMBER_ID
+        ).values_list('payment_date', flat=True)]
+        self.assertEqual([hour['count'] for hour in peak_hours(today)], self.raw_hours(rows, today))
+
+
+class BusinessDateTests(MetricsTestCase):
+    """business_date holds the Manila date of each payment and member, on save and after the migration"""
+
+    def assertBusinessDates(self):
+        for payment_date, business_date in Payment.objects.values_list('payment_date', 'business_date'):
+            self.assertEqual(business_date, timezone.localdate(payment_date))
+        for date_created, business_date in Member.objects.values_list('date_created', 'business_date'):
+            self.assertEqual(business_date, timezone.localdate(date_created))
+
+    def test_saved_rows_carry_their_manila_date(self):
+        self.assertBusinessDates()
+        # 00:30 Manila is still the previous day in UTC
+        payment = Payment.objects.filter(member=self.member).first()
+        payment.payment_date = local_midnight(local_today() - timedelta(days=5)) + timedelta(minutes=30)
+        payment.save()
+        self.assertEqual(Payment.objects.get(pk=payment.pk).business_date, local_today() - timedelta(days=5))
+        self.assertBusinessDates()
+
+    def test_indexed_filters_match_timestamp_casts(self):
+        for days_ago in self.DAYS_AGO:
+            day = local_today() - timedelta(days=days_ago)
+            with self.subTest(day=day):
+                self.assertQuerySetEqual(
+                    Payment.objects.filter(business_date=day).order_by('pk'),
+                    Payment.objects.filter(payment_date__date=day).order_by('pk')
+                )
+
+    def test_migrations_backfill_existing_rows(self):
+        for label, model_name, migration in (
+            ('payments', 'Payment', '0007_payment_business_date'),
+            ('memberships', 'Member', '0007_member_business_date'),
+        ):
+            model = django_apps.get_model(label, model_name)
+            model.objects.update(business_date=None)
+            import_module(f'{label}.migrations.{migration}').backfill_business_date(django_apps, None)
+            self.assertFalse(model.objects.filter(business_date__isnull=True).exists())
+        self.assertBusinessDates()
+
+
+class AttendanceHeatmapTests(MetricsTestCase):
+    """The hourly attendance table and the heatmap read from it agree with the raw rows"""
+
+    def raw_attendance(self):
+        """(Manila date, hour) -> [check-ins, walk-ins] over the raw rows"""
+        counts = {}
+        for when in GymCheckIn.objects.values_list('check_in_time', flat=True):
+            local = when.astimezone(MANILA_TZ)
+            counts.setdefault((local.date(), local.hour), [0, 0])[0] += 1
+        for when in Payment.objects.filter(status='Completed', stored_member_id=GUEST_MEMBER_ID).values_list(
+            'payment_date', flat=True
+        ):
+            local = when.astimezone(MANILA_TZ)
+            counts.setdefault((local.date(), local.hour), [0, 0])[1] += 1
+        return counts
+
+    def stored_attendance(self):
+        return {
+            (day, hour): [check_ins, walk_ins]
+            for day, hour, check_ins, walk_ins in HourlyAttendance.objects.values_list(
+                'date', 'hour', 'check_in_count', 'walk_in_count'
+            )
+            if check_ins or walk_ins
+        }
+
+    def test_signal_maintained_rows_match_rebuild_and_raw_rows(self):
+        # Edits after the fact: a refund, a deleted check-in and a walk-in moved to another hour
+        Payment.objects.filter(stored_member_id=GUEST_MEMBER_ID, status='Completed').first().delete()
+        refunded = Payment.objects.filter(stored_member_id=GUEST_MEMBER_ID, status='Completed').first()
+        refunded.status = 'Refunded'
+        refunded.save()
+        GymCheckIn.objects.first().delete()
+        moved = Payment.objects.filter(stored_member_id=GUEST_MEMBER_ID, status='Completed').last()
+        moved.payment_date += timedelta(hours=3)
+        moved.save()
+
+        maintained = self.stored_attendance()
+        self.assertEqual(maintained, self.raw_attendance())
+        HourlyAttendance.rebuild()
+        self.assertEqual(self.stored_attendance(), maintained)
+
+    def test_heatmap_matches_raw_weekday_hour_averages(self):
+        today = local_today()
+        attendance = self.raw_attendance()
+        for period in ('1m', '6m', '1y', 'all'):
+            layout = build_layout(period)
+            if layout is None:
+                start_date, end_date = min(day for day, _ in attendance), today
+            else:
+                start_date, end_date = layout.start_date, min(layout.end_date, today)
+
+            totals = [[0] * 24 for _ in range(7)]
+            for (day, hour), counts in attendance.items():
+                if start_date <= day <= end_date:
+                    totals[day.weekday()][hour] += sum(counts)
+            weekdays = Counter(
+                (start_date + timedelta(days=offset)).weekday() for offset in range((end_date - start_date).days + 1)
+            )
+            with self.subTest(period=period):
+                labels, data = attendance_heatmap(layout)
+                self.assertEqual(labels, ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+                self.assertEqual(data, [
+                    [round(total / weekdays[weekday], 1) for total in hours]
+                    for weekday, hours in enumerate(totals)
+                ])
+
+    def test_heatmap_reads_one_grouped_query(self):
+        layout = build_layout('1y')
+        with self.assertNumQueries(1):
+            attendance_heatmap(layout)
+
+
+class DailyRollupTests(MetricsTestCase):
+    """Rollups moved by signals equal a rebuild from the raw rows and a naive count"""
+
+    ROLLUP_FIELDS = ('revenue', 'transaction_count', 'walk_in_count', 'walk_in_revenue',
+                     'check_in_count', 'unique_members_checked_in')
+
+    def stored_rollups(self):
+        daily = {
+            row[0]: row[1:] for row in DailyRollup.objects.values_list('date', *self.ROLLUP_FIELDS)
+            if any(row[1:])
+        }
+        methods = {
+            (day, method): (count, revenue)
+            for day, method, count, revenue in DailyPaymentMethodRollup.objects.values_list(
+                'date', 'payment_method', 'transaction_count', 'revenue'
+            )
+            if count
+        }
+        return daily, methods
+
+    def raw_method_totals(self):
+        totals = {}
+        for day, method, amount in Payment.objects.filter(status='Completed').values_list(
+            'business_date', 'payment_method', 'amount'
+        ):
+            count, revenue = totals.get((day, method), (0, 0))
+            totals[(day, method)] = (count + 1, revenue + amount)
+        return totals
+
+    def test_signal_maintained_rollups_match_rebuild(self):
+        # Edits after the fact: a refund, a method change, a moved payment and a deleted check-in
+        payments = list(Payment.objects.filter(status='Completed').order_by('pk'))
+        payments[0].status = 'Refunded'
+        payments[0].save()
+        payments[1].payment_method = 'Cash' if payments[1].payment_method != 'Cash' else 'GCash'
+        payments[1].save()
+        payments[2].payment_date -= timedelta(days=2)
+        payments[2].amount += 25
+        payments[2].save()
+        payments[3].delete()
+        GymCheckIn.objects.order_by('pk').first().delete()
+
+        maintained = self.stored_rollups()
+        self.assertEqual(maintained[1], self.raw_method_totals())
+        DailyRollup.rebuild()
+        self.assertEqual(self.stored_rollups(), maintained)
+
+    def test_rebuilt_range_leaves_other_days_alone(self):
+        today = local_today()
+        before = self.stored_rollups()
+        DailyRollup.objects.filter(date__gte=today - timedelta(days=7)).update(revenue=0, check_in_count=0)
+        DailyRollup.rebuild(today - timedelta(days=7), today)
+        self.assertEqual(self.stored_rollups(), before)
+
+    def test_payment_method_breakdown_matches_raw_counts(self):
+        for period in ('1w', '1m', '1y', 'all'):
+            layout = build_layout(period)
+            counts = Counter()
+            for (day, method), (count, _) in self.raw_method_totals().items():
+                if layout is None or layout.start_date <= day <= layout.end_date:
+                    counts[method] += count
+            with self.subTest(period=period):
+                labels, data = build_metric('payment_methods', period)
+                self.assertEqual(dict(zip(labels, data)), dict(counts))
+                self.assertEqual(data, sorted(data, reverse=True))
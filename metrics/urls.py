@@ -6,4 +6,5 @@ app_name = "metrics"
 urlpatterns = [
     path("", views.metrics, name="metrics"),
     path("api/data/", views.get_metrics_data, name="get_metrics_data"),
+    path("api/batch/", views.get_metrics_batch, name="get_metrics_batch"),
 ]
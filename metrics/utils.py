@@ -0,0 +1,492 @@
+from django.db.models import Count, Sum, Min, Q, F
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from bisect import bisect_right
+import calendar
+import zoneinfo
+from dashboard.models import GymCheckIn
+from memberships.models import Member
+from payments.models import Payment
+from metrics.models import DailyRollup, DailyPaymentMethodRollup, HourlyAttendance
+
+
+MANILA_TZ = zoneinfo.ZoneInfo('Asia/Manila')
+
+GUEST_MEMBER_ID = 'GYMMSGUEST'
+
+
+def local_today():
+    """Current business date in Manila time"""
+    return timezone.now().astimezone(MANILA_TZ).date()
+
+
+def local_midnight(day):
+    """Aware datetime for the start of a Manila business date"""
+    return datetime.combine(day, datetime.min.time()).replace(tzinfo=MANILA_TZ)
+
+
+def hour_label(hour):
+    """Format an hour of the day as 12AM, 1AM ... 11PM"""
+    suffix = 'AM' if hour < 12 else 'PM'
+    display_hour = hour if hour <= 12 else hour - 12
+    display_hour = 12 if display_hour == 0 else display_hour
+    return f'{display_hour}{suffix}'
+
+
+class Bucket:
+    """
+    One point on a chart
+    `start`/`end` are inclusive dates, or hours of the day for hourly layouts
+    """
+    __slots__ = ('label', 'start', 'end')
+
+    def __init__(self, label, start, end):
+        self.label = label
+        self.start = start
+        self.end = end
+
+
+class SeriesLayout:
+    """
+    Buckets for a chart plus the grain used to group rows in the database
+    Grain is one of 'hour', 'day', 'week', 'month' or 'year'
+    """
+
+    def __init__(self, grain, buckets, day):
+        self.grain = grain
+        self.buckets = buckets
+        # Hourly layouts cover a single day; the others span their buckets
+        self.start_date = day if grain == 'hour' else buckets[0].start
+        self.end_date = day if grain == 'hour' else buckets[-1].end
+
+    @property
+    def is_hourly(self):
+        return self.grain == 'hour'
+
+    @property
+    def labels(self):
+        return [bucket.label for bucket in self.buckets]
+
+    @property
+    def bucket_ends(self):
+        """Last date covered by each bucket (the day itself for hourly layouts)"""
+        if self.is_hourly:
+            return [self.end_date for _ in self.buckets]
+        return [bucket.end for bucket in self.buckets]
+
+
+def hourly_layout(day, step=1):
+    buckets = [Bucket(hour_label(hour), hour, hour + step - 1) for hour in range(0, 24, step)]
+    return SeriesLayout('hour', buckets, day)
+
+
+def stride_layout(start_date, end_date, days, label_format):
+    """Buckets of `days` days starting at start_date, the last one clipped to end_date"""
+    starts = []
+    current = start_date
+    while current <= end_date:
+        starts.append(current)
+        current += timedelta(days=days)
+    return offsets_layout(starts, end_date, label_format)
+
+
+def offsets_layout(starts, end_date, label_format):
+    """Day buckets that begin at each date in `starts` and run until the next one"""
+    buckets = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] - timedelta(days=1) if index + 1 < len(starts) else end_date
+        buckets.append(Bucket(start.strftime(label_format), start, end))
+    return SeriesLayout('day', buckets, end_date)
+
+
+def calendar_layout(grain, start_date, end_date, label_format):
+    """Week, month or year buckets aligned to the calendar (weeks start on Monday)"""
+    if grain == 'week':
+        current = start_date - timedelta(days=start_date.weekday())
+        step = relativedelta(weeks=1)
+    elif grain == 'month':
+        current = start_date.replace(day=1)
+        step = relativedelta(months=1)
+    else:
+        current = start_date.replace(month=1, day=1)
+        step = relativedelta(years=1)
+
+    buckets = []
+    while current <= end_date:
+        if grain == 'week':
+            end = current + timedelta(days=6)
+        elif grain == 'month':
+            end = current.replace(day=calendar.monthrange(current.year, current.month)[1])
+        else:
+            end = current.replace(month=12, day=31)
+        buckets.append(Bucket(current.strftime(label_format), current, end))
+        current = current + step
+    return SeriesLayout(grain, buckets, end_date)
+
+
+def build_layout(period, date_from='', date_to=''):
+    """
+    Chart layout for a predefined period or a custom date range
+    Returns None for 'all', whose range depends on the metric's earliest record
+    """
+    today = local_today()
+
+    if date_from or date_to:
+        try:
+            start_date = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else today - timedelta(days=30)
+            end_date = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else today
+        except ValueError:
+            # Invalid date format, fall back to the predefined period
+            start_date = None
+
+        if start_date is not None:
+            days_diff = (end_date - start_date).days
+            if days_diff <= 1:
+                # 4-hour blocks for the last day of the range
+                return hourly_layout(end_date, step=4)
+            if days_diff <= 7:
+                return stride_layout(start_date, end_date, 1, '%a %d')
+            if days_diff <= 90:
+                return stride_layout(start_date, end_date, 3, '%b %d')
+            return calendar_layout('week', start_date, end_date, '%b %d')
+
+    if period == '1d':
+        return hourly_layout(today)
+    if period == '1w':
+        return stride_layout(today - timedelta(days=6), today, 1, '%a %d')
+    if period == '1m':
+        # Last 30 days, labelled every 5 days to avoid clutter
+        start_date = today - timedelta(days=29)
+        starts = [start_date + timedelta(days=offset) for offset in (0, 5, 10, 15, 20, 25, 29)]
+        return offsets_layout(starts, today, '%b %d')
+    if period == '3m':
+        return calendar_layout('month', today - relativedelta(months=3), today, '%B %Y')
+    if period == '6m':
+        return stride_layout(today - relativedelta(months=6), today, 3, '%b %d')
+    if period == '1y':
+        return calendar_layout('week', today - relativedelta(months=12), today, '%b %d')
+    if period == '3y':
+        return calendar_layout('year', today - relativedelta(years=3), today, '%Y')
+    return None
+
+
+def all_time_layout(first_date):
+    """Weekly buckets from the earliest record up to today"""
+    return calendar_layout('week', first_date, local_today(), '%b %d, %Y')
+
+
+def hourly_histogram(queryset, datetime_field, day, value=None):
+    """
+    24 totals of `value` (default: row count), one per Manila hour of `day`
+    Hours are extracted in Asia/Manila inside Postgres with one grouped query
+    """
+    value = value if value is not None else Count('pk')
+    start = local_midnight(day)
+    rows = queryset.order_by().filter(**{
+        f'{datetime_field}__gte': start,
+        f'{datetime_field}__lt': start + timedelta(days=1),
+    }).annotate(
+        hour=ExtractHour(datetime_field, tzinfo=MANILA_TZ)
+    ).values('hour').annotate(total=value)
+
+    totals = [0] * 24
+    for row in rows:
+        if row['total'] is not None:
+            totals[row['hour']] += row['total']
+    return totals
+
+
+def source_histogram(name, day):
+    """
+    Hourly histogram of one raw source for a business date
+    Sources: check_ins, walk_ins, revenue, transactions, new_members
+    """
+    completed = Payment.objects.filter(status='Completed')
+    if name == 'check_ins':
+        return hourly_histogram(GymCheckIn.objects.all(), 'check_in_time', day)
+    if name == 'walk_ins':
+        return hourly_histogram(completed.filter(stored_member_id=GUEST_MEMBER_ID), 'payment_date', day)
+    if name == 'revenue':
+        return hourly_histogram(completed, 'payment_date', day, value=Sum('amount'))
+    if name == 'transactions':
+        return hourly_histogram(completed, 'payment_date', day)
+    if name == 'new_members':
+        return hourly_histogram(Member.objects.filter(is_deleted=False), 'date_created', day)
+    raise ValueError(f'Unknown hourly source: {name}')
+
+
+def fold_into_buckets(pairs, layout):
+    """Sum (bucket key, value) pairs into the bucket whose range holds each key"""
+    starts = [bucket.start for bucket in layout.buckets]
+    totals = [0] * len(starts)
+    for key, total in pairs:
+        if key is None or total is None:
+            continue
+        index = bisect_right(starts, key) - 1
+        if 0 <= index < len(totals) and key <= layout.buckets[index].end:
+            totals[index] += total
+    return totals
+
+
+def active_member_counts(start_date, end_date):
+    """
+    Active members on every date in [start_date, end_date]
+    Loads the overlapping membership intervals once and sweeps their sorted
+    +1/-1 boundaries instead of counting interval overlaps per date
+    """
+    intervals = Member.objects.filter(
+        is_active=True,
+        is_deleted=False,
+        start_date__lte=end_date,
+        end_date__gte=start_date
+    ).order_by().values_list('start_date', 'end_date')
+
+    events = []
+    for member_start, member_end in intervals:
+        events.append((max(member_start, start_date), 1))
+        events.append((member_end + timedelta(days=1), -1))
+    events.sort()
+
+    counts = {}
+    active = 0
+    index = 0
+    current = start_date
+    while current <= end_date:
+        while index < len(events) and events[index][0] <= current:
+            active += events[index][1]
+            index += 1
+        counts[current] = active
+        current += timedelta(days=1)
+    return counts
+
+
+class SeriesInputs:
+    """
+    Memo of the inputs series are built from during one request
+    Metrics that share an input (check-ins, revenue, active members, ...)
+    over the same range read it once
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def _memo(self, key, compute):
+        if key not in self._values:
+            self._values[key] = compute()
+        return self._values[key]
+
+    def daily(self, name, layout):
+        """Daily values of a history input over the layout's range"""
+        from metrics.history import daily_values
+        return self._memo(
+            ('daily', name, layout.start_date, layout.end_date),
+            lambda: daily_values(name, layout.start_date, layout.end_date)
+        )
+
+    def hourly(self, name, layout):
+        """Hourly totals of a raw source folded into the layout's hour buckets"""
+        hours = self._memo(
+            ('hourly', name, layout.start_date),
+            lambda: source_histogram(name, layout.start_date)
+        )
+        return fold_into_buckets(enumerate(hours), layout)
+
+
+def daily_totals(layout, inputs, *names):
+    """
+    Sum daily inputs into the layout's buckets
+    Closed days come from cached history and only today is computed live
+    """
+    totals = [0] * len(layout.buckets)
+    for name in names:
+        values = inputs.daily(name, layout)
+        for index, total in enumerate(fold_into_buckets(values.items(), layout)):
+            totals[index] += total
+    return totals
+
+
+def active_member_points(layout, inputs):
+    """Active members at the end of each bucket (today for the bucket in progress)"""
+    today = local_today()
+    values = inputs.daily('active_members', layout)
+    return [values.get(min(day, today), 0) for day in layout.bucket_ends]
+
+
+def average_active_members(layout, inputs):
+    """Average daily active members over the elapsed days of each bucket"""
+    today = local_today()
+    values = inputs.daily('active_members', layout)
+    sums = fold_into_buckets(values.items(), layout)
+
+    averages = []
+    for bucket, total in zip(layout.buckets, sums):
+        elapsed_days = (min(bucket.end, today) - bucket.start).days + 1
+        averages.append(total / elapsed_days if elapsed_days > 0 else 0)
+    return averages
+
+
+# Rollup field backing each daily metric
+ROLLUP_FIELDS = {
+    'check_ins': ('check_in_count',),
+    'walk_ins': ('walk_in_count',),
+    'member_check_ins': ('check_in_count', 'walk_in_count'),
+    'revenue': ('revenue',),
+    'total_transactions': ('transaction_count',),
+}
+
+
+def first_record_date(metric_type):
+    """Earliest local date with data for a metric, used to lay out the 'all' period"""
+    def first_rollup(*fields):
+        has_data = Q()
+        for field in fields:
+            has_data |= Q(**{f'{field}__gt': 0})
+        return DailyRollup.objects.filter(has_data).aggregate(first=Min('date'))['first']
+
+    def first_member():
+        return Member.objects.filter(is_deleted=False).aggregate(first=Min('business_date'))['first']
+
+    if metric_type in ROLLUP_FIELDS:
+        candidates = [first_rollup(*ROLLUP_FIELDS[metric_type])]
+    elif metric_type in ('new_members', 'active_members'):
+        candidates = [first_member()]
+    else:
+        candidates = [first_rollup('transaction_count'), first_member()]
+
+    candidates = [day for day in candidates if day]
+    return min(candidates) if candidates else None
+
+
+# Daily history inputs summed for each additive metric
+DAILY_INPUTS = {
+    'check_ins': ('check_ins',),
+    'walk_ins': ('walk_ins',),
+    'member_check_ins': ('check_ins', 'walk_ins'),
+    'revenue': ('revenue',),
+    'total_transactions': ('transactions',),
+    'new_members': ('new_members',),
+}
+
+
+def hourly_series(metric_type, layout, inputs):
+    """Data points for a single day laid out by hour, grouped in the database"""
+    if metric_type == 'revenue':
+        return [float(total) for total in inputs.hourly('revenue', layout)]
+
+    if metric_type in DAILY_INPUTS:
+        # Member check-ins (total) add walk-ins to registered member check-ins
+        totals = [0] * len(layout.buckets)
+        for name in DAILY_INPUTS[metric_type]:
+            totals = [total + value for total, value in zip(totals, inputs.hourly(name, layout))]
+        return totals
+
+    if metric_type in ('active_members', 'revenue_per_member'):
+        # Active members don't change hourly, so every hour shows the day's value
+        active = inputs.daily('active_members', layout).get(layout.end_date, 0)
+        if metric_type == 'active_members':
+            return [active for _ in layout.buckets]
+        day_revenue = float(sum(inputs.hourly('revenue', layout)))
+        return [round(day_revenue / (active or 1), 2) for _ in layout.buckets]
+
+    return []
+
+
+def metric_series(metric_type, layout, inputs=None):
+    """Data points for a time-series metric laid out on `layout`"""
+    inputs = inputs or SeriesInputs()
+
+    if layout.is_hourly:
+        return hourly_series(metric_type, layout, inputs)
+
+    if metric_type == 'revenue':
+        return [float(total) for total in daily_totals(layout, inputs, 'revenue')]
+
+    if metric_type in DAILY_INPUTS:
+        return daily_totals(layout, inputs, *DAILY_INPUTS[metric_type])
+
+    if metric_type == 'active_members':
+        return active_member_points(layout, inputs)
+
+    if metric_type == 'revenue_per_member':
+        revenues = daily_totals(layout, inputs, 'revenue')
+        members = average_active_members(layout, inputs)
+        return [round(float(revenue) / (active or 1), 2) for revenue, active in zip(revenues, members)]
+
+    return []
+
+
+def payment_method_breakdown(layout):
+    """Completed payment counts per method over the layout's date range (or all time)"""
+    rollups = DailyPaymentMethodRollup.objects.order_by()
+    if layout is not None:
+        rollups = rollups.filter(date__gte=layout.start_date, date__lte=layout.end_date)
+    method_counts = rollups.values('payment_method').annotate(
+        count=Sum('transaction_count')
+    ).filter(count__gt=0).order_by('-count')
+    labels = [item['payment_method'] for item in method_counts]
+    data = [item['count'] for item in method_counts]
+    return labels, data
+
+
+WEEKDAY_LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def attendance_heatmap(layout):
+    """
+    Average check-ins plus walk-ins for each weekday (rows) and Manila hour (columns)
+    Read from HourlyAttendance with one grouped query, so cost doesn't grow with history
+    """
+    rows = HourlyAttendance.objects.order_by()
+    if layout is not None:
+        rows = rows.filter(date__gte=layout.start_date, date__lte=layout.end_date)
+        start_date = layout.start_date
+    else:
+        start_date = rows.aggregate(first=Min('date'))['first']
+
+    totals = [[0] * 24 for _ in WEEKDAY_LABELS]
+    for item in rows.annotate(weekday=ExtractIsoWeekDay('date')).values('weekday', 'hour').annotate(
+        total=Sum(F('check_in_count') + F('walk_in_count'))
+    ):
+        totals[item['weekday'] - 1][item['hour']] += item['total'] or 0
+
+    if start_date is None:
+        return WEEKDAY_LABELS, totals
+
+    # Average over how many of each weekday the elapsed range holds
+    end_date = min(layout.end_date, local_today()) if layout is not None else local_today()
+    weekday_counts = [0] * 7
+    current = start_date
+    while current <= end_date:
+        weekday_counts[current.weekday()] += 1
+        current += timedelta(days=1)
+    data = [
+        [round(total / (weekday_counts[weekday] or 1), 1) for total in hours]
+        for weekday, hours in enumerate(totals)
+    ]
+    return WEEKDAY_LABELS, data
+
+
+def build_metric(metric_type, period, date_from='', date_to='', inputs=None):
+    """
+    Labels and data for one metric over a period or custom range
+    Daily and longer series read closed days from history and compute only
+    today live; hourly series use one grouped query per source table
+    """
+    layout = build_layout(period, date_from, date_to)
+
+    if metric_type == 'payment_methods':
+        return payment_method_breakdown(layout)
+
+    if metric_type == 'attendance_heatmap':
+        return attendance_heatmap(layout)
+
+    if layout is None:
+        first_date = first_record_date(metric_type)
+        if first_date is None:
+            empty_label = 'No Check-ins Yet' if metric_type == 'check_ins' else 'No Data'
+            return [empty_label], [0]
+        layout = all_time_layout(first_date)
+
+    return layout.labels, metric_series(metric_type, layout, inputs)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:05
+
+import zoneinfo
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_business_date(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    Payment.objects.filter(business_date__isnull=True).update(
+        business_date=TruncDate('payment_date', tzinfo=zoneinfo.ZoneInfo('Asia/Manila'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_alter_membershippricing_duration_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='business_date',
+            field=models.DateField(db_index=True, editable=False, help_text='Manila date of payment_date, set automatically on save', null=True),
+        ),
+        migrations.RunPython(backfill_business_date, migrations.RunPython.noop),
+    ]
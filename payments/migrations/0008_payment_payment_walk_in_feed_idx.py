@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_payment_business_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'Completed'), ('stored_member_id', 'GYMMSGUEST')), fields=['business_date', 'payment_date'], name='payment_walk_in_feed_idx'),
+        ),
+    ]
@@ -70,6 +70,12 @@ class Payment(models.Model):
         help_text='Reference number for GCash, Maya, or Bank Transfer'
     )
     payment_date = models.DateTimeField(default=timezone.now)
+    business_date = models.DateField(
+        null=True,
+        editable=False,
+        db_index=True,
+        help_text='Manila date of payment_date, set automatically on save'
+    )
     
     # Status and processing
     status = models.CharField(
@@ -97,6 +103,12 @@ class Payment(models.Model):
             models.Index(fields=['stored_member_id']),
             models.Index(fields=['payment_date']),
             models.Index(fields=['status']),
+            # Recent activity feed: a day's completed walk-ins newest first
+            models.Index(
+                fields=['business_date', 'payment_date'],
+                condition=models.Q(stored_member_id='GYMMSGUEST', status='Completed'),
+                name='payment_walk_in_feed_idx'
+            ),
         ]
 
     def __str__(self):
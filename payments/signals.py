@@ -1,5 +1,6 @@
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 from .models import Payment
 
 @receiver(pre_save, sender=Payment)
@@ -12,3 +13,13 @@ def set_payment_amount(sender, instance, **kwargs):
         instance.amount = instance.membership_plan.price
 
 
+
+
+@receiver(pre_save, sender=Payment)
+def set_payment_business_date(sender, instance, **kwargs):
+    """
+    Keep business_date in step with payment_date (Manila date)
+    Day filters use this indexed column instead of casting the timestamp
+    """
+    if instance.payment_date is not None:
+        instance.business_date = timezone.localdate(instance.payment_date)
@@ -60,8 +60,20 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // Search members via AJAX
+    // Search the browser's member index; ask the server only when it isn't available
     function searchMembers(query) {
+        const index = window.MemberIndex;
+        (index ? index.ready : Promise.resolve(false)).then(ready => {
+            if (ready) {
+                displaySearchResults(index.search(query));
+            } else {
+                searchMembersOnServer(query);
+            }
+        });
+    }
+
+    // Search members via AJAX
+    function searchMembersOnServer(query) {
         fetch(`/payments/search-members/?q=${encodeURIComponent(query)}`)
             .then(response => response.json())
             .then(data => {
@@ -1,3 +1,129 @@
 from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from .models import Payment
+from .views import stats_date_range
+from metrics.utils import local_today, local_midnight
+from users.models import StaffUser
+
+
+class TransactionStatsTests(TestCase):
+    """Rollup-backed and searched stats count the same completed payments over whole Manila days"""
+
+    PERIODS = ('1d', '1w', '1m', '6m', '1y', 'all')
+
+    # Filters answered from the rollups; the searched path applies the same ones to raw rows
+    FILTERS = (
+        {},
+        {'member_type': 'member'},
+        {'member_type': 'walkin'},
+        {'payment_method': 'Cash'},
+        {'payment_method': 'Digital'},
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = StaffUser.objects.create_user(username='owner', password='testpass123', email='owner@example.com')
+        today = local_today()
+        for index, (days_ago, minutes) in enumerate([
+            (0, 30),             # 00:30 Manila today is still yesterday in UTC
+            (0, 18 * 60),
+            (3, 9 * 60),
+            (6, 23 * 60 + 30),   # Last minutes of the week's first day
+            (7, 23 * 60 + 30),   # ...and of the day before it
+            (10, 12 * 60),
+            (40, 12 * 60),
+            (200, 12 * 60),
+            (500, 12 * 60),
+        ]):
+            when = local_midnight(today - timedelta(days=days_ago)) + timedelta(minutes=minutes)
+            walk_in = index % 3 == 0
+            Payment.objects.create(
+                stored_member_id='GYMMSGUEST' if walk_in else f'GYM{index:07d}',
+                stored_member_name='Guest Entry' if walk_in else f'Member Entry {index}',
+                amount=Decimal('150.00') + index * 10,
+                payment_method='GCash' if index % 2 else 'Cash',
+                payment_date=when,
+            )
+        # Never counted by either path
+        Payment.objects.create(
+            stored_member_id='GYM0000099',
+            stored_member_name='Member Entry Refunded',
+            amount=Decimal('999.00'),
+            status='Refunded',
+            payment_date=local_midnight(today) + timedelta(hours=1),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def stats(self, **params):
+        response = self.client.get(reverse('payments:transaction_stats'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def raw_totals(self, start_date, end_date, payment_method='', member_type=''):
+        payments = Payment.objects.filter(status='Completed', business_date__lte=end_date)
+        if start_date is not None:
+            payments = payments.filter(business_date__gte=start_date)
+        if payment_method == 'Digital':
+            payments = payments.filter(payment_method__in=Payment.DIGITAL_PAYMENT_METHODS)
+        elif payment_method:
+            payments = payments.filter(payment_method=payment_method)
+        if member_type == 'member':
+            payments = payments.exclude(stored_member_id='GYMMSGUEST')
+        elif member_type == 'walkin':
+            payments = payments.filter(stored_member_id='GYMMSGUEST')
+        amounts = list(payments.values_list('amount', flat=True))
+        return float(sum(amounts)), len(amounts)
+
+    def test_rollup_and_searched_paths_agree(self):
+        for period in self.PERIODS:
+            start_date, end_date = stats_date_range(period, '', '')
+            for filters in self.FILTERS:
+                with self.subTest(period=period, **filters):
+                    rollup = self.stats(period=period, **filters)
+                    # Every payment's name holds 'Entry', so this search matches them all
+                    searched = self.stats(period=period, search='Entry', **filters)
+                    revenue, count = self.raw_totals(start_date, end_date, **filters)
+                    for result in (rollup, searched):
+                        self.assertEqual(result['total_revenue'], revenue)
+                        self.assertEqual(result['total_count'], count)
+                        self.assertAlmostEqual(result['average_amount'], revenue / count if count else 0, places=2)
+
+    def test_periods_are_whole_business_days(self):
+        today = local_today()
+        self.assertEqual(stats_date_range('1d', '', ''), (today, today))
+        self.assertEqual(stats_date_range('1w', '', ''), (today - timedelta(days=6), today))
+        self.assertEqual(stats_date_range('all', '', ''), (None, today))
+        # Both of today's payments, including the one made before 08:00 UTC
+        self.assertEqual(self.stats(period='1d')['total_count'], 2)
+        # The week holds its first day's late payment but not the day before's
+        self.assertEqual(self.stats(period='1w')['total_count'], 4)
+
+    def test_explicit_dates_override_the_period(self):
+        today = local_today()
+        date_from = (today - timedelta(days=10)).isoformat()
+        date_to = (today - timedelta(days=3)).isoformat()
+        self.assertEqual(
+            stats_date_range('1d', date_from, date_to),
+            (today - timedelta(days=10), today - timedelta(days=3))
+        )
+        revenue, count = self.raw_totals(today - timedelta(days=10), today - timedelta(days=3))
+        for search in ('', 'Entry'):
+            result = self.stats(period='1d', date_from=date_from, date_to=date_to, search=search)
+            self.assertEqual((result['total_revenue'], result['total_count']), (revenue, count))
+            self.assertEqual(count, 4)
+
+    def test_invalid_dates_fall_back_to_the_period(self):
+        today = local_today()
+        self.assertEqual(stats_date_range('1w', 'yesterday', '2026-13-45'), (today - timedelta(days=6), today))
+        self.assertEqual(self.stats(period='1w', date_from='yesterday'), self.stats(period='1w'))
+        self.assertEqual(
+            self.stats(period='1w', date_to='not-a-date', search='Entry'),
+            self.stats(period='1w', search='Entry')
+        )
@@ -3,10 +3,14 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Sum, Avg, Count
+from django.db.models import Q, Sum, Avg, Count, Min
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from datetime import timedelta, datetime
 from memberships.models import Member
+from memberships import search as member_search
+from metrics.history import daily_values, method_input
+from metrics.models import DailyRollup
+from metrics.utils import local_today
 from .models import Payment, MembershipPricing
 
 
@@ -196,41 +200,17 @@ def search_members(request):
     if len(query) < 2:
         return JsonResponse({'members': []})
     
-    members = Member.objects.filter(
-        Q(member_id__icontains=query) |
-        Q(name__icontains=query) |
-        Q(phone_number__icontains=query) |
-        Q(email__icontains=query),
-        is_deleted=False
-    )[:10]  # Limit to 10 results
-    
-    today = timezone.now().date()
+    members = member_search.search_members(query)  # Best 10 matches, ranked in the database
     
     members_data = []
     for m in members:
-        # Determine status
-        if m.is_active:
-            if m.end_date >= today:
-                if m.is_expiring_soon():
-                    status = 'expiring'
-                    is_expiring_soon = True
-                else:
-                    status = 'active'
-                    is_expiring_soon = False
-            else:
-                status = 'expired'
-                is_expiring_soon = False
-        else:
-            status = 'inactive'
-            is_expiring_soon = False
-        
         members_data.append({
             'member_id': m.member_id,
             'name': m.name,
             'phone_number': m.phone_number,
             'email': m.email or '',
-            'status': status,
-            'is_expiring_soon': is_expiring_soon,
+            'status': m.status,
+            'is_expiring_soon': m.is_expiring_soon(),
             'end_date': m.end_date.strftime('%b %d, %Y'),
             'photo': m.photo.url if m.photo else None
         })
@@ -263,14 +243,14 @@ def transaction_history(request):
     if date_from:
         try:
             date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            transactions = transactions.filter(payment_date__date__gte=date_from_obj)
+            transactions = transactions.filter(business_date__gte=date_from_obj)
         except ValueError:
             pass
     
     if date_to:
         try:
             date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            transactions = transactions.filter(payment_date__date__lte=date_to_obj)
+            transactions = transactions.filter(business_date__lte=date_to_obj)
         except ValueError:
             pass
     
@@ -354,31 +334,30 @@ def transaction_stats(request):
     Also respects search and filter parameters
     """
     period = request.GET.get('period', '1d').lower()
+    search_query = request.GET.get('search', '').strip()
+    date_from = request.GET.get('date_from', '').strip()
+    date_to = request.GET.get('date_to', '').strip()
+    payment_method = request.GET.get('payment_method', '').strip()
+    member_type = request.GET.get('member_type', '').strip()
     
-    # Calculate date range based on period
-    now = timezone.now()
-    
-    period_map = {
-        '1d': timedelta(days=1),
-        '1w': timedelta(weeks=1),
-        '1m': timedelta(days=30),
-        '6m': timedelta(days=180),
-        '1y': timedelta(days=365),
-        'all': None  # All time
-    }
-    
-    delta = period_map.get(period)
+    # Both paths count completed payments over whole Manila business days
+    start_date, end_date = stats_date_range(period, date_from, date_to)
     
-    # Start with all transactions
-    transactions = Payment.objects.all()
+    # Unsearched requests are answered from the daily rollups
+    if not search_query and not (payment_method and member_type in ('member', 'walkin')):
+        stats = rollup_transaction_stats(start_date, end_date, payment_method, member_type)
+        return JsonResponse({
+            'total_revenue': float(stats['total_revenue'] or 0),
+            'total_count': stats['total_count'] or 0,
+            'average_amount': float(stats['average_amount'] or 0),
+            'period': period
+        })
     
-    # Apply time period filter
-    if delta:
-        start_date = now - delta
-        transactions = transactions.filter(payment_date__gte=start_date)
+    transactions = Payment.objects.filter(status='Completed', business_date__lte=end_date)
+    if start_date is not None:
+        transactions = transactions.filter(business_date__gte=start_date)
     
-    # Apply additional filters (search, payment method, member type, date range)
-    search_query = request.GET.get('search', '').strip()
+    # Apply additional filters (search, payment method, member type)
     if search_query:
         transactions = transactions.filter(
             Q(stored_member_id__icontains=search_query) |
@@ -387,43 +366,14 @@ def transaction_stats(request):
             Q(id__icontains=search_query)
         )
     
-    # Date filters (override time period if provided)
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
-    
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            # If date_from is provided, use it instead of period-based start_date
-            transactions = Payment.objects.filter(payment_date__date__gte=date_from_obj)
-            if search_query:
-                transactions = transactions.filter(
-                    Q(stored_member_id__icontains=search_query) |
-                    Q(stored_member_name__icontains=search_query) |
-                    Q(reference_number__icontains=search_query) |
-                    Q(id__icontains=search_query)
-                )
-        except ValueError:
-            pass
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            transactions = transactions.filter(payment_date__date__lte=date_to_obj)
-        except ValueError:
-            pass
-    
     # Payment method filter
-    payment_method = request.GET.get('payment_method', '').strip()
     if payment_method:
         if payment_method == 'Digital':
-            digital_methods = ['GCash', 'Maya', 'GoTyme', 'Bank Transfer', 'PayPal', 'Debit Card', 'Credit Card']
-            transactions = transactions.filter(payment_method__in=digital_methods)
+            transactions = transactions.filter(payment_method__in=Payment.DIGITAL_PAYMENT_METHODS)
         else:
             transactions = transactions.filter(payment_method=payment_method)
     
     # Member type filter (members vs walk-ins)
-    member_type = request.GET.get('member_type', '').strip()
     if member_type:
         if member_type == 'member':
             transactions = transactions.exclude(stored_member_id='GYMMSGUEST')
@@ -445,6 +395,64 @@ def transaction_stats(request):
     })
 
 
+def stats_date_range(period, date_from, date_to):
+    """
+    (start, end) Manila business dates for transaction stats; start is None for all time
+    Periods are whole days ending today; explicit dates override them, unparsable ones are ignored
+    """
+    today = local_today()
+    period_days = {'1d': 1, '1w': 7, '1m': 30, '6m': 180, '1y': 365}
+    
+    start_date = today - timedelta(days=period_days[period] - 1) if period in period_days else None
+    end_date = today
+    try:
+        if date_from:
+            start_date = datetime.strptime(date_from, '%Y-%m-%d').date()
+    except ValueError:
+        pass
+    try:
+        if date_to:
+            end_date = datetime.strptime(date_to, '%Y-%m-%d').date()
+    except ValueError:
+        pass
+    return start_date, end_date
+
+
+def rollup_transaction_stats(start_date, end_date, payment_method, member_type):
+    """
+    Completed-payment totals for a date range from the daily rollup history
+    Closed days are served from cached history and only today is recomputed
+    """
+    if start_date is None:
+        start_date = DailyRollup.objects.aggregate(first=Min('date'))['first'] or end_date
+    
+    if payment_method:
+        methods = Payment.DIGITAL_PAYMENT_METHODS if payment_method == 'Digital' else [payment_method]
+        revenue_inputs = [method_input(method, 'revenue') for method in methods]
+        count_inputs = [method_input(method, 'transaction_count') for method in methods]
+    elif member_type == 'walkin':
+        revenue_inputs, count_inputs = ['walk_in_revenue'], ['walk_ins']
+    else:
+        revenue_inputs, count_inputs = ['revenue'], ['transactions']
+    
+    def total(inputs):
+        return sum(sum(daily_values(name, start_date, end_date).values()) for name in inputs)
+    
+    total_revenue = total(revenue_inputs)
+    total_count = total(count_inputs)
+    
+    if member_type == 'member' and not payment_method:
+        # Registered members are every completed payment except walk-ins
+        total_revenue -= total(['walk_in_revenue'])
+        total_count -= total(['walk_ins'])
+    
+    return {
+        'total_revenue': total_revenue,
+        'total_count': total_count,
+        'average_amount': total_revenue / total_count if total_count else 0,
+    }
+
+
 @login_required
 def get_transactions_ajax(request):
     """
@@ -470,14 +478,14 @@ def get_transactions_ajax(request):
     if date_from:
         try:
             date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            transactions = transactions.filter(payment_date__date__gte=date_from_obj)
+            transactions = transactions.filter(business_date__gte=date_from_obj)
         except ValueError:
             pass
     
     if date_to:
         try:
             date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            transactions = transactions.filter(payment_date__date__lte=date_to_obj)
+            transactions = transactions.filter(business_date__lte=date_to_obj)
         except ValueError:
             pass
     